@@ -21,7 +21,9 @@ def create_app():
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
-    socketio.init_app(app, cors_allowed_origins="*")  # 🔁 asegúrate de permitir el origen si usas ngrok
+    from app.utils.socket_session import opciones_cola
+    # 🔁 asegúrate de permitir el origen si usas ngrok
+    socketio.init_app(app, cors_allowed_origins="*", **opciones_cola(app.config))
 
     login_manager.login_view = "auth.login"
     login_manager.login_message = "Debes iniciar sesión para continuar."
@@ -88,11 +90,53 @@ def create_app():
     app.register_blueprint(dialogflow_cx_bp, url_prefix="/")
     app.register_blueprint(socketio_bp)  # ✅
 
+    # Métricas de Prometheus en /metrics: apagadas por defecto, solo con METRICAS=1 y METRICAS_TOKEN
+    from app.utils.metricas import registrar_metricas
+    registrar_metricas(app)
+
+    # Perfil de SQL por petición (solo con PERFIL_SQL=1)
+    from app.utils.perfil_sql import registrar_perfil_sql
+    registrar_perfil_sql(app)
+
+    # Tabla de hechos diaria: se mantiene en cada flush
+    from app.utils.resumen_diario import registrar_eventos_resumen
+    registrar_eventos_resumen()
+
+    # Los formularios pintan solo el producto elegido; el resto llega por /productos/catalogo.json
+    from app.utils.productos import producto_catalogo
+    app.add_template_global(producto_catalogo)
+
     # CLI personalizado
     from app.cli.root import crear_root
-    from app.cli.mantenimiento import borrar_movimientos_canastas, borrar_canastas_total
+    from app.cli.mantenimiento import (
+        borrar_movimientos_canastas, borrar_canastas_total, reconstruir_resumen_diario,
+        reconstruir_estado_canastas, limpiar_cache_pdf
+    )
     app.cli.add_command(crear_root)
     app.cli.add_command(borrar_movimientos_canastas)
     app.cli.add_command(borrar_canastas_total)
+    app.cli.add_command(reconstruir_resumen_diario)
+    app.cli.add_command(reconstruir_estado_canastas)
+    app.cli.add_command(limpiar_cache_pdf)
+
+    from app.cli.benchmarks import (
+        benchmark_reportes, stress_consecutivos, explicar_consultas, benchmark_catalogo,
+        benchmark_ventas_lote, benchmark_pdf, benchmark_socketio, benchmark_resolver
+    )
+    app.cli.add_command(benchmark_reportes)
+    app.cli.add_command(stress_consecutivos)
+    app.cli.add_command(explicar_consultas)
+    app.cli.add_command(benchmark_catalogo)
+    app.cli.add_command(benchmark_ventas_lote)
+    app.cli.add_command(benchmark_pdf)
+    app.cli.add_command(benchmark_socketio)
+    app.cli.add_command(benchmark_resolver)
+
+    from app.cli.impresion import imprimir_despachos
+    app.cli.add_command(imprimir_despachos)
+
+    from app.cli.telegram import despachar_notificaciones, stub_telegram
+    app.cli.add_command(despachar_notificaciones)
+    app.cli.add_command(stub_telegram)
 
     return app
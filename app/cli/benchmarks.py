@@ -0,0 +1,535 @@
+# app/cli/benchmarks.py
+import os
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, text
+from app import db
+
+
+@contextmanager
+def contar_consultas():
+    """Cuenta las sentencias SQL ejecutadas dentro del bloque."""
+    conteo = {'consultas': 0}
+
+    def _contar(conn, cursor, statement, parameters, context, executemany):
+        conteo['consultas'] += 1
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _contar)
+    try:
+        yield conteo
+    finally:
+        event.remove(engine, 'before_cursor_execute', _contar)
+
+
+@click.command("benchmark_reportes")
+@click.option("--dias", default="7,30,90", help="Rangos a medir, en días hacia atrás desde hoy.")
+@with_appcontext
+def benchmark_reportes(dias):
+    """Mide consultas, tiempo y memoria pico de los reportes 'por producto'"""
+    from app.utils.reportes import (
+        bloques_documento_por_producto, bloques_ventas_por_producto, escribir_excel,
+        COLUMNAS_DOCUMENTO, COLUMNAS_VENTA
+    )
+
+    hoy = date.today()
+    reportes = [
+        ('pedidos',      lambda s, e: bloques_documento_por_producto('pedido', s, e),     COLUMNAS_DOCUMENTO),
+        ('extras',       lambda s, e: bloques_documento_por_producto('extra', s, e),      COLUMNAS_DOCUMENTO),
+        ('devoluciones', lambda s, e: bloques_documento_por_producto('devolucion', s, e), COLUMNAS_DOCUMENTO),
+        ('ventas',       bloques_ventas_por_producto,                                     COLUMNAS_VENTA),
+    ]
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    click.echo(f"{'reporte':<14}{'días':>6}{'filas':>10}{'consultas':>11}{'seg':>9}{'MB pico':>9}")
+    try:
+        for n in [int(d) for d in dias.split(',') if d.strip()]:
+            start = hoy - timedelta(days=n)
+            for nombre, fn, columnas in reportes:
+                with contar_consultas() as conteo:
+                    t0 = time.perf_counter()
+                    filas = escribir_excel(fn(start, hoy), columnas, nombre, path)
+                    seg = time.perf_counter() - t0
+
+                # Segunda pasada solo para memoria: tracemalloc distorsiona el tiempo
+                tracemalloc.start()
+                escribir_excel(fn(start, hoy), columnas, nombre, path)
+                pico = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+                tracemalloc.stop()
+                click.echo(f"{nombre:<14}{n:>6}{filas:>10}{conteo['consultas']:>11}{seg:>9.3f}{pico:>9.1f}")
+    finally:
+        os.remove(path)
+
+
+@click.command("stress_consecutivos")
+@click.option("--hilos", default=16, show_default=True)
+@click.option("--por-hilo", default=50, show_default=True)
+@click.option("--bloque", default=1, show_default=True, help="Pre-reserva por proceso (1 = sin bloques).")
+@click.option("--prefijo", default="ZZ", show_default=True, help="Prefijo de prueba; se borra al terminar.")
+@with_appcontext
+def stress_consecutivos(hilos, por_hilo, bloque, prefijo):
+    """Pide consecutivos desde muchos hilos a la vez y verifica que no se repitan"""
+    import threading
+    from flask import current_app
+    from app.models.consecutivo import BDConsecutivo
+    from app.utils import documentos
+
+    app = current_app._get_current_object()
+    obtenidos, errores = [], []
+    lock = threading.Lock()
+    salida = threading.Barrier(hilos)
+
+    def trabajar():
+        with app.app_context():
+            salida.wait()
+            propios = []
+            try:
+                for _ in range(por_hilo):
+                    propios.append(documentos.siguiente_numero(prefijo, bloque=bloque))
+            except Exception as e:
+                errores.append(repr(e))
+            with lock:
+                obtenidos.extend(propios)
+
+    documentos._BLOQUES.pop(prefijo, None)
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=trabajar) for _ in range(hilos)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    seg = time.perf_counter() - t0
+
+    esperados = hilos * por_hilo
+    repetidos = len(obtenidos) - len(set(obtenidos))
+    click.echo(f"{db.engine.dialect.name}: {len(obtenidos)}/{esperados} números en {seg:.2f}s "
+               f"({len(obtenidos) / seg:.0f}/s), repetidos={repetidos}, errores={len(errores)}")
+    for e in errores[:5]:
+        click.echo(f"  {e}")
+
+    documentos._BLOQUES.pop(prefijo, None)
+    BDConsecutivo.query.filter_by(prefijo=prefijo).delete()
+    db.session.commit()
+    if repetidos or errores or len(obtenidos) != esperados:
+        raise SystemExit(1)
+
+
+def _consultas_principales():
+    """(nombre, query) con la consulta principal de cada ruta caliente."""
+    from app.models import (
+        BDPedido, BDPedidoItem, BDExtra, BDDevolucion, BDVenta, BDDespacho,
+        BD_LIQUIDACION, BD_CAMBIO, Producto, Vendedor
+    )
+    from app.models.canastas import Canasta, MovimientoCanasta
+
+    hoy = date.today()
+    inicio = hoy - timedelta(days=30)
+    vend = db.session.query(Vendedor.codigo_vendedor).limit(1).scalar() or 'V000'
+
+    return [
+        ('pedidos: vendedor+fecha',       BDPedido.query.filter_by(codigo_vendedor=vend, fecha=hoy)),
+        ('extras: vendedor+fecha',        BDExtra.query.filter_by(codigo_vendedor=vend, fecha=hoy)),
+        ('devoluciones: vendedor+usos',   BDDevolucion.query.filter(BDDevolucion.codigo_vendedor == vend,
+                                                                    BDDevolucion.usos < 2)),
+        ('ventas: vendedor+rango',        BDVenta.query.filter(BDVenta.codigo_vendedor == vend,
+                                                               BDVenta.fecha.between(inicio, hoy))),
+        ('despachos: vendedor+fecha+tipo', BDDespacho.query.filter_by(vendedor_cod=vend, fecha=hoy,
+                                                                      tipo_origen='pedido')),
+        ('despachos: codigo_origen',      BDDespacho.query.filter_by(codigo_origen='PD-00001')),
+        ('movimientos: canasta',          MovimientoCanasta.query.filter_by(codigo_barras='0000')
+                                                           .order_by(MovimientoCanasta.fecha_movimiento.desc())),
+        ('canastas perdidas',             Canasta.query.filter(Canasta.actualidad == 'Prestada',
+                                                               Canasta.fecha_prestamo <= inicio)),
+        ('liquidaciones: rango+vendedor', BD_LIQUIDACION.query.filter(BD_LIQUIDACION.fecha.between(inicio, hoy),
+                                                                      BD_LIQUIDACION.codigo_vendedor == vend)),
+        ('cambios: fecha+vendedor',       BD_CAMBIO.query.filter_by(fecha=hoy, codigo_vendedor=vend)),
+        ('items pedido por producto',     db.session.query(BDPedidoItem.producto_cod, Producto.nombre)
+                                                    .join(Producto, Producto.codigo == BDPedidoItem.producto_cod)
+                                                    .filter(BDPedidoItem.producto_cod == 'P001')),
+    ]
+
+
+@click.command("explicar_consultas")
+@with_appcontext
+def explicar_consultas():
+    """Corre EXPLAIN sobre la consulta principal de cada ruta y marca los recorridos completos"""
+    dialecto = db.engine.dialect.name
+    if dialecto not in ('sqlite', 'mysql'):
+        click.echo(f"❌ Dialecto no soportado: {dialecto}")
+        return
+
+    con_problemas = 0
+    for nombre, query in _consultas_principales():
+        sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        if dialecto == 'sqlite':
+            filas = db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}")).mappings().all()
+            plan = [f['detail'] for f in filas]
+            completos = [p for p in plan if p.startswith('SCAN') and 'INDEX' not in p]
+        else:
+            filas = db.session.execute(text(f"EXPLAIN {sql}")).mappings().all()
+            plan = [f"{f['table']}: type={f['type']} key={f['key']} rows={f['rows']}" for f in filas]
+            completos = [p for f, p in zip(filas, plan) if f['type'] == 'ALL']
+
+        marca = '⚠️ ' if completos else '✅'
+        con_problemas += bool(completos)
+        click.echo(f"{marca} {nombre}")
+        for p in plan:
+            click.echo(f"      {p}")
+
+    click.echo(f"{con_problemas} consultas con recorrido completo de tabla.")
+
+
+def _rutas_catalogo():
+    """(nombre, url) de las páginas que consultan productos, con datos reales de la base."""
+    from app.models import BDPedido, BDExtra, BDDespacho
+
+    rutas = [('pedidos/crear', '/pedidos/crear')]
+    extra = BDExtra.query.order_by(BDExtra.id.desc()).first()
+    if extra:
+        rutas.append((f'extras/editar ({len(extra.items)} ít.)', f'/extras/editar/{extra.id}'))
+    pedido = (BDPedido.query
+              .filter(~BDPedido.consecutivo.in_(db.session.query(BDDespacho.codigo_origen)))
+              .order_by(BDPedido.id.desc()).first())
+    if pedido:
+        rutas.append((f'despachos/crear ({len(pedido.items)} ít.)', f'/despachos/crear/{pedido.consecutivo}'))
+    despacho = BDDespacho.query.order_by(BDDespacho.id.desc()).first()
+    if despacho:
+        rutas.append((f'despachos/pdf ({len(despacho.items)} ít.)', f'/despachos/pdf/{despacho.id}'))
+        rutas.append(('ventas/generar', f'/ventas/generar?vendedor={despacho.vendedor_cod}'
+                                        f'&fecha={despacho.fecha.isoformat()}&codigo_pedido={despacho.codigo_origen}'))
+    return rutas
+
+
+@click.command("benchmark_catalogo")
+@click.option("--usuario", default=None, help="Nombre de usuario administrador (por defecto, el primero).")
+@with_appcontext
+def benchmark_catalogo(usuario):
+    """Cuenta las consultas por petición de las páginas que usan el catálogo de productos"""
+    from flask import current_app
+    from app.models import Usuario
+    from app.utils import productos
+
+    query = Usuario.query.filter_by(rol='administrador')
+    if usuario:
+        query = query.filter_by(nombre_usuario=usuario)
+    admin = query.first()
+    if not admin:
+        click.echo("❌ No hay usuario administrador para firmar las peticiones.")
+        return
+
+    client = current_app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = admin.get_id()
+        sess['_fresh'] = True
+
+    def medir(url):
+        with contar_consultas() as conteo:
+            t0 = time.perf_counter()
+            resp = client.get(url)
+            ms = (time.perf_counter() - t0) * 1000
+        return resp.status_code, conteo['consultas'], ms
+
+    click.echo(f"{'ruta':<32}{'estado':>7}{'frío':>7}{'caliente':>10}{'ms frío':>10}{'ms cal.':>10}")
+    for nombre, url in _rutas_catalogo():
+        # Frío: la primera petición de un worker tras un cambio de productos
+        with productos._CATALOGO_LOCK:
+            productos._CATALOGO['catalogo'] = None
+        estado, frio, ms_frio = medir(url)
+        _, caliente, ms_caliente = medir(url)
+        click.echo(f"{nombre:<32}{estado:>7}{frio:>7}{caliente:>10}{ms_frio:>10.1f}{ms_caliente:>10.1f}")
+
+
+@click.command("benchmark_ventas_lote")
+@click.option("--fecha", default=None, help="Día a emparejar (AAAA-MM-DD, por defecto hoy).")
+@with_appcontext
+def benchmark_ventas_lote(fecha):
+    """Mide el emparejamiento y el cálculo de las ventas de todos los vendedores de un día (no guarda)"""
+    from datetime import datetime
+    from app.utils.ventas import emparejar_lote, previsualizar_lote
+
+    dia = datetime.strptime(fecha, '%Y-%m-%d').date() if fecha else date.today()
+
+    with contar_consultas() as c_emp:
+        t0 = time.perf_counter()
+        emparejar_lote(dia)
+        seg_emp = time.perf_counter() - t0
+    with contar_consultas() as c_total:
+        t0 = time.perf_counter()
+        propuestas = previsualizar_lote(dia)
+        seg_total = time.perf_counter() - t0
+
+    estados = {}
+    for p in propuestas:
+        estados[p['estado']] = estados.get(p['estado'], 0) + 1
+    lineas = sum(len(p['resultado']['lineas']) for p in propuestas if 'resultado' in p)
+    click.echo(f"{dia.isoformat()}: {len(propuestas)} vendedores "
+               f"({', '.join(f'{k}={v}' for k, v in sorted(estados.items()))}), {lineas} líneas")
+    click.echo(f"  emparejar:          {c_emp['consultas']:>4} consultas  {seg_emp * 1000:8.1f} ms")
+    click.echo(f"  emparejar+calcular: {c_total['consultas']:>4} consultas  {seg_total * 1000:8.1f} ms")
+
+
+def _documentos_sinteticos(items):
+    """Documentos en memoria (sin BD) con `items` líneas, para medir solo el render."""
+    from types import SimpleNamespace as N
+    from app.utils.productos import catalogo
+
+    codigos = [p.codigo for p in catalogo().ordenados] or ['P0']
+    hoy = date.today()
+    vendedor = N(codigo_vendedor='V0', nombre='Vendedor de prueba')
+    lineas = [N(producto_cod=codigos[i % len(codigos)], cantidad=i + 1, precio_unit=1500,
+                comision=150 * (i + 1), pagar_pan=1350 * (i + 1), cantidad_pedida=i + 2,
+                lote=f'L{i}', subtotal=1500 * (i + 1))
+              for i in range(items)]
+    doc = N(id=1, consecutivo='PD-00001', fecha=hoy, items=lineas, codigo_dev_anterior='DV-00001',
+            codigo_pedido='PD-00001', codigo_extra='EX-00001', codigo_dev_dia='DV-00002')
+    despacho = N(id=1, codigo_origen='PD-00001', tipo_origen='pedido', fecha=hoy, vendedor_cod='V0',
+                 comentarios='Entrega temprano', items=lineas)
+    liquidacion = N(id=1, codigo='LQ-0001', fecha=hoy, pago_banco=50000, pago_efectivo=30000,
+                    pago_otros=0, comentarios='Sin novedad')
+    venta = N(id=1, total_venta=100000, comision=10000)
+    return vendedor, doc, despacho, liquidacion, venta
+
+
+@click.command("benchmark_pdf")
+@click.option("--items", default=20, show_default=True, help="Líneas por documento.")
+@click.option("--repeticiones", default=100, show_default=True)
+@with_appcontext
+def benchmark_pdf(items, repeticiones):
+    """Documentos por segundo de cada plantilla PDF (render puro, sin caché ni BD)"""
+    from app.utils.pdf_utils import generate_pdf_document, generate_pdf_despacho, generate_liquidacion_pdf
+
+    vendedor, doc, despacho, liquidacion, venta = _documentos_sinteticos(items)
+    plantillas = [
+        ('pedido',      lambda: generate_pdf_document(doc, vendedor, None, tipo='pedido')),
+        ('venta',       lambda: generate_pdf_document(doc, vendedor, None, tipo='venta')),
+        ('despacho',    lambda: generate_pdf_despacho(despacho, vendedor)),
+        ('liquidacion', lambda: generate_liquidacion_pdf(liquidacion, vendedor, venta, None)),
+    ]
+
+    click.echo(f"{items} líneas por documento, {repeticiones} repeticiones")
+    click.echo(f"{'plantilla':<14}{'docs/s':>9}{'ms/doc':>9}{'KB':>7}")
+    for nombre, generar in plantillas:
+        generar()  # calienta fuentes y plantillas
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            pdf = generar()
+        seg = time.perf_counter() - t0
+        tam = len(pdf if isinstance(pdf, bytes) else pdf.getvalue()) / 1024
+        click.echo(f"{nombre:<14}{repeticiones / seg:>9.0f}{seg / repeticiones * 1000:>9.2f}{tam:>7.1f}")
+
+
+@click.command("benchmark_socketio")
+@click.option("--sesiones", default=20, show_default=True)
+@click.option("--clientes", default=3, show_default=True, help="Sockets por sesión.")
+@click.option("--eventos", default=50, show_default=True, help="Eventos emitidos por sesión.")
+@with_appcontext
+def benchmark_socketio(sesiones, clientes, eventos):
+    """Comprueba que los eventos de voz llegan solo a su sesión y mide la emisión"""
+    from flask import current_app
+    from app.extensions import socketio
+    from app.utils.socket_session import emitir_a_sesion
+
+    if current_app.config.get('SOCKETIO_MESSAGE_QUEUE'):
+        click.echo("❌ El cliente de prueba de Flask-SocketIO no admite cola de mensajes; "
+                   "ejecutar con SOCKETIO_MESSAGE_QUEUE vacío.")
+        return
+
+    app = current_app._get_current_object()
+    por_sesion = {
+        f"BENCH-{i}": [socketio.test_client(app, auth={'session_id': f"BENCH-{i}"}) for _ in range(clientes)]
+        for i in range(sesiones)
+    }
+    espectador = socketio.test_client(app)  # conectado sin sesión de voz
+
+    t0 = time.perf_counter()
+    for n in range(eventos):
+        for session_id in por_sesion:
+            emitir_a_sesion('productos_dictados', {'productos': [{'codigo': session_id, 'n': n}]}, session_id)
+    seg = time.perf_counter() - t0
+
+    ajenos = faltantes = 0
+    for session_id, clientes_sesion in por_sesion.items():
+        for cliente in clientes_sesion:
+            recibidos = [e['args'][0]['productos'][0]['codigo'] for e in cliente.get_received()
+                         if e['name'] == 'productos_dictados']
+            propios = recibidos.count(session_id)
+            ajenos += len(recibidos) - propios
+            faltantes += eventos - propios
+    ajenos += len(espectador.get_received())
+
+    # Evento emitido antes de que la sesión tenga socket: debe llegar una vez a
+    # cada socket que se registre después (la página abre dos: al conectar y con
+    # 'registrar_socket'), con el mismo evento_id para que el cliente lo descarte
+    emitir_a_sesion('abrir_pagina', {'url': '/despachos/listar', 'usuario': 'BENCH-TARDE'}, 'BENCH-TARDE')
+    tarde = [socketio.test_client(app, auth={'session_id': 'BENCH-TARDE'}) for _ in range(2)]
+    for cliente in tarde:
+        cliente.emit('registrar_socket', {'session_id': 'BENCH-TARDE'})
+    recibidos = [[e['args'][0]['evento_id'] for e in c.get_received() if e['name'] == 'abrir_pagina'] for c in tarde]
+    pendiente_ok = all(len(r) == 1 for r in recibidos) and len({r[0] for r in recibidos if r}) == 1
+
+    # Con la sesión ya conectada el evento llega por el room a ambos sockets, una vez
+    emitir_a_sesion('productos_dictados', {'productos': []}, 'BENCH-TARDE')
+    en_vivo_ok = all([e['name'] for e in c.get_received()] == ['productos_dictados'] for c in tarde)
+
+    # Un socket que cambia de sesión deja de recibir los eventos de la anterior
+    movido = tarde[0]
+    movido.emit('registrar_socket', {'session_id': 'BENCH-OTRA'})
+    movido.get_received()
+    emitir_a_sesion('productos_dictados', {'productos': []}, 'BENCH-TARDE')
+    cambio_ok = movido.get_received() == [] and len(tarde[1].get_received()) == 1
+
+    for cliente in [c for cs in por_sesion.values() for c in cs] + [espectador] + tarde:
+        cliente.disconnect()
+
+    total = eventos * sesiones
+    click.echo(f"{sesiones} sesiones × {clientes} sockets, {total} eventos: "
+               f"{total / seg:,.0f} emisiones/s ({seg / total * 1e6:.0f} µs c/u)")
+    click.echo(f"  entregas a otras sesiones: {ajenos}   faltantes: {faltantes}")
+    click.echo(f"  pendiente entregado una vez a cada uno de 2 sockets: {'sí' if pendiente_ok else 'NO'}   "
+               f"en vivo a ambos: {'sí' if en_vivo_ok else 'NO'}   "
+               f"sin eventos de la sesión anterior: {'sí' if cambio_ok else 'NO'}")
+
+
+_UNIDADES = ('cero uno dos tres cuatro cinco seis siete ocho nueve diez once doce trece catorce '
+             'quince dieciseis diecisiete dieciocho diecinueve').split()
+_DECENAS = 'veinte treinta cuarenta cincuenta sesenta setenta ochenta noventa'.split()
+_CENTENAS = ('ciento doscientos trescientos cuatrocientos quinientos seiscientos setecientos '
+             'ochocientos novecientos').split()
+
+
+def _en_palabras(n):
+    """Número (< 1.000.000) como se dicta: 2000 -> 'dos mil'."""
+    if n >= 1000:
+        miles, resto = divmod(n, 1000)
+        texto = 'mil' if miles == 1 else f'{_en_palabras(miles)} mil'
+        return f'{texto} {_en_palabras(resto)}' if resto else texto
+    if n >= 100:
+        centenas, resto = divmod(n, 100)
+        if n == 100:
+            return 'cien'
+        return f'{_CENTENAS[centenas - 1]} {_en_palabras(resto)}' if resto else _CENTENAS[centenas - 1]
+    if n >= 20:
+        decenas, resto = divmod(n, 10)
+        return f'{_DECENAS[decenas - 2]} y {_UNIDADES[resto]}' if resto else _DECENAS[decenas - 2]
+    return _UNIDADES[n]
+
+
+def _frases_sinteticas(productos, semilla=0):
+    """
+    Variantes habladas de cada nombre: minúsculas sin tildes, números en
+    palabras, 'por seis' en vez de '*6', sin 'de', confusiones b/v s/z ll/y,
+    una letra cambiada y el código en palabras. Devuelve [(frase, código)].
+    """
+    import random
+    import re
+
+    rng = random.Random(semilla)
+    confusiones = [('v', 'b'), ('b', 'v'), ('z', 's'), ('s', 'z'), ('ll', 'y'), ('ce', 'se'), ('h', '')]
+    frases = []
+    for p in productos:
+        base = p.nombre.lower()
+        hablado = re.sub(r'\s*[*x]\s*(\d+)\b', lambda m: f' por {_en_palabras(int(m.group(1)))}', base)
+        hablado = re.sub(r'\d+', lambda m: _en_palabras(int(m.group())), hablado)
+        hablado = re.sub(r'[^\w\s]', ' ', hablado)
+        variantes = {base, hablado, hablado.replace(' de ', ' ')}
+        for a, b in confusiones:
+            if a in hablado:
+                variantes.add(hablado.replace(a, b, 1))
+                break
+        palabras = hablado.split()
+        larga = max(range(len(palabras)), key=lambda i: len(palabras[i]))
+        if len(palabras[larga]) > 4:
+            w = palabras[larga]
+            i = rng.randrange(1, len(w) - 2)
+            palabras[larga] = w[:i] + w[i + 1] + w[i] + w[i + 2:]
+            variantes.add(' '.join(palabras))
+        if p.codigo.isdigit():
+            variantes.add(_en_palabras(int(p.codigo)))
+        frases.extend((v, p.codigo) for v in sorted(variantes))
+    return frases
+
+
+@click.command("benchmark_resolver")
+@click.option("--archivo", default=None, type=click.Path(exists=True, dir_okay=False),
+              help="CSV de frases grabadas con columnas frase,codigo (codigo vacío = no debe encontrar).")
+@click.option("--repeticiones", default=20, show_default=True)
+@click.option("--errores", is_flag=True, help="Listar las frases mal resueltas.")
+@with_appcontext
+def benchmark_resolver(archivo, repeticiones, errores):
+    """Acierto y latencia del resolvedor de productos dictados frente al ILIKE anterior"""
+    import csv
+    from app.models import Producto
+    from app.utils.productos import catalogo
+    from app.utils.resolver_productos import IndiceProductos, indice_productos
+
+    if archivo:
+        with open(archivo, newline='', encoding='utf-8-sig') as f:
+            frases = [(fila['frase'], (fila.get('codigo') or '').strip() or None) for fila in csv.DictReader(f)]
+        origen = archivo
+    else:
+        frases = _frases_sinteticas(catalogo().ordenados)
+        origen = "variantes sintéticas de los nombres del catálogo"
+    if not frases:
+        click.echo("❌ No hay frases para medir.")
+        return
+
+    t0 = time.perf_counter()
+    IndiceProductos(catalogo().por_codigo.values())
+    construccion = time.perf_counter() - t0
+    indice = indice_productos()
+
+    def clasificar(resultados):
+        conteo = {'acierto': 0, 'pregunta': 0, 'fallo': 0}
+        mal = []
+        for (frase, esperado), (codigo, opciones) in zip(frases, resultados):
+            if codigo == esperado:
+                conteo['acierto'] += 1
+            elif codigo is None and esperado in opciones:
+                conteo['pregunta'] += 1
+            else:
+                conteo['fallo'] += 1
+                mal.append((frase, esperado, codigo, opciones))
+        return conteo, mal
+
+    # Antes: una consulta por frase, solo coincidencia exacta sin mayúsculas
+    t0 = time.perf_counter()
+    anteriores = []
+    for frase, _ in frases:
+        p = Producto.query.filter(
+            (Producto.nombre.ilike(frase.strip())) | (Producto.codigo.ilike(frase.strip()))
+        ).first()
+        anteriores.append((p.codigo if p else None, ()))
+    seg_ilike = time.perf_counter() - t0
+
+    tiempos = []
+    for _ in range(repeticiones):
+        for frase, _esperado in frases:
+            t0 = time.perf_counter()
+            indice.resolver(frase)
+            tiempos.append(time.perf_counter() - t0)
+    resultados = []
+    for frase, _ in frases:
+        producto, candidatos = indice.resolver(frase)
+        resultados.append((producto.codigo if producto else None, [c.producto.codigo for c in candidatos]))
+
+    n = len(frases)
+    tiempos.sort()
+    antes, _ = clasificar(anteriores)
+    ahora, mal = clasificar(resultados)
+    click.echo(f"{n} frases ({origen}); índice de {len(indice.productos)} productos en {construccion * 1000:.1f} ms")
+    click.echo(f"{'':<12}{'acierto':>9}{'pregunta':>10}{'fallo':>8}{'µs/frase':>11}")
+    click.echo(f"{'ILIKE':<12}{antes['acierto'] / n:>9.1%}{'-':>10}{antes['fallo'] / n:>8.1%}"
+               f"{seg_ilike / n * 1e6:>11.0f}")
+    click.echo(f"{'resolvedor':<12}{ahora['acierto'] / n:>9.1%}{ahora['pregunta'] / n:>10.1%}"
+               f"{ahora['fallo'] / n:>8.1%}{tiempos[len(tiempos) // 2] * 1e6:>11.1f}"
+               f"   (p99 {tiempos[int(len(tiempos) * 0.99)] * 1e6:.1f} µs)")
+    if errores:
+        for frase, esperado, codigo, opciones in mal:
+            click.echo(f"  '{frase}': esperado {esperado}, obtenido {codigo}, opciones {opciones}")
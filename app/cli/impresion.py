@@ -0,0 +1,35 @@
+# app/cli/impresion.py
+import time
+from datetime import date, datetime
+
+import click
+from flask.cli import with_appcontext
+
+
+@click.command("imprimir_despachos")
+@click.option("--fecha", default=None, help="Día a imprimir (AAAA-MM-DD, por defecto hoy).")
+@click.option("--vendedor", "vendedores", multiple=True, help="Código de vendedor; se puede repetir.")
+@click.option("--formato", type=click.Choice(["pdf", "zip"]), default="pdf", show_default=True)
+@click.option("--salida", default=None, help="Archivo de salida (por defecto despachos_<fecha>.<formato>).")
+@click.option("--procesos", default=None, type=int, help="Procesos de render (por defecto, núcleos disponibles).")
+@with_appcontext
+def imprimir_despachos(fecha, vendedores, formato, salida, procesos):
+    """Genera en un archivo todos los despachos de un día para la tirada de la mañana"""
+    from flask import current_app
+    from app.utils.impresion import tirada_despachos
+
+    fecha = datetime.strptime(fecha, '%Y-%m-%d').date() if fecha else date.today()
+    if procesos is not None:
+        current_app.config['IMPRESION_PROCESOS'] = procesos
+
+    t0 = time.perf_counter()
+    contenido, cantidad, en_cache = tirada_despachos(fecha, list(vendedores) or None, formato)
+    segundos = time.perf_counter() - t0
+    if not cantidad:
+        click.echo(f"❌ No hay despachos para el {fecha.isoformat()}.")
+        return
+
+    salida = salida or f"despachos_{fecha.isoformat()}.{formato}"
+    with open(salida, 'wb') as f:
+        f.write(contenido)
+    click.echo(f"✅ {cantidad} despachos ({en_cache} desde la caché) en {segundos:.2f} s → {salida}")
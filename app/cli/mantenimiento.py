@@ -12,9 +12,11 @@ def borrar_movimientos_canastas():
         click.echo("❌ Operación cancelada.")
         return
 
+    from app.utils.canastas import limpiar_estado_canastas
+
     try:
         db.session.execute(text('DELETE FROM movimientos'))
-        db.session.execute(text('UPDATE canastas SET actualidad = "Disponible"'))
+        limpiar_estado_canastas()
         db.session.commit()
         click.echo("✅ Movimientos borrados y canastas actualizadas a 'Disponible'.")
     except Exception as e:
@@ -36,3 +38,38 @@ def borrar_canastas_total():
     except Exception as e:
         db.session.rollback()
         click.echo(f"❌ Error al borrar canastas: {e}")
+
+@click.command("reconstruir_resumen_diario")
+@with_appcontext
+def reconstruir_resumen_diario():
+    """Reconstruye la tabla de hechos diaria desde pedidos, extras, devoluciones, despachos y ventas"""
+    from app.utils.resumen_diario import reconstruir_resumen
+    from app.models.resumen_diario import BDResumenDiario
+
+    try:
+        reconstruir_resumen()
+        click.echo(f"✅ Resumen diario reconstruido ({BDResumenDiario.query.count()} filas).")
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f"❌ Error al reconstruir el resumen diario: {e}")
+
+@click.command("reconstruir_estado_canastas")
+@with_appcontext
+def reconstruir_estado_canastas():
+    """Recalcula el vendedor actual y la fecha de préstamo de cada canasta desde los movimientos"""
+    from app.utils.canastas import reconstruir_estado_canastas as reconstruir
+
+    try:
+        prestadas = reconstruir()
+        click.echo(f"✅ Estado de canastas reconstruido ({prestadas} prestadas).")
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f"❌ Error al reconstruir el estado de canastas: {e}")
+
+@click.command("limpiar_cache_pdf")
+@with_appcontext
+def limpiar_cache_pdf():
+    """Vacía la caché de PDFs renderizados (tras cambiar el diseño de los documentos)"""
+    from app.utils.pdf_cache import limpiar_cache_pdf as limpiar
+
+    click.echo(f"✅ Caché de PDFs vaciada ({limpiar()} archivos).")
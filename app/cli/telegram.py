@@ -0,0 +1,82 @@
+# app/cli/telegram.py
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import click
+from flask.cli import with_appcontext
+from app import db
+
+
+@click.command("despachar_notificaciones")
+@click.option("--continuo", is_flag=True, help="Queda drenando la bandeja (worker dedicado).")
+@with_appcontext
+def despachar_notificaciones(continuo):
+    """Envía los mensajes pendientes de la bandeja de Telegram"""
+    from flask import current_app
+    from app.utils.telegram import despachar_pendientes, pendientes_en_cola
+
+    espera = current_app.config.get('TELEGRAM_ESPERA', 5.0)
+    total = 0
+    while True:
+        enviadas, errores = despachar_pendientes()
+        total += enviadas
+        db.session.remove()
+        if enviadas or errores:
+            click.echo(f"📨 Enviadas {enviadas}, con error {errores}, en cola {pendientes_en_cola()}")
+        if not continuo and not enviadas:
+            break
+        if not enviadas:
+            time.sleep(espera)
+    click.echo(f"✅ {total} notificaciones enviadas.")
+
+
+class _StubTelegram(BaseHTTPRequestHandler):
+    fallos = 0.0
+    intervalo = 0.0
+    ultimo = [0.0]
+
+    def _responder(self, codigo, cuerpo):
+        datos = json.dumps(cuerpo).encode()
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_POST(self):
+        largo = int(self.headers.get('Content-Length') or 0)
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(largo).decode()).items()}
+
+        ahora = time.monotonic()
+        if self.intervalo and ahora - self.ultimo[0] < self.intervalo:
+            return self._responder(429, {"ok": False, "error_code": 429,
+                                         "parameters": {"retry_after": 1}})
+        self.ultimo[0] = ahora
+        if random.random() < self.fallos:
+            return self._responder(500, {"ok": False, "error_code": 500})
+        texto = form.get('text') or ''
+        if form.get('parse_mode') == 'Markdown' and any(texto.count(c) % 2 for c in '*_`'):
+            # Como la API real: una entidad sin cerrar rechaza el mensaje entero
+            return self._responder(400, {"ok": False, "error_code": 400,
+                                         "description": "Bad Request: can't parse entities"})
+
+        click.echo(f"--- {self.path} chat={form.get('chat_id')}\n{form.get('text')}")
+        self._responder(200, {"ok": True, "result": {"message_id": int(ahora * 1000)}})
+
+    def log_message(self, *args):
+        pass
+
+
+@click.command("stub_telegram")
+@click.option("--puerto", default=8081, show_default=True)
+@click.option("--fallos", default=0.0, help="Fracción de envíos que responden 500.")
+@click.option("--intervalo", default=0.0, help="Segundos mínimos entre envíos antes de responder 429.")
+def stub_telegram(puerto, fallos, intervalo):
+    """Servidor local que imita la API de Telegram (usar con TELEGRAM_API_URL=http://127.0.0.1:<puerto>)"""
+    _StubTelegram.fallos = fallos
+    _StubTelegram.intervalo = intervalo
+    click.echo(f"🤖 Stub de Telegram escuchando en http://127.0.0.1:{puerto}")
+    ThreadingHTTPServer(('127.0.0.1', puerto), _StubTelegram).serve_forever()
@@ -18,3 +18,51 @@ class Config:
 
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Consecutivos reservados por proceso en cada viaje a la BD (1 = sin huecos)
+    CONSECUTIVO_BLOQUE = int(os.getenv("CONSECUTIVO_BLOQUE", "1"))
+
+    # Caché de PDFs renderizados (ver app/utils/pdf_cache.py); directorio por defecto <instance>/pdf_cache
+    PDF_CACHE = os.getenv("PDF_CACHE", "1") == "1"
+    PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR") or None
+    PDF_CACHE_MAX_MB = int(os.getenv("PDF_CACHE_MAX_MB", "64"))
+
+    # Impresión en bloque de despachos (ver app/utils/impresion.py); vacío = núcleos disponibles
+    IMPRESION_PROCESOS = int(os.getenv("IMPRESION_PROCESOS", "0")) or None
+    IMPRESION_MINIMO_PARALELO = int(os.getenv("IMPRESION_MINIMO_PARALELO", "300"))
+
+    # Socket.IO con varios workers: cola compartida para que un evento emitido en un
+    # worker (p. ej. el webhook de Dialogflow) llegue al navegador conectado a otro.
+    # redis://localhost:6379/0 (requiere el paquete redis), "memoria" para la cola en
+    # proceso de pruebas, o vacío con un solo worker.
+    SOCKETIO_MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE") or None
+    SOCKETIO_CANAL = os.getenv("SOCKETIO_CANAL", "incolpan")
+
+    # Sesiones de voz de Dialogflow (ver app/utils/sesiones_voz.py): "memoria" con un
+    # solo worker, "bd" para compartirlas entre workers y conservarlas al reiniciar
+    VOZ_SESIONES = os.getenv("VOZ_SESIONES", "memoria")
+    VOZ_SESION_TTL = int(os.getenv("VOZ_SESION_TTL", "1800"))
+    VOZ_SESION_MAX = int(os.getenv("VOZ_SESION_MAX", "500"))
+
+    # Perfil de SQL por petición (ver app/utils/perfil_sql.py): cabeceras X-DB-*, panel en
+    # las páginas y resumen en /debug/sql. Presupuestos por endpoint: "reportes.reporte_x=80,..."
+    PERFIL_SQL = os.getenv("PERFIL_SQL", "0") == "1"
+    PERFIL_SQL_PANEL = os.getenv("PERFIL_SQL_PANEL", "0") == "1"
+    PERFIL_SQL_PRESUPUESTO = int(os.getenv("PERFIL_SQL_PRESUPUESTO", "30"))
+    PERFIL_SQL_PRESUPUESTOS = {
+        endpoint.strip(): int(limite)
+        for endpoint, _, limite in (
+            par.partition("=") for par in os.getenv("PERFIL_SQL_PRESUPUESTOS", "").split(",") if "=" in par
+        )
+    }
+
+    # /metrics en formato Prometheus (ver app/utils/metricas.py). Apagado por defecto;
+    # encendido exige METRICAS_TOKEN en la cabecera "Authorization: Bearer <token>"
+    METRICAS = os.getenv("METRICAS", "0") == "1"
+    METRICAS_TOKEN = os.getenv("METRICAS_TOKEN") or None
+
+    # Bandeja de salida de Telegram (ver app/utils/telegram.py)
+    TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+    # "0" si las notificaciones las envía un proceso aparte (flask despachar_notificaciones --continuo)
+    TELEGRAM_WORKER = os.getenv("TELEGRAM_WORKER", "1") == "1"
+    TELEGRAM_INTERVALO = float(os.getenv("TELEGRAM_INTERVALO", "1.0"))
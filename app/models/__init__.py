@@ -20,8 +20,13 @@ from .despachos        import BDDespacho, BDDespachoItem
 from .cambio            import BD_CAMBIO
 from .liquidacion       import BD_LIQUIDACION
 from .festivo           import Festivo
+from .resumen_diario    import BDResumenDiario
+from .consecutivo       import BDConsecutivo
+from .version_datos     import BDVersionDatos
+from .sesion_voz        import BDSesionVoz
 
 from app.models import canastas
 
 from .config_telegram import ConfiguracionTelegram
+from .notificacion    import BDNotificacion
 
@@ -13,4 +13,8 @@ class BD_CAMBIO(db.Model):
     usuario_creador = db.Column(db.String(50), nullable=False)
     fecha_creacion = db.Column(db.DateTime, default=datetime.now)
 
+    __table_args__ = (
+        db.Index('ix_cambios_fecha_vendedor', 'fecha', 'codigo_vendedor'),
+    )
+
 
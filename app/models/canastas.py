@@ -11,6 +11,16 @@ class Canasta(db.Model):
     fecha_registro = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), comment='Fecha en que fue registrada')
     actualidad = db.Column(db.String(50), nullable=False, default='Disponible', comment='Disponible, Prestada o No disponible')
 
+    # Estado actual desnormalizado: se actualiza en la misma transacción que cada movimiento
+    vendedor_actual = db.Column(db.String(25), db.ForeignKey('vendedores.codigo_vendedor'), nullable=True, comment='Vendedor que tiene la canasta prestada')
+    fecha_prestamo = db.Column(db.DateTime, nullable=True, comment='Fecha del último Sale vigente')
+    ultimo_movimiento_id = db.Column(db.Integer, nullable=True, comment='Id del último movimiento de la canasta')
+
+    __table_args__ = (
+        db.Index('ix_canastas_actualidad_fecha_prestamo', 'actualidad', 'fecha_prestamo'),
+        db.Index('ix_canastas_vendedor_actual', 'vendedor_actual'),
+    )
+
     # Relación con movimientos
     movimientos = db.relationship('MovimientoCanasta', backref='canasta', lazy=True, primaryjoin="Canasta.codigo_barras==MovimientoCanasta.codigo_barras")
 
@@ -27,5 +37,9 @@ class MovimientoCanasta(db.Model):
     codigo_barras = db.Column(db.String(100), db.ForeignKey('canastas.codigo_barras'), nullable=False, comment='Código de barras de la canasta')
     fecha_movimiento = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), comment='Fecha del movimiento')
 
+    __table_args__ = (
+        db.Index('ix_movimientos_canasta_fecha', 'codigo_barras', 'fecha_movimiento'),
+    )
+
     def __repr__(self):
         return f'<Movimiento {self.id} - {self.tipo_movimiento} - {self.codigo_barras}>'
@@ -0,0 +1,10 @@
+# app/models/consecutivo.py
+
+from app import db
+
+class BDConsecutivo(db.Model):
+    """Último número entregado por prefijo (PD, EX, DV, VT, LQ...)."""
+    __tablename__ = 'bd_consecutivos'
+
+    prefijo = db.Column(db.String(10), primary_key=True)
+    ultimo  = db.Column(db.Integer, nullable=False, default=0)
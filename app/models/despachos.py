@@ -14,6 +14,11 @@ class BDDespacho(db.Model):
     despachado = db.Column(db.Boolean, default=False)
     comentarios = db.Column(db.Text)
 
+    __table_args__ = (
+        db.Index('ix_despachos_vendedor_fecha_tipo', 'vendedor_cod', 'fecha', 'tipo_origen'),
+        db.Index('ix_despachos_codigo_origen', 'codigo_origen'),
+    )
+
     items = db.relationship(
         'BDDespachoItem',
         back_populates='despacho',
@@ -39,5 +44,9 @@ class BDDespachoItem(db.Model):
     pedido_id = db.Column(db.Integer, db.ForeignKey('bd_pedidos.id'), nullable=True)
     extra_id = db.Column(db.Integer, db.ForeignKey('BD_EXTRAS.id'), nullable=True)
 
+    __table_args__ = (
+        db.Index('ix_despacho_items_producto', 'producto_cod'),
+    )
+
     despacho = db.relationship('BDDespacho', back_populates='items')
     producto = db.relationship('Producto')
\ No newline at end of file
@@ -14,6 +14,8 @@ class BDDevolucionItem(db.Model):
     precio_unit      = db.Column(db.Numeric(10,2), nullable=False)
     subtotal         = db.Column(db.Numeric(12,2), nullable=False)
 
+    __table_args__   = (db.Index('ix_devolucion_items_producto', 'producto_cod'),)
+
     devolucion       = db.relationship(
                           'BDDevolucion',
                           back_populates='items'
@@ -12,6 +12,11 @@ class BDDevolucion(db.Model):
     comentarios      = db.Column(db.Text, nullable=True)
     usos             = db.Column(db.Integer, nullable=False, default=0)
 
+    __table_args__   = (
+                          db.Index('ix_devoluciones_vendedor_usos', 'codigo_vendedor', 'usos'),
+                          db.Index('ix_devoluciones_vendedor_fecha', 'codigo_vendedor', 'fecha'),
+                       )
+
     items            = db.relationship(
                           'BDDevolucionItem',
                           back_populates='devolucion',
@@ -12,6 +12,10 @@ class BDExtra(db.Model):
     comentarios     = db.Column(db.Text, nullable=True)
     usado           = db.Column(db.Boolean, default=False, nullable=False)
 
+    __table_args__  = (
+                          db.Index('ix_extras_vendedor_fecha', 'codigo_vendedor', 'fecha'),
+                      )
+
     items = db.relationship(
         'BDExtraItem',
         back_populates='extra',
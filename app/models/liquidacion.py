@@ -22,3 +22,7 @@ class BD_LIQUIDACION(db.Model):
     fecha_creacion = db.Column(db.DateTime, default=datetime.now)
     usuario_modificador = db.Column(db.String(50))
     fecha_modificacion = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_liquidaciones_fecha_vendedor', 'fecha', 'codigo_vendedor'),
+    )
@@ -0,0 +1,23 @@
+# app/models/notificacion.py
+
+from datetime import datetime
+from app import db
+
+class BDNotificacion(db.Model):
+    """Bandeja de salida de mensajes de Telegram (la drena un worker)."""
+    __tablename__ = 'bd_notificaciones'
+
+    id              = db.Column(db.Integer, primary_key=True)
+    mensaje         = db.Column(db.Text, nullable=False)
+    # pendiente -> enviando -> enviada | fallida; omitida si se desactivan las notificaciones
+    estado          = db.Column(db.String(10), default='pendiente', nullable=False)
+    intentos        = db.Column(db.Integer, default=0, nullable=False)
+    proximo_intento = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    reclamada_en    = db.Column(db.DateTime, nullable=True)
+    enviada_en      = db.Column(db.DateTime, nullable=True)
+    ultimo_error    = db.Column(db.String(255), nullable=True)
+    created_at      = db.Column(db.DateTime, server_default=db.func.now(), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_notificaciones_estado_proximo', 'estado', 'proximo_intento'),
+    )
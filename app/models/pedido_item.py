@@ -14,6 +14,8 @@ class BDPedidoItem(db.Model):
     precio_unit  = db.Column(db.Numeric(10,2), nullable=False)
     subtotal     = db.Column(db.Numeric(12,2), nullable=False)
 
+    __table_args__ = (db.Index('ix_pedido_items_producto', 'producto_cod'),)
+
     pedido       = db.relationship(
                        'BDPedido',
                        back_populates='items'
@@ -12,6 +12,10 @@ class BDPedido(db.Model):
     comentarios      = db.Column(db.Text)
     usado            = db.Column(db.Boolean, default=False)
 
+    __table_args__   = (
+                          db.Index('ix_pedidos_vendedor_fecha', 'codigo_vendedor', 'fecha'),
+                       )
+
     items            = db.relationship(
                           'BDPedidoItem',
                           back_populates='pedido',
@@ -8,3 +8,5 @@ class Producto(db.Model):
     precio = db.Column(db.Float, nullable=False)
     categoria = db.Column(db.String(20), nullable=False)  # 'panadería' o 'bizcochería'
     activo = db.Column(db.Boolean, default=True, nullable=False)
+    orden = db.Column(db.Integer, default=9999, nullable=False)  # posición en los formularios
+    alias = db.Column(db.String(200))  # otros nombres con que se dicta, separados por coma
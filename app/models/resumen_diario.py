@@ -0,0 +1,28 @@
+# app/models/resumen_diario.py
+
+from app import db
+
+class BDResumenDiario(db.Model):
+    """
+    Tabla de hechos pre-agregada: una fila por día, vendedor, producto y
+    tipo de documento. Se mantiene desde app/utils/resumen_diario.py.
+    """
+    __tablename__ = 'bd_resumen_diario'
+
+    id              = db.Column(db.Integer, primary_key=True)
+    fecha           = db.Column(db.Date, nullable=False)
+    codigo_vendedor = db.Column(db.String(25), nullable=False)
+    producto_cod    = db.Column(db.String(20), nullable=False)
+    tipo_doc        = db.Column(db.String(12), nullable=False)  # pedido, extra, devolucion, despacho, venta
+    cantidad        = db.Column(db.Integer, nullable=False, default=0)
+    valor           = db.Column(db.Numeric(14,2), nullable=False, default=0)
+    comision        = db.Column(db.Numeric(14,2), nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('fecha', 'codigo_vendedor', 'producto_cod', 'tipo_doc',
+                            name='uq_resumen_diario'),
+        db.Index('ix_resumen_diario_tipo_fecha', 'tipo_doc', 'fecha'),
+    )
+
+    def __repr__(self):
+        return f"<BDResumenDiario {self.fecha} {self.codigo_vendedor} {self.producto_cod} {self.tipo_doc}>"
@@ -0,0 +1,15 @@
+# app/models/sesion_voz.py
+
+from app import db
+
+class BDSesionVoz(db.Model):
+    """Estado de una sesión de voz de Dialogflow (usuario y productos dictados)."""
+    __tablename__ = 'bd_sesiones_voz'
+
+    session_id = db.Column(db.String(100), primary_key=True)
+    datos      = db.Column(db.Text, nullable=False)        # JSON
+    expira     = db.Column(db.DateTime, nullable=False)    # se renueva en cada uso
+
+    __table_args__ = (
+        db.Index('ix_sesiones_voz_expira', 'expira'),
+    )
@@ -16,6 +16,8 @@ class BDVentaItem(db.Model):
     comision     = db.Column(db.Numeric(12,2), nullable=False)
     pagar_pan    = db.Column(db.Numeric(12,2), nullable=False)
 
+    __table_args__ = (db.Index('ix_venta_items_producto', 'producto_cod'),)
+
     venta        = db.relationship(
                        'BDVenta',
                        back_populates='items'
@@ -28,6 +28,10 @@ class BDVenta(db.Model):
     pagar_pan            = db.Column(db.Float, nullable=False)
     liquidada            = db.Column(db.Boolean, default=False)  
 
+    __table_args__       = (
+                              db.Index('ix_ventas_vendedor_fecha', 'codigo_vendedor', 'fecha'),
+                           )
+
     # Relación a los ítems de la venta
     items                = db.relationship(
                               'BDVentaItem',
@@ -0,0 +1,10 @@
+# app/models/version_datos.py
+
+from app import db
+
+class BDVersionDatos(db.Model):
+    """Sello de versión de datos cacheados en memoria (p. ej. 'catalogo')."""
+    __tablename__ = 'bd_versiones'
+
+    clave   = db.Column(db.String(30), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
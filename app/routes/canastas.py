@@ -226,31 +226,12 @@ def exportar_csv_canasta(codigo_barras):
 @rol_requerido('semiadmin', 'administrador')
 def canastas_perdidas():
     from datetime import datetime, timedelta
-    from sqlalchemy import func
+    from app.utils.canastas import canastas_perdidas as canastas_perdidas_desde
 
     limite_fecha = datetime.now() - timedelta(days=7)
 
-    # Subconsulta: obtener último movimiento "Sale" de cada canasta
-    subq = (db.session.query(
-                MovimientoCanasta.codigo_barras,
-                func.max(MovimientoCanasta.fecha_movimiento).label('fecha')
-            )
-            .filter(MovimientoCanasta.tipo_movimiento == 'Sale')
-            .group_by(MovimientoCanasta.codigo_barras)
-            .subquery())
-
-    # Consulta principal: canastas prestadas hace más de 7 días
-    canastas_data = (db.session.query(
-                        Canasta.codigo_barras,
-                        subq.c.fecha.label('fecha_prestamo'),
-                        Vendedor.nombre.label('nombre_vendedor')
-                    )
-                    .join(subq, Canasta.codigo_barras == subq.c.codigo_barras)
-                    .join(MovimientoCanasta, (MovimientoCanasta.codigo_barras == Canasta.codigo_barras) & (MovimientoCanasta.fecha_movimiento == subq.c.fecha))
-                    .join(Vendedor, MovimientoCanasta.codigo_vendedor == Vendedor.codigo_vendedor)
-                    .filter(Canasta.actualidad == 'Prestada')
-                    .filter(subq.c.fecha <= limite_fecha)
-                    .all())
+    # Canastas prestadas hace más de 7 días (estado actual de cada canasta)
+    canastas_data = canastas_perdidas_desde(limite_fecha)
 
     # Calcular días prestada en Python
     canastas = []
@@ -266,3 +247,30 @@ def canastas_perdidas():
     return render_template('canastas/canastas_perdidas.html', canastas=canastas)
 
 
+
+@bp_canastas.route('/canastas_perdidas/exportar_csv', methods=['GET'])
+@login_required
+@rol_requerido('semiadmin', 'administrador')
+def exportar_csv_canastas_perdidas():
+    from datetime import datetime, timedelta
+    from app.utils.canastas import canastas_perdidas as canastas_perdidas_desde
+
+    ahora = datetime.now()
+    canastas_data = canastas_perdidas_desde(ahora - timedelta(days=7))
+
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['Código', 'Fecha de Préstamo', 'Vendedor', 'Días Prestada'])
+
+    for c in sorted(canastas_data, key=lambda c: c.nombre_vendedor):
+        writer.writerow([
+            c.codigo_barras,
+            c.fecha_prestamo.strftime('%Y-%m-%d'),
+            c.nombre_vendedor,
+            (ahora - c.fecha_prestamo).days
+        ])
+
+    output.seek(0)
+    return Response(output.getvalue(),
+                    mimetype='text/csv',
+                    headers={"Content-Disposition": "attachment;filename=canastas_perdidas.csv"})
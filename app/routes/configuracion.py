@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_required
 from app import db
 from app.models.config_telegram import ConfiguracionTelegram
@@ -25,7 +25,8 @@ def configurar_telegram():
         activo = 'activo' in request.form
 
         # Intento de mensaje de prueba
-        url = f"https://api.telegram.org/bot{nuevo_token}/sendMessage"
+        api = current_app.config.get('TELEGRAM_API_URL', 'https://api.telegram.org').rstrip('/')
+        url = f"{api}/bot{nuevo_token}/sendMessage"
         payload = {
             "chat_id": nuevo_chat_id,
             "text": "✅ Prueba de conexión exitosa desde la app Incolpan.",
@@ -33,7 +34,7 @@ def configurar_telegram():
         }
 
         try:
-            response = requests.post(url, data=payload)
+            response = requests.post(url, data=payload, timeout=10)
             response.raise_for_status()  # Error si el token/chat_id es inválido
 
             # Guardar solo si fue exitoso
@@ -12,7 +12,8 @@ from app.models.extra_item import BDExtraItem
 from app.utils.roles import rol_requerido
 from app.models.vendedor import Vendedor
 from app.models.despachos import BDDespacho
-from app.utils.pdf_utils import generate_pdf_despacho
+from app.utils.pdf_utils import generate_pdf_despacho, huella_despacho
+from app.utils.pdf_cache import respuesta_pdf
 from flask import send_file
 
 despachos_bp = Blueprint('despachos', __name__)
@@ -21,9 +22,8 @@ despachos_bp = Blueprint('despachos', __name__)
 @login_required
 @rol_requerido('semiadmin', 'administrador')
 def crear_despacho(codigo_origen):
-    from app.models.producto import Producto
     from app.models.vendedor import Vendedor
-    from app.utils.productos import get_productos_ordenados
+    from app.utils.productos import producto_catalogo
     from markupsafe import Markup
 
     tipo_origen = 'pedido' if codigo_origen.startswith('PD-') else 'extra'
@@ -50,7 +50,7 @@ def crear_despacho(codigo_origen):
     if origen:
         vendedor = Vendedor.query.filter_by(codigo_vendedor=origen.codigo_vendedor).first()
         for it in items_origen:
-            producto = Producto.query.filter_by(codigo=it.producto_cod).first()
+            producto = producto_catalogo(it.producto_cod)
             items.append({
                 'producto_cod': it.producto_cod,
                 'nombre_producto': producto.nombre if producto else it.producto_cod,
@@ -58,14 +58,8 @@ def crear_despacho(codigo_origen):
                 'precio_unitario': float(producto.precio) if producto else 0
             })
 
-    productos = [
-        {'codigo': p.codigo, 'nombre': p.nombre, 'precio': float(p.precio)}
-        for p in get_productos_ordenados()
-    ]
-
     return render_template(
         "despachos/crear.html",
-        productos=productos,
         codigo_origen=codigo_origen,
         tipo_origen=tipo_origen,
         vendedor_cod=origen.codigo_vendedor if origen else None,
@@ -150,7 +144,7 @@ def editar_despacho(did):
     from decimal import Decimal
     from app.models.pedidos import BDPedido
     from app.models.extras import BDExtra
-    from app.utils.productos import get_productos_ordenados
+    from app.utils.productos import producto_catalogo
     from app.models.vendedor import Vendedor
 
     despacho = BDDespacho.query.get_or_404(did)
@@ -199,20 +193,14 @@ def editar_despacho(did):
         return redirect(url_for("despachos.listar_despachos"))
 
     # Si es GET: Mostrar los valores para edición
-    productos_base = get_productos_ordenados()
-    productos = [
-        {'codigo': p.codigo, 'nombre': p.nombre, 'precio': float(p.precio)}
-        for p in productos_base
-    ]
-
     vendedor = Vendedor.query.filter_by(codigo_vendedor=despacho.vendedor_cod).first()
 
     items = []
     for it in despacho.items:
-        prod = next((p for p in productos if p["codigo"] == it.producto_cod), None)
+        prod = producto_catalogo(it.producto_cod)
         items.append({
             'producto_cod': it.producto_cod,
-            'nombre_producto': prod['nombre'] if prod else it.producto_cod,
+            'nombre_producto': prod.nombre if prod else it.producto_cod,
             'precio_unitario': float(it.precio_unitario),
             'cantidad_pedida': it.cantidad_pedida,
             'cantidad_despachada': it.cantidad,
@@ -221,7 +209,6 @@ def editar_despacho(did):
 
     return render_template(
         'despachos/editar.html',
-        productos=productos,
         codigo_origen=despacho.codigo_origen,
         tipo_origen=despacho.tipo_origen,
         vendedor_cod=despacho.vendedor_cod,
@@ -240,7 +227,8 @@ def editar_despacho(did):
 @rol_requerido('semiadmin', 'administrador')
 def listar_despachos():
     from sqlalchemy import and_
-    from app.models.vendedor import Vendedor
+    from app.utils.documentos import totales_por_documento
+    from app.utils.vendedores import nombres_vendedores
 
     page = request.args.get('page', 1, type=int)
     filtro_fecha = request.args.get('fecha')
@@ -263,17 +251,11 @@ def listar_despachos():
     despachos = pagination.items
 
     # Obtener nombres de vendedores
-    codigos_vendedores = [d.vendedor_cod for d in despachos]
-    vendedores = {
-        v.codigo_vendedor: v.nombre
-        for v in Vendedor.query.filter(Vendedor.codigo_vendedor.in_(codigos_vendedores)).all()
-    }
-
-    # Calcular total de cada despacho sumando subtotales
-    totales = {
-        d.id: sum(item.subtotal for item in d.items)
-        for d in despachos
-    }
+    vendedores = nombres_vendedores()
+
+    # Calcular total de cada despacho sumando subtotales (una consulta agrupada)
+    totales = totales_por_documento(BDDespachoItem, BDDespachoItem.despacho_id, [d.id for d in despachos])
+    totales = {d.id: totales.get(d.id, 0) for d in despachos}
 
     return render_template(
         'despachos/listar.html',
@@ -315,15 +297,38 @@ def export_pdf_despacho(did):
     despacho = BDDespacho.query.get_or_404(did)
     vendedor = Vendedor.query.filter_by(codigo_vendedor=despacho.vendedor_cod).first()
 
-    pdf = generate_pdf_despacho(despacho, vendedor, tipo=despacho.tipo_origen)
-
-    return send_file(
-        BytesIO(pdf),
-        as_attachment=True,
-        download_name=f"{despacho.codigo_origen}_despacho.pdf",
-        mimetype='application/pdf'
+    return respuesta_pdf(
+        huella_despacho(despacho, vendedor, tipo=despacho.tipo_origen),
+        lambda: generate_pdf_despacho(despacho, vendedor, tipo=despacho.tipo_origen),
+        f"{despacho.codigo_origen}_despacho.pdf"
     )
 
 
+@despachos_bp.route('/despachos/impresion', methods=['GET'])
+@login_required
+@rol_requerido('semiadmin', 'administrador')
+def imprimir_despachos():
+    """Tirada de la mañana: todos los despachos del día en un PDF (o ZIP con uno por despacho)."""
+    from datetime import datetime
+    from app.utils.impresion import FORMATOS, tirada_despachos
+
+    formato = request.args.get('formato', 'pdf')
+    try:
+        fecha = datetime.strptime(request.args.get('fecha', ''), '%Y-%m-%d').date()
+    except ValueError:
+        fecha = date.today()
+    if formato not in FORMATOS:
+        formato = 'pdf'
+    vendedores = [v for v in request.args.getlist('vendedor') if v]
+
+    contenido, cantidad, _ = tirada_despachos(fecha, vendedores or None, formato)
+    if not cantidad:
+        flash(f"No hay despachos para el {fecha.strftime('%Y-%m-%d')}.", "warning")
+        return redirect(url_for('despachos.listar_despachos', fecha=fecha.isoformat()))
 
-
+    return send_file(
+        BytesIO(contenido),
+        as_attachment=True,
+        download_name=f"despachos_{fecha.isoformat()}.{formato}",
+        mimetype='application/pdf' if formato == 'pdf' else 'application/zip'
+    )
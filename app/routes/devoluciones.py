@@ -2,18 +2,20 @@ import datetime
 from datetime import date, datetime
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
-from flask import make_response, current_app
-from app.utils.pdf_utils import generate_pdf_document
+from flask import current_app
+from app.utils.pdf_utils import generate_pdf_document, huella_documento
+from app.utils.pdf_cache import respuesta_pdf
 from app.utils.notificaciones import notificar_accion
 
 
 from app import db
 from app.models.devoluciones     import BDDevolucion
 from app.models.devolucion_item  import BDDevolucionItem
-from app.models.producto         import Producto
 from app.models.vendedor         import Vendedor
 from app.utils.roles             import rol_requerido
-from app.utils.documentos        import generar_consecutivo
+from app.utils.documentos        import generar_consecutivo, totales_por_documento
+from app.utils.vendedores        import nombres_vendedores
+from app.utils.productos         import producto_catalogo
 
 devoluciones_bp = Blueprint('devoluciones', __name__, url_prefix='/devoluciones')
 
@@ -21,11 +23,8 @@ devoluciones_bp = Blueprint('devoluciones', __name__, url_prefix='/devoluciones'
 @login_required
 @rol_requerido('administrador', 'semiadmin', 'vendedor')
 def crear_devolucion():
-    from app.utils.productos import get_productos_ordenados
     from app.utils.notificaciones import notificar_accion
 
-    productos = get_productos_ordenados()
-
     vendedores = None
     if current_user.rol in ['administrador', 'semiadmin']:
         vendedores = Vendedor.query.order_by(Vendedor.nombre).all()
@@ -77,7 +76,7 @@ def crear_devolucion():
                 usos=0
             )
             for it in items:
-                prod = Producto.query.filter_by(codigo=it['codigo']).first()
+                prod = producto_catalogo(it['codigo'])
                 pu = prod.precio if prod else 0
                 dev.items.append(
                     BDDevolucionItem(
@@ -102,7 +101,6 @@ def crear_devolucion():
 
     return render_template(
         'devoluciones/crear.html',
-        productos=productos,
         vendedores=vendedores,
         fecha_val=fecha_val,
         selected_vendedor=selected_v,
@@ -116,11 +114,9 @@ def crear_devolucion():
 @login_required
 @rol_requerido('administrador')
 def editar_devolucion(did):
-    from app.utils.productos import get_productos_ordenados
     from app.utils.notificaciones import notificar_accion
 
     dev = BDDevolucion.query.get_or_404(did)
-    productos = get_productos_ordenados()
     vendedores = Vendedor.query.order_by(Vendedor.nombre).all()
     items = [
         {
@@ -147,7 +143,7 @@ def editar_devolucion(did):
 
         for c, q in zip(cods, cants):
             if c and q:
-                prod = Producto.query.filter_by(codigo=c).first()
+                prod = producto_catalogo(c)
                 pu = prod.precio if prod else 0
                 dev.items.append(
                     BDDevolucionItem(
@@ -170,7 +166,6 @@ def editar_devolucion(did):
     return render_template(
         'devoluciones/editar.html',
         devolucion=dev,
-        productos=productos,
         vendedores=vendedores,
         items=items
     )
@@ -198,13 +193,12 @@ def listar_devoluciones():
 
     paginacion = q.order_by(BDDevolucion.fecha.desc()).paginate(page=page, per_page=30)
 
+    totales = totales_por_documento(BDDevolucionItem, BDDevolucionItem.devolucion_id,
+                                    [d.id for d in paginacion.items])
     for d in paginacion.items:
-        d.total = sum(item.subtotal for item in d.items)
+        d.total = totales.get(d.id, 0)
 
-    vendedores_map = {
-        v.codigo_vendedor: v.nombre
-        for v in Vendedor.query.all()
-    }
+    vendedores_map = nombres_vendedores()
 
     return render_template(
         'devoluciones/listar.html',
@@ -240,11 +234,9 @@ def export_pdf_devolucion(dev_id):
     devol = BDDevolucion.query.get_or_404(dev_id)
     vendedor = Vendedor.query.filter_by(codigo_vendedor=devol.codigo_vendedor).first()
     logo = current_app.root_path + '/static/logo_incolpan.png'
-    pdf_bytes = generate_pdf_document(devol, vendedor, logo, tipo='devolucion')
-    resp = make_response(pdf_bytes)
-    resp.headers['Content-Type'] = 'application/pdf'
-    resp.headers['Content-Disposition'] = (
-        f'attachment; filename=Devolucion_{devol.consecutivo}.pdf'
+    return respuesta_pdf(
+        huella_documento(devol, vendedor, 'devolucion'),
+        lambda: generate_pdf_document(devol, vendedor, logo, tipo='devolucion'),
+        f'Devolucion_{devol.consecutivo}.pdf'
     )
-    return resp
 
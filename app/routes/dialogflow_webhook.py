@@ -1,16 +1,24 @@
 # app/routes/dialogflow_webhook.py
 
-from flask import Blueprint, request, jsonify, session
-from app.extensions import db, socketio
+import time
+
+from flask import Blueprint, request, jsonify, session, url_for, g
+from app.extensions import db
+from app.utils.socket_session import emitir_a_sesion
+from app.utils.sesiones_voz import sesiones_voz
+from app.utils.resolver_productos import indice_productos
+from app.utils.despachos import DespachoExistente, guardar_despacho_dictado
 from app.models.usuario import Usuario
 from app.models.pedidos import BDPedido
 from app.models.extras import BDExtra
-from app.models.producto import Producto
 from app.models.despachos import BDDespacho
 from datetime import datetime
 
 dialogflow_cx_bp = Blueprint("dialogflow_cx", __name__)
-session_data = {}
+
+# Tags que atiende el webhook (los demás se cuentan como 'desconocido' en /metrics)
+TAGS = ("iniciar_sesion", "crear_despacho", "dictar_producto", "confirmar_despacho",
+        "guardar_despacho", "cerrar_sesion")
 
 @dialogflow_cx_bp.route("/webhook", methods=["POST"])
 def webhook_cx():
@@ -18,6 +26,7 @@ def webhook_cx():
     tag = req.get("fulfillmentInfo", {}).get("tag", "")
     session_id = req.get("sessionInfo", {}).get("session", "").split("/")[-1]
     params = req.get("sessionInfo", {}).get("parameters", {})
+    g.webhook_tag = tag if tag in TAGS else "desconocido"
 
     print(f"🎯 Tag recibido: {tag}")
     print("[📦 Parámetros crudos recibidos]", params)
@@ -39,12 +48,12 @@ def webhook_cx():
         if not usuario.check_pin(pin):
             return responder(f"El PIN ingresado no es correcto para {nombre}. Intenta nuevamente.")
 
-        session_data[session_id] = {
+        sesiones_voz().guardar(session_id, {
             "usuario_id": usuario.id,
             "nombre": usuario.nombre_usuario,
             "productos": [],
-            "timestamp": datetime.utcnow()
-        }
+            "timestamp": datetime.utcnow().isoformat()
+        })
 
         session["session_id"] = session_id
         print(f"[✅ Sesión iniciada] session_id='{session_id}' asociado a usuario_id={usuario.id}")
@@ -74,62 +83,189 @@ def webhook_cx():
         if not documento:
             return responder(f"No encontré el {tipo} con número {numero}.")
 
+        # Lo que se dicte desde aquí es para este documento
+        sesiones = sesiones_voz()
+        datos_sesion = sesiones.obtener(session_id) or {}
+        datos_sesion["documento"] = {"codigo_origen": consecutivo, "tipo": tipo}
+        datos_sesion["productos"] = []
+        sesiones.guardar(session_id, datos_sesion)
+
         despacho_existente = BDDespacho.query.filter_by(codigo_origen=consecutivo).first()
         if despacho_existente:
             url = f"/despachos/editar/{despacho_existente.id}?session_id={session_id}"
         else:
             url = f"/despachos/crear/{consecutivo}?session_id={session_id}"
             
-        socketio.emit("abrir_pagina", {"url": url, "usuario": session_id})
+        emitir_a_sesion("abrir_pagina", {"url": url, "usuario": session_id}, session_id)
         return responder(
             f"{'Ya existe un despacho para' if despacho_existente else 'Preparando despacho para'} el {tipo} {consecutivo}."
         )
 
-    # 🎙️ DICTAR PRODUCTO
+    # 🎙️ DICTAR PRODUCTO(S): uno o varios en la misma frase
     if tag == "dictar_producto":
-        nombre_prod = params.get("producto", "").strip()
-        cantidad = params.get("cantidad", 0)
-        lote = str(params.get("lote", "")).strip()
+        lineas = lineas_dictadas(params)
+        if not lineas:
+            return responder("No escuché ningún producto. Intenta de nuevo.")
 
-        producto = Producto.query.filter(
-            (Producto.nombre.ilike(nombre_prod)) | (Producto.codigo.ilike(nombre_prod))
-        ).first()
+        indice = indice_productos()
+        dictados, dudas, sin_cantidad = [], [], []
+        for nombre_prod, cantidad, lote in lineas:
+            if cantidad is None:
+                sin_cantidad.append(nombre_prod)
+                continue
+            producto, candidatos = indice.resolver(nombre_prod)
+            if producto:
+                dictados.append({
+                    "codigo": producto.codigo,
+                    "nombre": producto.nombre,
+                    "cantidad": cantidad,
+                    "lote": lote
+                })
+            else:
+                dudas.append((nombre_prod, candidatos))
 
-        if not producto:
-            return responder(f"No encontré el producto {nombre_prod}. Intenta de nuevo.")
-
-        if session_id not in session_data:
-            session_data[session_id] = {"productos": []}
+        if dictados:
+            sesiones = sesiones_voz()
+            datos_sesion = sesiones.obtener(session_id) or {"productos": []}
+            datos_sesion["productos"].extend(dictados)
+            sesiones.guardar(session_id, datos_sesion)
 
-        data_producto = {
-            "codigo": producto.codigo,
-            "nombre": producto.nombre,
-            "cantidad": cantidad,
-            "lote": lote
-        }
+            print(f"[📤 Emitiendo a Socket.IO] session_id={session_id} productos={len(dictados)}")
+            emitir_a_sesion("productos_dictados", {"productos": dictados}, session_id)
 
-        session_data[session_id]["productos"].append(data_producto)
-
-        print(f"[📤 Emitiendo a Socket.IO] session_id={session_id} producto={data_producto}")
-        socketio.emit("producto_dictado", {"producto": data_producto}, room=session_id)
+        if len(lineas) == 1:
+            if sin_cantidad:
+                return responder(f"No entendí la cantidad de {sin_cantidad[0]}. Repite el producto con su cantidad.")
+            if dictados:
+                p = dictados[0]
+                return responder(f"Agregado {p['cantidad']} unidades de {p['nombre']} del lote {p['lote']}.")
+            nombre_prod, candidatos = dudas[0]
+            if candidatos:
+                return responder(f"¿Te refieres a {opciones(candidatos)}? Repite el producto, por favor.")
+            return responder(f"No encontré el producto {nombre_prod}. Intenta de nuevo.")
 
-        return responder(f"Agregado {cantidad} unidades de {producto.nombre} del lote {lote}.")
+        partes = []
+        if dictados:
+            partes.append(f"Agregados {len(dictados)} productos.")
+        for nombre_prod, candidatos in dudas:
+            if candidatos:
+                partes.append(f"No estoy seguro de {nombre_prod}: ¿{opciones(candidatos)}?")
+            else:
+                partes.append(f"No encontré {nombre_prod}.")
+        for nombre_prod in sin_cantidad:
+            partes.append(f"No entendí la cantidad de {nombre_prod}.")
+        if dudas or sin_cantidad:
+            partes.append("Repite solo esos, por favor.")
+        return responder(" ".join(partes))
 
     # ✅ CONFIRMAR DESPACHO
     if tag == "confirmar_despacho":
-        productos = session_data.get(session_id, {}).get("productos", [])
+        productos = (sesiones_voz().obtener(session_id) or {}).get("productos", [])
         if not productos:
             return responder("No hay productos para guardar. Dicta al menos uno.")
         resumen = "\n".join([f"- {p['cantidad']} de {p['nombre']} (lote {p['lote']})" for p in productos])
         return responder(f"¿Confirmas guardar este despacho con:\n{resumen}?")
 
+    # 💾 GUARDAR DESPACHO: lo dictado queda en la BD sin pasar por el formulario
+    if tag == "guardar_despacho":
+        sesiones = sesiones_voz()
+        datos_sesion = sesiones.obtener(session_id) or {}
+        documento = datos_sesion.get("documento")
+        productos = datos_sesion.get("productos", [])
+
+        usuario = Usuario.query.filter_by(id=datos_sesion.get("usuario_id")).first()
+        if not usuario or usuario.rol not in ("semiadmin", "administrador"):
+            return responder("Tu usuario no tiene permiso para guardar despachos.")
+        if not documento:
+            return responder("Primero dime qué pedido o extra vas a despachar.")
+        if not productos:
+            return responder("No hay productos para guardar. Dicta al menos uno.")
+
+        inicio = time.perf_counter()
+        try:
+            # Reemplazar un despacho existente es editarlo: solo administrador, como en la web
+            resultado = guardar_despacho_dictado(documento["codigo_origen"], documento["tipo"], productos,
+                                                 reemplazar=usuario.rol == "administrador")
+        except DespachoExistente:
+            return responder(f"El {documento['tipo']} {documento['codigo_origen']} ya tiene despacho. "
+                             "Solo un administrador puede modificarlo.")
+        if resultado is None:
+            return responder(f"No encontré el {documento['tipo']} {documento['codigo_origen']}.")
+        print(f"[💾 Despacho guardado] {resultado} en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+        datos_sesion.pop("documento")
+        datos_sesion["productos"] = []
+        sesiones.guardar(session_id, datos_sesion)
+
+        emitir_a_sesion("despacho_guardado", {
+            "id": resultado["id"],
+            "codigo_origen": resultado["codigo_origen"],
+            "url": url_for("despachos.listar_despachos"),
+        }, session_id)
+        return responder(
+            f"Despacho del {documento['tipo']} {resultado['codigo_origen']} "
+            f"{'guardado' if resultado['nuevo'] else 'actualizado'} con {resultado['items']} productos."
+        )
+
     # 🚪 CERRAR SESIÓN
     if tag == "cerrar_sesion":
-        session_data.pop(session_id, None)
+        sesiones_voz().borrar(session_id)
         return responder("Sesión finalizada. Hasta luego.")
 
     return responder("No entendí la instrucción.")
 
+def lineas_dictadas(params):
+    """
+    [(producto, cantidad, lote)] de la frase. Acepta, en este orden:
+      - 'productos': lista de entidades compuestas {producto, cantidad, lote};
+      - 'producto', 'cantidad' y 'lote' como listas paralelas (el último lote
+        dicho vale para los productos siguientes);
+      - 'producto', 'cantidad' y 'lote' sueltos (un solo producto).
+    La cantidad queda en None si no es un entero no negativo (Dialogflow
+    manda 3.0 por 3, pero también puede mandar texto o 2.5).
+    """
+    compuestos = params.get("productos")
+    if isinstance(compuestos, list) and compuestos:
+        lineas, lote = [], ""
+        for item in compuestos:
+            if not isinstance(item, dict):
+                continue
+            lote = str(item.get("lote") or lote).strip()
+            lineas.append((str(item.get("producto", "")).strip(), cantidad_dictada(item.get("cantidad", 0)), lote))
+        return [linea for linea in lineas if linea[0]]
+
+    def como_lista(valor):
+        return valor if isinstance(valor, list) else [valor]
+
+    nombres = [str(n).strip() for n in como_lista(params.get("producto", ""))]
+    cantidades = como_lista(params.get("cantidad", 0))
+    lotes = [str(l).strip() for l in como_lista(params.get("lote", ""))]
+    lineas = []
+    for i, nombre in enumerate(nombres):
+        cantidad = cantidad_dictada(cantidades[i] if i < len(cantidades) else 0)
+        lote = lotes[min(i, len(lotes) - 1)] if lotes else ""
+        if nombre:
+            lineas.append((nombre, cantidad, lote))
+    return lineas
+
+def cantidad_dictada(valor):
+    """Cantidad como int, o None si no es un entero no negativo (3.0 y "3" valen 3)."""
+    if isinstance(valor, bool):
+        return None
+    try:
+        numero = float(str(valor).strip().replace(",", ".")) if isinstance(valor, str) else float(valor)
+    except (TypeError, ValueError):
+        return None
+    # Tope del INTEGER de la BD: lo demás es un error de transcripción
+    if not numero.is_integer() or not 0 <= numero < 2 ** 31:
+        return None
+    return int(numero)
+
+def opciones(candidatos):
+    """'A, B o C' con los nombres de los candidatos."""
+    nombres = [c.producto.nombre for c in candidatos]
+    return " o ".join(filter(None, [", ".join(nombres[:-1]), nombres[-1]]))
+
 def responder(mensaje):
     return jsonify({
         "fulfillment_response": {
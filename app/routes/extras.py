@@ -5,18 +5,20 @@ from datetime import date
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from datetime import date, datetime  # Corregido para usar datetime.strptime
-from flask import make_response, current_app
-from app.utils.pdf_utils import generate_pdf_document
+from flask import current_app
+from app.utils.pdf_utils import generate_pdf_document, huella_documento
+from app.utils.pdf_cache import respuesta_pdf
 from app.utils.notificaciones import notificar_accion
 
 
 from app import db
 from app.models.extras import BDExtra
 from app.models.extra_item import BDExtraItem
-from app.models.producto import Producto
 from app.models.vendedor import Vendedor
 from app.utils.roles import rol_requerido
-from app.utils.documentos import generar_consecutivo
+from app.utils.documentos import generar_consecutivo, totales_por_documento
+from app.utils.vendedores import nombres_vendedores
+from app.utils.productos import producto_catalogo
 
 extras_bp = Blueprint('extras', __name__, url_prefix='/extras')
 
@@ -24,10 +26,8 @@ extras_bp = Blueprint('extras', __name__, url_prefix='/extras')
 @login_required
 @rol_requerido('administrador', 'semiadmin', 'vendedor')
 def crear_extra():
-    from app.utils.productos import get_productos_ordenados
     from app.utils.notificaciones import notificar_accion
 
-    productos = get_productos_ordenados()
     vendedores = None
     if current_user.rol in ['administrador', 'semiadmin']:
         vendedores = Vendedor.query.order_by(Vendedor.nombre).all()
@@ -82,7 +82,7 @@ def crear_extra():
             db.session.flush()
 
             for it in items:
-                prod = Producto.query.filter_by(codigo=it['codigo']).first()
+                prod = producto_catalogo(it['codigo'])
                 pu = prod.precio if prod else 0
                 db.session.add(BDExtraItem(
                     extra_id=nuevo.id,
@@ -106,7 +106,6 @@ def crear_extra():
 
     return render_template(
         'extras/crear.html',
-        productos=productos,
         vendedores=vendedores,
         fecha_val=fecha_val,
         selected_vendedor=selected_vendedor,
@@ -139,11 +138,12 @@ def listar_extras():
 
     paginacion = query.order_by(BDExtra.fecha.desc()).paginate(page=page, per_page=30)
 
-    vendedores_map = {v.codigo_vendedor: v.nombre for v in Vendedor.query.all()}
+    vendedores_map = nombres_vendedores()
 
-    # Calcular total por cada extra mostrado en la página actual
+    # Calcular total por cada extra mostrado en la página actual (una consulta agrupada)
+    totales = totales_por_documento(BDExtraItem, BDExtraItem.extra_id, [ex.id for ex in paginacion.items])
     for ex in paginacion.items:
-        ex.total = sum(i.subtotal for i in ex.items)
+        ex.total = totales.get(ex.id, 0)
 
     return render_template(
         'extras/listar.html',
@@ -157,11 +157,9 @@ def listar_extras():
 @extras_bp.route('/editar/<int:eid>', methods=['GET', 'POST'])
 @rol_requerido('administrador')
 def editar_extra(eid):
-    from app.utils.productos import get_productos_ordenados
     from app.utils.notificaciones import notificar_accion
 
     extra = BDExtra.query.get_or_404(eid)
-    productos = get_productos_ordenados()
     vendedores = Vendedor.query.all()
 
     if request.method == 'POST':
@@ -169,13 +167,13 @@ def editar_extra(eid):
         extra.fecha = datetime.strptime(request.form['fecha'], '%Y-%m-%d').date()
         extra.comentarios = request.form['comentarios']
 
-        BDExtraItem.query.filter_by(extra_id=extra.id).delete()
+        extra.items.clear()
 
         codigos = request.form.getlist('producto')
         cantidades = request.form.getlist('cantidad')
 
         for codigo, cantidad_str in zip(codigos, cantidades):
-            producto = Producto.query.filter_by(codigo=codigo).first()
+            producto = producto_catalogo(codigo)
             if producto and cantidad_str:
                 cantidad = int(cantidad_str)
                 precio_unit = producto.precio
@@ -201,7 +199,7 @@ def editar_extra(eid):
 
     items = []
     for i in extra.items:
-        producto = Producto.query.filter_by(codigo=i.producto_cod).first()
+        producto = producto_catalogo(i.producto_cod)
         if producto:
             items.append({
                 'codigo': i.producto_cod,
@@ -214,7 +212,6 @@ def editar_extra(eid):
     return render_template(
         'extras/editar.html',
         extra=extra,
-        productos=productos,
         vendedores=vendedores,
         items=items
     )
@@ -246,10 +243,8 @@ def export_pdf_extra(ext_id):
     extra = BDExtra.query.get_or_404(ext_id)
     vendedor = Vendedor.query.filter_by(codigo_vendedor=extra.codigo_vendedor).first()
     logo = current_app.root_path + '/static/logo_incolpan.png'
-    pdf_bytes = generate_pdf_document(extra, vendedor, logo, tipo='extra')
-    resp = make_response(pdf_bytes)
-    resp.headers['Content-Type'] = 'application/pdf'
-    resp.headers['Content-Disposition'] = (
-        f'attachment; filename=Extra_{extra.consecutivo}.pdf'
+    return respuesta_pdf(
+        huella_documento(extra, vendedor, 'extra'),
+        lambda: generate_pdf_document(extra, vendedor, logo, tipo='extra'),
+        f'Extra_{extra.consecutivo}.pdf'
     )
-    return resp
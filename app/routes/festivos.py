@@ -3,6 +3,7 @@ from flask_login import login_required
 from app import db
 from app.models.festivo import Festivo
 from app.utils.roles import rol_requerido
+from app.utils.fechas import invalidar_calendario
 from datetime import datetime
 from datetime import date
 
@@ -34,6 +35,7 @@ def crear_festivo():
             nuevo = Festivo(fecha=fecha, nota=nota)
             db.session.add(nuevo)
             db.session.commit()
+            invalidar_calendario()
             flash("Festivo creado.", "success")
             return redirect(url_for('festivos.listar_festivos'))
 
@@ -61,6 +63,7 @@ def editar_festivo(id):
             festivo.fecha = fecha
             festivo.nota  = nota
             db.session.commit()
+            invalidar_calendario()
             flash("Festivo actualizado.", "success")
             return redirect(url_for('festivos.listar_festivos'))
 
@@ -73,6 +76,7 @@ def eliminar_festivo(id):
     festivo = Festivo.query.get_or_404(id)
     db.session.delete(festivo)
     db.session.commit()
+    invalidar_calendario()
     flash("Festivo eliminado.", "success")
     return redirect(url_for('festivos.listar_festivos'))
 
@@ -7,12 +7,12 @@ from app.models.liquidacion import BD_LIQUIDACION
 from app.models.ventas import BDVenta
 from app.models.vendedor import Vendedor
 from app.utils.roles import rol_requerido
-from app.utils.pdf_utils import generate_liquidacion_pdf
+from app.utils.pdf_utils import generate_liquidacion_pdf, huella_liquidacion
+from app.utils.pdf_cache import respuesta_pdf
 from datetime import datetime
-from flask import send_file
-from io import BytesIO
 from app.models.cambio import BD_CAMBIO
 from app.utils.notificaciones import notificar_accion
+from app.utils.documentos import generar_consecutivo
 
 liquidaciones_bp = Blueprint('liquidaciones', __name__, url_prefix='/liquidaciones')
 
@@ -99,9 +99,7 @@ def crear_liquidacion():
                            vendedor_codigo=vendedor_codigo)
 
 def generar_codigo_liquidacion():
-    last = BD_LIQUIDACION.query.order_by(BD_LIQUIDACION.id.desc()).first()
-    next_id = 1 if not last else last.id + 1
-    return f"LQ-{str(next_id).zfill(5)}"
+    return generar_consecutivo(BD_LIQUIDACION, 'LQ')
 
 @liquidaciones_bp.route('/listar')
 @login_required
@@ -232,13 +230,11 @@ def exportar_liquidacion_pdf(id):
     # Buscar cambio si lo hay
     cambio = BD_CAMBIO.query.filter_by(fecha=liquidacion.fecha, codigo_vendedor=liquidacion.codigo_vendedor).first()
 
-    # Generar PDF usando tu función optimizada
-    pdf_file = generate_liquidacion_pdf(liquidacion, vendedor, venta, cambio)
-
-    # Retornar archivo PDF
-    return send_file(pdf_file,
-                     download_name=f"{liquidacion.codigo}.pdf",
-                     as_attachment=True,
-                     mimetype='application/pdf')
+    # PDF desde la caché (o 304 si el cliente ya tiene esta versión)
+    return respuesta_pdf(
+        huella_liquidacion(liquidacion, vendedor, venta, cambio),
+        lambda: generate_liquidacion_pdf(liquidacion, vendedor, venta, cambio).getvalue(),
+        f"{liquidacion.codigo}.pdf"
+    )
  
     
\ No newline at end of file
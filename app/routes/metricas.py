@@ -0,0 +1,18 @@
+# app/routes/metricas.py
+import hmac
+
+from flask import Blueprint, Response, abort, current_app, request
+
+from app.utils.metricas import exponer_metricas
+
+# Solo se registra con METRICAS=1 y METRICAS_TOKEN (ver registrar_metricas)
+metricas_bp = Blueprint('metricas', __name__)
+
+
+@metricas_bp.route('/metrics', methods=['GET'])
+def metrics():
+    # Sin sesión de usuario: lo consulta Prometheus con "Authorization: Bearer <token>"
+    token = current_app.config.get('METRICAS_TOKEN')
+    if not token or not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        abort(403)
+    return Response(exponer_metricas(), mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
 from flask_login import login_required, current_user
 from flask import send_file, Response
 from app import db
@@ -7,6 +7,7 @@ from app.models.canastas import Canasta, MovimientoCanasta
 from app.models.vendedor import Vendedor
 from datetime import datetime
 from app.utils.roles         import rol_requerido
+from app.utils.canastas      import registrar_movimientos, limpiar_estado_canastas, TIPOS_MOVIMIENTO
 
 bp_movimientos = Blueprint('movimientos', __name__, template_folder='../templates')
 
@@ -29,49 +30,20 @@ def registrar_movimiento():
             if not vendedor:
                 flash('Vendedor no encontrado.', 'danger')
             else:
-                canasta = Canasta.query.filter_by(codigo_barras=codigo_barras).first()
-                if not canasta:
-                    flash('Canasta no encontrada.', 'danger')
+                resultado = registrar_movimientos(vendedor.codigo_vendedor, tipo, [codigo_barras])[0]
+                if not resultado['ok']:
+                    flash(resultado['mensaje'], 'danger')
                 else:
-                    # Validar movimientos anteriores
-                    ultima = MovimientoCanasta.query.filter_by(codigo_barras=codigo_barras).order_by(MovimientoCanasta.fecha_movimiento.desc()).first()
-
-                    if tipo == 'Entra' and not ultima:
-                        flash('No se ha registrado ningún movimiento para esta canasta, no se puede devolver.', 'danger')
-                    elif ultima and tipo == 'Entra' and ultima.codigo_vendedor != vendedor.codigo_vendedor:
-                        flash('Esta canasta ha sido prestada a otro vendedor. No puedes devolverla.', 'danger')
-                    elif tipo == 'Sale' and canasta.actualidad == 'Prestada':
-                        flash('Esta canasta ya ha sido prestada.', 'danger')
-                    elif tipo == 'Entra' and canasta.actualidad == 'Disponible':
-                        flash('Esta canasta no ha sido prestada.', 'danger')
-                    else:
-                        # Registrar movimiento
-                        nuevo_mov = MovimientoCanasta(
-                            codigo_vendedor=vendedor.codigo_vendedor,
-                            tipo_movimiento=tipo,
-                            codigo_barras=codigo_barras,
-                            fecha_movimiento=datetime.now()
-                        )
-                        db.session.add(nuevo_mov)
-
-                        # Actualizar actualidad de la canasta
-                        if tipo == 'Sale':
-                            canasta.actualidad = 'Prestada'
-                        elif tipo == 'Entra':
-                            canasta.actualidad = 'Disponible'
-
-                        db.session.commit()
-
-                        flash('Movimiento registrado correctamente.', 'success')
-
-                        # Mantener datos en sesión
-                        if vendedor_nombre != session.get('vendedor_seleccionado') or tipo != session.get('tipo_seleccionado'):
-                            session['contador_registros'] = 0
-
-                        session['vendedor_seleccionado'] = vendedor_nombre
-                        session['tipo_seleccionado'] = tipo
-                        session['codigo_barras'] = ''
-                        session['contador_registros'] += 1
+                    flash(resultado['mensaje'], 'success')
+
+                    # Mantener datos en sesión
+                    if vendedor_nombre != session.get('vendedor_seleccionado') or tipo != session.get('tipo_seleccionado'):
+                        session['contador_registros'] = 0
+
+                    session['vendedor_seleccionado'] = vendedor_nombre
+                    session['tipo_seleccionado'] = tipo
+                    session['codigo_barras'] = ''
+                    session['contador_registros'] += 1
 
         return redirect(url_for('movimientos.registrar_movimiento'))
 
@@ -91,6 +63,49 @@ def registrar_movimiento():
                            contador_registros=session['contador_registros'],
                            movimientos=movimientos)
 
+@bp_movimientos.route('/movimientos/api/escanear', methods=['POST'])
+@login_required
+@rol_requerido('semiadmin','administrador')
+def api_escanear():
+    """
+    Registra uno o varios códigos sin recargar la página.
+    JSON: {"vendedor": nombre o código, "tipo": "Sale"|"Entra",
+           "codigos": [...]} (o "codigo": "..." para uno solo).
+    """
+    datos = request.get_json(silent=True) or {}
+    vendedor_ref = (datos.get('vendedor') or '').strip()
+    tipo = datos.get('tipo')
+    codigos = datos.get('codigos')
+    if codigos is None:
+        codigos = [datos.get('codigo')] if datos.get('codigo') else []
+
+    if not vendedor_ref or tipo not in TIPOS_MOVIMIENTO or not isinstance(codigos, list) or not codigos:
+        return jsonify({'error': 'Todos los campos son obligatorios.'}), 400
+
+    vendedor = Vendedor.query.filter(
+        (Vendedor.codigo_vendedor == vendedor_ref) | (Vendedor.nombre == vendedor_ref)
+    ).first()
+    if not vendedor:
+        return jsonify({'error': 'Vendedor no encontrado.'}), 404
+
+    resultados = registrar_movimientos(vendedor.codigo_vendedor, tipo, [str(c) for c in codigos if c is not None])
+    registrados = sum(1 for r in resultados if r['ok'])
+
+    # El contador de la página sigue funcionando igual que con el formulario
+    if vendedor.nombre != session.get('vendedor_seleccionado') or tipo != session.get('tipo_seleccionado'):
+        session['contador_registros'] = 0
+    session['vendedor_seleccionado'] = vendedor.nombre
+    session['tipo_seleccionado'] = tipo
+    session['contador_registros'] = session.get('contador_registros', 0) + registrados
+
+    return jsonify({
+        'vendedor': vendedor.nombre,
+        'tipo': tipo,
+        'registrados': registrados,
+        'contador_registros': session['contador_registros'],
+        'resultados': resultados
+    })
+
 @bp_movimientos.route('/informe_movimientos', methods=['GET'])
 @login_required
 @rol_requerido('semiadmin', 'administrador')
@@ -214,7 +229,6 @@ def informe_vendedores():
 @rol_requerido('semiadmin', 'administrador')
 def resumen_canastas_vendedor():
     from sqlalchemy import func
-    from sqlalchemy.orm import aliased
 
     # Lista de vendedores para el formulario
     vendedores = Vendedor.query.order_by(Vendedor.nombre.asc()).all()
@@ -231,31 +245,14 @@ def resumen_canastas_vendedor():
             flash('Vendedor no encontrado', 'danger')
             return render_template('vendedores/resumen_canastas.html', vendedores=vendedores, canastas=[], resumen=[])
 
-        # Aliased para representar el último movimiento por canasta
-        UltimoMov = aliased(MovimientoCanasta)
-
-        # Subconsulta: ID del último movimiento por cada canasta
-        subconsulta = (
-            db.session.query(
-                func.max(MovimientoCanasta.id).label('ultimo_id')
-            )
-            .group_by(MovimientoCanasta.codigo_barras)
-            .subquery()
-        )
-
-        # Consulta principal: resumen de canastas prestadas actualmente por ese vendedor
+        # Canastas que tiene actualmente el vendedor (estado desnormalizado en Canasta)
         resumen = (
             db.session.query(
                 Canasta.tamaño,
                 Canasta.color,
                 func.count().label('cantidad')
             )
-            .join(UltimoMov, Canasta.codigo_barras == UltimoMov.codigo_barras)
-            .filter(
-                UltimoMov.id.in_(subconsulta),
-                UltimoMov.tipo_movimiento == 'Sale',
-                UltimoMov.codigo_vendedor == vendedor.codigo_vendedor
-            )
+            .filter(Canasta.vendedor_actual == vendedor.codigo_vendedor)
             .group_by(Canasta.tamaño, Canasta.color)
             .all()
         )
@@ -266,15 +263,10 @@ def resumen_canastas_vendedor():
                 Canasta.codigo_barras,
                 Canasta.tamaño,
                 Canasta.color,
-                UltimoMov.fecha_movimiento
-            )
-            .join(UltimoMov, Canasta.codigo_barras == UltimoMov.codigo_barras)
-            .filter(
-                UltimoMov.id.in_(subconsulta),
-                UltimoMov.tipo_movimiento == 'Sale',
-                UltimoMov.codigo_vendedor == vendedor.codigo_vendedor
+                Canasta.fecha_prestamo.label('fecha_movimiento')
             )
-            .order_by(UltimoMov.fecha_movimiento.desc())
+            .filter(Canasta.vendedor_actual == vendedor.codigo_vendedor)
+            .order_by(Canasta.fecha_prestamo.desc())
             .all()
         )
 
@@ -333,7 +325,7 @@ def informe_canastas_prestadas_por_vendedor():
 def borrar_movimientos():
     try:
         db.session.execute(text('DELETE FROM movimientos'))
-        db.session.execute(text('UPDATE canastas SET actualidad = "Disponible"'))
+        limpiar_estado_canastas()
         db.session.commit()
         flash('✔ Todos los movimientos han sido borrados y las canastas se actualizaron a "Disponible".', 'success')
     except Exception as e:
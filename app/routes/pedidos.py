@@ -1,18 +1,19 @@
 from datetime import date, datetime
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
-from flask import make_response, current_app
-from app.utils.pdf_utils import generate_pdf_document
+from flask import current_app
+from app.utils.pdf_utils import generate_pdf_document, huella_documento
+from app.utils.pdf_cache import respuesta_pdf
 
 from app import db
 from app.models.pedidos     import BDPedido
 from app.models.pedido_item import BDPedidoItem
-from app.models.producto    import Producto
 from app.models.vendedor    import Vendedor
 from app.utils.roles        import rol_requerido
-from app.utils.documentos   import generar_consecutivo
+from app.utils.documentos   import generar_consecutivo, totales_por_documento
+from app.utils.vendedores   import nombres_vendedores
 from app.utils.notificaciones import notificar_accion
-from app.utils.productos import get_productos_ordenados
+from app.utils.productos import producto_catalogo
 
 pedidos_bp = Blueprint('pedidos', __name__, url_prefix='/pedidos')
 
@@ -20,11 +21,8 @@ pedidos_bp = Blueprint('pedidos', __name__, url_prefix='/pedidos')
 @login_required
 @rol_requerido('vendedor', 'administrador')
 def crear_pedido():
-    from app.utils.productos import get_productos_ordenados
     from app.utils.notificaciones import notificar_accion
 
-    productos = get_productos_ordenados()
-
     vendedores = None
     if current_user.rol in ['administrador', 'semiadmin']:
         vendedores = Vendedor.query.order_by(Vendedor.nombre).all()
@@ -75,7 +73,7 @@ def crear_pedido():
                 usado=False
             )
             for it in items_data:
-                prod = Producto.query.filter_by(codigo=it['codigo']).first()
+                prod = producto_catalogo(it['codigo'])
                 pu = prod.precio if prod else 0
                 pedido.items.append(
                     BDPedidoItem(
@@ -100,7 +98,6 @@ def crear_pedido():
 
     return render_template(
         'pedidos/crear.html',
-        productos=productos,
         vendedores=vendedores,
         fecha_val=fecha_val,
         selected_vendedor=selected_v,
@@ -133,14 +130,12 @@ def listar_pedidos():
 
     paginacion = q.order_by(BDPedido.fecha.desc()).paginate(page=page, per_page=30)
 
-    # Calcular total de cada pedido en la página actual
+    # Calcular total de cada pedido en la página actual (una consulta agrupada)
+    totales = totales_por_documento(BDPedidoItem, BDPedidoItem.pedido_id, [p.id for p in paginacion.items])
     for p in paginacion.items:
-        p.total = sum(item.subtotal for item in p.items)
+        p.total = totales.get(p.id, 0)
 
-    vendedores_map = {
-        v.codigo_vendedor: v.nombre
-        for v in Vendedor.query.all()
-    }
+    vendedores_map = nombres_vendedores()
 
     return render_template(
         'pedidos/listar.html',
@@ -155,11 +150,9 @@ def listar_pedidos():
 @login_required
 @rol_requerido('administrador')
 def editar_pedido(pid):
-    from app.utils.productos import get_productos_ordenados
     from app.utils.notificaciones import notificar_accion
 
     pedido     = BDPedido.query.get_or_404(pid)
-    productos  = get_productos_ordenados()
     vendedores = Vendedor.query.order_by(Vendedor.nombre).all()
     items_data = [{'codigo': it.producto_cod, 'cantidad': it.cantidad}
                   for it in pedido.items]
@@ -180,7 +173,7 @@ def editar_pedido(pid):
 
         for c, q in zip(cods, cants):
             if c and q:
-                prod = Producto.query.filter_by(codigo=c).first()
+                prod = producto_catalogo(c)
                 pu   = prod.precio if prod else 0
                 pedido.items.append(
                     BDPedidoItem(
@@ -203,7 +196,6 @@ def editar_pedido(pid):
     return render_template(
         'pedidos/editar.html',
         pedido=pedido,
-        productos=productos,
         vendedores=vendedores,
         items=items_data
     )
@@ -233,8 +225,8 @@ def export_pdf_pedido(pid):
     pedido = BDPedido.query.get_or_404(pid)
     vendedor_obj = Vendedor.query.filter_by(codigo_vendedor=pedido.codigo_vendedor).first()
     logo = current_app.root_path + '/static/logo_incolpan.png'
-    pdf_bytes = generate_pdf_document(pedido, vendedor_obj, logo, tipo='pedido')
-    resp = make_response(pdf_bytes)
-    resp.headers['Content-Type'] = 'application/pdf'
-    resp.headers['Content-Disposition'] = f'attachment; filename=Pedido_{pedido.consecutivo}.pdf'
-    return resp
+    return respuesta_pdf(
+        huella_documento(pedido, vendedor_obj, 'pedido'),
+        lambda: generate_pdf_document(pedido, vendedor_obj, logo, tipo='pedido'),
+        f'Pedido_{pedido.consecutivo}.pdf'
+    )
@@ -0,0 +1,24 @@
+# app/routes/perfil_sql.py
+from flask import Blueprint, jsonify, redirect, url_for
+from flask_login import login_required
+
+from app.utils.perfil_sql import limpiar_ventana, resumen_ventana
+from app.utils.roles import rol_requerido
+
+# Solo se registra con PERFIL_SQL=1 (ver registrar_perfil_sql)
+perfil_sql_bp = Blueprint('perfil_sql', __name__)
+
+
+@perfil_sql_bp.route('/debug/sql', methods=['GET'])
+@login_required
+@rol_requerido('administrador')
+def resumen_sql():
+    return jsonify(resumen_ventana())
+
+
+@perfil_sql_bp.route('/debug/sql/limpiar', methods=['POST'])
+@login_required
+@rol_requerido('administrador')
+def limpiar_sql():
+    limpiar_ventana()
+    return redirect(url_for('perfil_sql.resumen_sql'))
@@ -1,7 +1,9 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required
 from app import db
 from app.models.producto import Producto
 from app.utils.roles import rol_requerido
+from app.utils.productos import catalogo, invalidar_catalogo
 import csv
 from werkzeug.utils import secure_filename
 import os
@@ -13,22 +15,39 @@ productos_bp = Blueprint('productos', __name__, url_prefix='/productos')
 @productos_bp.route('/')
 @rol_requerido('administrador', 'semiadmin')
 def listar_productos():
-    productos = Producto.query.all()
+    productos = Producto.query.order_by(Producto.orden, Producto.nombre).all()
     return render_template('productos/listar.html', productos=productos)
 
+# CATÁLOGO ORDENADO (JSON) PARA LOS FORMULARIOS
+@productos_bp.route('/catalogo.json')
+@login_required
+def catalogo_json():
+    cat = catalogo()
+    resp = current_app.response_class(cat.payload, mimetype='application/json')
+    resp.set_etag(cat.etag)
+    # El navegador lo guarda pero revalida siempre: si no cambió responde 304 sin cuerpo
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True
+    return resp.make_conditional(request)
+
 # CREAR PRODUCTO
 @productos_bp.route('/crear', methods=['GET', 'POST'])
 @rol_requerido('administrador')
 def crear_producto():
     if request.method == 'POST':
+        codigo = request.form['codigo'].strip()
         nombre = request.form['nombre']
         precio = float(request.form['precio'])
         categoria = request.form['categoria']
         activo = 'activo' in request.form
+        orden = request.form.get('orden', type=int, default=9999)
+        alias = request.form.get('alias', '').strip() or None
 
-        nuevo = Producto(nombre=nombre, precio=precio, categoria=categoria, activo=activo)
+        nuevo = Producto(codigo=codigo, nombre=nombre, precio=precio, categoria=categoria,
+                         activo=activo, orden=orden, alias=alias)
         db.session.add(nuevo)
         db.session.commit()
+        invalidar_catalogo()
         flash('Producto creado correctamente.', 'success')
         return redirect(url_for('productos.listar_productos'))
 
@@ -44,7 +63,10 @@ def editar_producto(id):
         producto.precio = float(request.form['precio'])
         producto.categoria = request.form['categoria']
         producto.activo = 'activo' in request.form
+        producto.orden = request.form.get('orden', type=int, default=producto.orden)
+        producto.alias = request.form.get('alias', '').strip() or None
         db.session.commit()
+        invalidar_catalogo()
         flash('Producto actualizado.', 'success')
         return redirect(url_for('productos.listar_productos'))
 
@@ -57,6 +79,7 @@ def eliminar_producto(id):
     producto = Producto.query.get_or_404(id)
     db.session.delete(producto)
     db.session.commit()
+    invalidar_catalogo()
     flash('Producto eliminado correctamente.', 'success')
     return redirect(url_for('productos.listar_productos'))
 
@@ -86,6 +109,8 @@ def importar_productos():
                     nombre = fila['nombre'].strip()
                     precio = float(fila['precio'])
                     categoria = fila['categoria'].strip().lower()
+                    orden = int(fila.get('orden') or 9999)
+                    alias = (fila.get('alias') or '').strip() or None
 
                     duplicado = Producto.query.filter(
                         (Producto.codigo == codigo) | (Producto.nombre == nombre)
@@ -97,7 +122,9 @@ def importar_productos():
                             nombre=nombre,
                             precio=precio,
                             categoria=categoria,
-                            activo=True
+                            activo=True,
+                            orden=orden,
+                            alias=alias
                         )
                         db.session.add(nuevo)
                     else:
@@ -115,6 +142,7 @@ def importar_productos():
                     })
 
         db.session.commit()
+        invalidar_catalogo()
 
         if errores:
             ruta_fallos = os.path.join(upload_folder, 'fallos_importacion.csv')
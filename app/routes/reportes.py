@@ -6,20 +6,20 @@ from flask_login import login_required, current_user
 from app.utils.roles  import rol_requerido
 from app.utils.fechas import contar_habiles, dias_habiles_mes
 from app.models.vendedor import Vendedor
-from app.models.ventas   import BDVenta
-from io import BytesIO
+from app.utils.resumen_diario import totales_por_codigo_vendedor
 from datetime import datetime
-from flask import Blueprint, request, send_file, flash, redirect, url_for
+from flask import Blueprint, request, flash, redirect, url_for
 from sqlalchemy import case, literal
 import pandas as pd
-from openpyxl.utils.cell import get_column_letter
-from decimal import Decimal
 
 from app import db
 from app.models.pedidos import BDPedido
 from app.models.pedido_item import BDPedidoItem
 from app.models.vendedor import Vendedor
-from app.models.producto  import Producto
+from app.utils.reportes  import (
+    bloques_documento_por_producto, bloques_ventas_por_producto, bloques_tabla,
+    enviar_excel, COLUMNAS_DOCUMENTO, COLUMNAS_VENTA
+)
 
 reportes_bp = Blueprint('reportes', __name__, url_prefix='/reportes')
 
@@ -34,16 +34,12 @@ def panel():
     dias_transcurridos = contar_habiles(inicio_mes, hoy)
     total_habiles      = dias_habiles_mes(hoy.year, hoy.month)
 
+    # Una sola consulta agrupada sobre la tabla de hechos diaria
+    totales = totales_por_codigo_vendedor(['venta'], inicio_mes, hoy)
+
     rows = []
     for vend in Vendedor.query.order_by(Vendedor.nombre).all():
-        ventas = BDVenta.query.filter(
-            BDVenta.codigo_vendedor==vend.codigo_vendedor,
-            BDVenta.fecha >= inicio_mes,
-            BDVenta.fecha <= hoy
-        ).all()
-
-        tot_vendido = sum(v.total_venta for v in ventas)
-        tot_com     = sum(v.comision    for v in ventas)
+        tot_vendido, tot_com = totales.get(vend.codigo_vendedor, (0, 0))
         proy = (tot_vendido / dias_transcurridos * total_habiles
                 if dias_transcurridos else 0)
 
@@ -84,64 +80,16 @@ def export_pedidos_productos_excel():
         flash('Rango de fechas inválido.', 'warning')
         return redirect(url_for('reportes.pedidos_por_producto'))
 
-    # 2) Recorrer pedidos en el rango y preparar filas
-    rows = []
-    pedidos = BDPedido.query.filter(
-        BDPedido.fecha >= start_date,
-        BDPedido.fecha <= end_date
-    ).all()
-
-    for ped in pedidos:
-        vend = Vendedor.query.filter_by(codigo_vendedor=ped.codigo_vendedor).first()
-        for item in ped.items:
-            prod = Producto.query.filter_by(codigo=item.producto_cod).first()
-            cat = (prod.categoria or '').lower()
-            pct = ((vend.comision_panaderia if cat=='panadería' else vend.comision_bizcocheria) or 0)/100.0
-            valor_total = float(item.subtotal)
-            valor_neto  = valor_total * (1.0 - pct)
-
-            rows.append({
-                'Fecha':                        ped.fecha,
-                'Año':                          ped.fecha.year,
-                'cod vendedor':                 ped.codigo_vendedor,
-                'nombre vendedor':              vend.nombre,
-                'ruta':                         '',
-                'codigo producto':              item.producto_cod,
-                'nombre producto':              prod.nombre,
-                'cantidad':                     item.cantidad,
-                'valor total':                  valor_total,
-                'valor neto (menos comisión)':  valor_neto,
-                'lote':                         '',
-                'mes':                          ped.fecha.month,
-                'día':                          ped.fecha.day,
-                'nombre del día':               ped.fecha.strftime('%A')
-            })
-
-    # 3) Crear DataFrame
-    df = pd.DataFrame(rows)
-    if df.empty:
-        flash('No hay datos en ese rango.', 'info')
-        return redirect(url_for('reportes.pedidos_por_producto'))
-    df['Fecha'] = pd.to_datetime(df['Fecha'])
-
-    # 4) Generar Excel en memoria usando openpyxl
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='PedidosPorProducto')
-        ws = writer.sheets['PedidosPorProducto']
-        for idx, col in enumerate(df.columns, start=1):
-            max_len = max(df[col].astype(str).map(len).max(), len(col))
-            ws.column_dimensions[get_column_letter(idx)].width = max_len + 2
-    output.seek(0)
-
-    # 5) Enviar al cliente
+    # 2) Una sola consulta con ítems, vendedor y producto, escrita por bloques
     filename = f"PedidosPorProducto_{start}_a_{end}.xlsx"
-    return send_file(
-        output,
-        as_attachment=True,
-        download_name=filename,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    resp = enviar_excel(
+        bloques_documento_por_producto('pedido', start_date, end_date),
+        COLUMNAS_DOCUMENTO, 'PedidosPorProducto', filename
     )
+    if resp is None:
+        flash('No hay datos en ese rango.', 'info')
+        return redirect(url_for('reportes.pedidos_por_producto'))
+    return resp
 
 # 3) Formulario para pedidos día a día por vendedor
 @reportes_bp.route('/pedidos_dia', methods=['GET'])
@@ -202,26 +150,9 @@ def export_pedidos_dia_excel():
         proj = table.loc['Total'] * 0
     table.loc['Proyección'] = proj
 
-    # 5) Exportar a Excel con OpenPyXL
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        table.to_excel(writer, sheet_name='PedidosDia')
-        ws = writer.sheets['PedidosDia']
-        # Ajustar ancho de columna
-        df_reset = table.reset_index()
-        for idx, col in enumerate(df_reset.columns, start=1):
-            max_len = max(df_reset[col].astype(str).map(len).max(), len(str(col)))
-            ws.column_dimensions[get_column_letter(idx)].width = max_len + 2
-    output.seek(0)
-
-    # 6) Devolver archivo
+    # 5) Exportar a Excel
     filename = f"PedidosDia_{start}_a_{end}.xlsx"
-    return send_file(
-        output,
-        as_attachment=True,
-        download_name=filename,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+    return enviar_excel(bloques_tabla(table), None, 'PedidosDia', filename)
 
 # 5) Formulario para pedidos mes a mes por vendedor
 @reportes_bp.route('/pedidos_mes', methods=['GET'])
@@ -286,36 +217,18 @@ def export_pedidos_mes_excel():
     # Asignamos directamente
     table.loc['Proyección'] = proj_values
 
-    # 5) Exportar a Excel con openpyxl
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        table.to_excel(writer, sheet_name=f'Pedidos_{year}')
-        ws = writer.sheets[f'Pedidos_{year}']
-        df_reset = table.reset_index()
-        for idx, col in enumerate(df_reset.columns, start=1):
-            max_len = max(df_reset[col].astype(str).map(len).max(), len(str(col)))
-            ws.column_dimensions[get_column_letter(idx)].width = max_len + 2
-    output.seek(0)
-
-    # 6) Enviar archivo
+    # 5) Exportar a Excel
     filename = f"PedidosMes_{year}.xlsx"
-    return send_file(
-        output,
-        as_attachment=True,
-        download_name=filename,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+    return enviar_excel(bloques_tabla(table), None, f'Pedidos_{year}', filename)
 
 @reportes_bp.route('/mi_panel', methods=['GET'])
 @login_required
 @rol_requerido('vendedor')
 def mi_panel():
-    from datetime import date
+    from datetime import date, timedelta
     from flask import request
-    from app.models.ventas     import BDVenta
-    from app.models.pedidos    import BDPedido
-    from app.models.extras     import BDExtra  # ← Asegúrate que esté importado
     from app.models.cambio     import BD_CAMBIO
+    from app.utils.resumen_diario import total_valor
     from app.utils.fechas      import contar_habiles, dias_habiles_mes
 
     hoy = date.today()
@@ -335,37 +248,13 @@ def mi_panel():
     dias_transcurridos = contar_habiles(inicio_mes, hoy if (anio == hoy.year and mes == hoy.month) else fin_mes)
     total_habiles = dias_habiles_mes(anio, mes)
 
-    # Ventas del mes
-    ventas = BDVenta.query.filter(
-        BDVenta.codigo_vendedor == current_user.codigo_vendedor,
-        BDVenta.fecha >= inicio_mes,
-        BDVenta.fecha < fin_mes
-    ).all()
-
-    tot_vendido = sum(v.total_venta for v in ventas)
-    tot_com     = sum(v.comision    for v in ventas)
+    # Ventas, pedidos y extras del mes desde la tabla de hechos diaria
+    ultimo_dia = fin_mes - timedelta(days=1)
+    tot_vendido, tot_com = total_valor(['venta'], inicio_mes, ultimo_dia, current_user.codigo_vendedor)
     proy = (tot_vendido / dias_transcurridos * total_habiles) if dias_transcurridos else 0
 
-    # Total de pedidos del mes
-    pedidos = BDPedido.query.filter_by(codigo_vendedor=current_user.codigo_vendedor).filter(
-        BDPedido.fecha >= inicio_mes,
-        BDPedido.fecha < fin_mes
-    ).all()
-    total_pedidos = sum(
-        sum(item.subtotal for item in p.items) for p in pedidos
-    )
-
-    # Total de extras del mes
-    extras = BDExtra.query.filter_by(codigo_vendedor=current_user.codigo_vendedor).filter(
-        BDExtra.fecha >= inicio_mes,
-        BDExtra.fecha < fin_mes
-    ).all()
-    total_extras = sum(
-        sum(item.subtotal for item in e.items) for e in extras
-    )
-
-    # Sumar ambos totales
-    total_pedidos += total_extras
+    # Total de pedidos + extras del mes
+    total_pedidos, _ = total_valor(['pedido', 'extra'], inicio_mes, ultimo_dia, current_user.codigo_vendedor)
 
     # Total de cambios (valor_cambio) del mes
     cambios = BD_CAMBIO.query.filter_by(codigo_vendedor=current_user.codigo_vendedor).filter(
@@ -400,11 +289,6 @@ def extras_por_producto():
 @login_required
 @rol_requerido('administrador','semiadmin')
 def export_extras_productos_excel():
-    from app.models.extras import BDExtra
-    from app.models.extra_item import BDExtraItem
-    from app.models.vendedor import Vendedor
-    from app.models.producto import Producto
-
     start = request.args.get('start', '').strip()
     end   = request.args.get('end', '').strip()
     try:
@@ -414,56 +298,15 @@ def export_extras_productos_excel():
         flash('Rango de fechas inválido.', 'warning')
         return redirect(url_for('reportes.extras_por_producto'))
 
-    rows = []
-    extras = BDExtra.query.filter(
-        BDExtra.fecha >= start_date,
-        BDExtra.fecha <= end_date
-    ).all()
-
-    for ex in extras:
-        vend = Vendedor.query.filter_by(codigo_vendedor=ex.codigo_vendedor).first()
-        for item in ex.items:
-            prod = Producto.query.filter_by(codigo=item.producto_cod).first()
-            cat = (prod.categoria or '').lower()
-            pct = ((vend.comision_panaderia if cat=='panadería' else vend.comision_bizcocheria) or 0)/100.0
-            valor_total = float(item.subtotal)
-            valor_neto  = valor_total * (1.0 - pct)
-
-            rows.append({
-                'Fecha':                        ex.fecha,
-                'Año':                          ex.fecha.year,
-                'cod vendedor':                 ex.codigo_vendedor,
-                'nombre vendedor':              vend.nombre,
-                'ruta':                         '',
-                'codigo producto':              item.producto_cod,
-                'nombre producto':              prod.nombre,
-                'cantidad':                     item.cantidad,
-                'valor total':                  valor_total,
-                'valor neto (menos comisión)':  valor_neto,
-                'lote':                         '',
-                'mes':                          ex.fecha.month,
-                'día':                          ex.fecha.day,
-                'nombre del día':               ex.fecha.strftime('%A')
-            })
-
-    df = pd.DataFrame(rows)
-    if df.empty:
+    filename = f"ExtrasPorProducto_{start}_a_{end}.xlsx"
+    resp = enviar_excel(
+        bloques_documento_por_producto('extra', start_date, end_date),
+        COLUMNAS_DOCUMENTO, 'ExtrasPorProducto', filename
+    )
+    if resp is None:
         flash('No hay datos en ese rango.', 'info')
         return redirect(url_for('reportes.extras_por_producto'))
-    df['Fecha'] = pd.to_datetime(df['Fecha'])
-
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='ExtrasPorProducto')
-        ws = writer.sheets['ExtrasPorProducto']
-        for idx, col in enumerate(df.columns, start=1):
-            max_len = max(df[col].astype(str).map(len).max(), len(col))
-            ws.column_dimensions[get_column_letter(idx)].width = max_len + 2
-    output.seek(0)
-
-    filename = f"ExtrasPorProducto_{start}_a_{end}.xlsx"
-    return send_file(output, as_attachment=True, download_name=filename,
-                     mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    return resp
 
 # Formulario de devoluciones por producto
 @reportes_bp.route('/devoluciones_por_producto', methods=['GET'])
@@ -477,11 +320,6 @@ def devoluciones_por_producto():
 @login_required
 @rol_requerido('administrador','semiadmin')
 def export_devoluciones_productos_excel():
-    from app.models.devoluciones import BDDevolucion
-    from app.models.devolucion_item import BDDevolucionItem
-    from app.models.vendedor import Vendedor
-    from app.models.producto import Producto
-
     start = request.args.get('start', '').strip()
     end   = request.args.get('end', '').strip()
     try:
@@ -491,56 +329,15 @@ def export_devoluciones_productos_excel():
         flash('Rango de fechas inválido.', 'warning')
         return redirect(url_for('reportes.devoluciones_por_producto'))
 
-    rows = []
-    devols = BDDevolucion.query.filter(
-        BDDevolucion.fecha >= start_date,
-        BDDevolucion.fecha <= end_date
-    ).all()
-
-    for dev in devols:
-        vend = Vendedor.query.filter_by(codigo_vendedor=dev.codigo_vendedor).first()
-        for item in dev.items:
-            prod = Producto.query.filter_by(codigo=item.producto_cod).first()
-            cat = (prod.categoria or '').lower()
-            pct = ((vend.comision_panaderia if cat=='panadería' else vend.comision_bizcocheria) or 0)/100.0
-            valor_total = float(item.subtotal)
-            valor_neto  = valor_total * (1.0 - pct)
-
-            rows.append({
-                'Fecha':                        dev.fecha,
-                'Año':                          dev.fecha.year,
-                'cod vendedor':                 dev.codigo_vendedor,
-                'nombre vendedor':              vend.nombre,
-                'ruta':                         '',
-                'codigo producto':              item.producto_cod,
-                'nombre producto':              prod.nombre,
-                'cantidad':                     item.cantidad,
-                'valor total':                  valor_total,
-                'valor neto (menos comisión)':  valor_neto,
-                'lote':                         '',
-                'mes':                          dev.fecha.month,
-                'día':                          dev.fecha.day,
-                'nombre del día':               dev.fecha.strftime('%A')
-            })
-
-    df = pd.DataFrame(rows)
-    if df.empty:
+    filename = f"DevolucionesPorProducto_{start}_a_{end}.xlsx"
+    resp = enviar_excel(
+        bloques_documento_por_producto('devolucion', start_date, end_date),
+        COLUMNAS_DOCUMENTO, 'DevolucionesPorProducto', filename
+    )
+    if resp is None:
         flash('No hay datos en ese rango.', 'info')
         return redirect(url_for('reportes.devoluciones_por_producto'))
-    df['Fecha'] = pd.to_datetime(df['Fecha'])
-
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='DevolucionesPorProducto')
-        ws = writer.sheets['DevolucionesPorProducto']
-        for idx, col in enumerate(df.columns, start=1):
-            max_len = max(df[col].astype(str).map(len).max(), len(col))
-            ws.column_dimensions[get_column_letter(idx)].width = max_len + 2
-    output.seek(0)
-
-    filename = f"DevolucionesPorProducto_{start}_a_{end}.xlsx"
-    return send_file(output, as_attachment=True, download_name=filename,
-                     mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    return resp
 
 # Formulario para ventas por producto
 @reportes_bp.route('/ventas_por_producto', methods=['GET'])
@@ -554,10 +351,6 @@ def ventas_por_producto():
 @login_required
 @rol_requerido('administrador', 'semiadmin')
 def export_ventas_producto_excel():
-    from io import BytesIO
-    from openpyxl.utils import get_column_letter
-    import pandas as pd
-
     # Leer fechas
     start = request.args.get('start', '').strip()
     end = request.args.get('end', '').strip()
@@ -569,59 +362,13 @@ def export_ventas_producto_excel():
         flash('Rango de fechas inválido.', 'warning')
         return redirect(url_for('reportes.ventas_por_producto'))
 
-    # Extraer ventas en el rango
-    ventas = BDVenta.query.filter(
-        BDVenta.fecha >= start_date,
-        BDVenta.fecha <= end_date
-    ).all()
-
-    rows = []
-    for v in ventas:
-        vendedor = Vendedor.query.filter_by(codigo_vendedor=v.codigo_vendedor).first()
-        for item in v.items:
-            producto = Producto.query.filter_by(codigo=item.producto_cod).first()
-            comision_valor = item.comision or Decimal('0')
-            pagar_panaderia = item.pagar_pan or Decimal('0')
-
-            rows.append({
-                'Fecha': v.fecha,
-                'Año': v.fecha.year,
-                'Mes': v.fecha.month,
-                'Día': v.fecha.day,
-                'Día de semana': v.fecha.strftime('%A'),
-                'Código producto': item.producto_cod,
-                'Nombre producto': producto.nombre if producto else 'Desconocido',
-                'Cantidad': item.cantidad,
-                'Subtotal': float(item.subtotal),
-                'Valor comisión': float(item.comision),
-                'Pagar a la Panadería': float(item.pagar_pan),
-                'Código vendedor': v.codigo_vendedor,
-                'Nombre vendedor': vendedor.nombre if vendedor else 'Desconocido'
-            })
-
-    df = pd.DataFrame(rows)
-    if df.empty:
-        flash('No hay datos en ese rango.', 'info')
-        return redirect(url_for('reportes.ventas_por_producto'))
-
-    df['Fecha'] = pd.to_datetime(df['Fecha'])
-
-    # Exportar a Excel
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='VentasPorProducto')
-        ws = writer.sheets['VentasPorProducto']
-        for idx, col in enumerate(df.columns, start=1):
-            max_len = max(df[col].astype(str).map(len).max(), len(col))
-            ws.column_dimensions[get_column_letter(idx)].width = max_len + 2
-    output.seek(0)
-
+    # Ítems de venta con producto y vendedor, escritos por bloques
     filename = f"VentasPorProducto_{start}_a_{end}.xlsx"
-    return send_file(
-        output,
-        as_attachment=True,
-        download_name=filename,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    resp = enviar_excel(
+        bloques_ventas_por_producto(start_date, end_date),
+        COLUMNAS_VENTA, 'VentasPorProducto', filename
     )
-
-
+    if resp is None:
+        flash('No hay datos en ese rango.', 'info')
+        return redirect(url_for('reportes.ventas_por_producto'))
+    return resp
@@ -1,40 +1,50 @@
 # app/routes/socket_events.py
 
 from flask import Blueprint, request
-from flask_socketio import SocketIO, emit, join_room, leave_room
+from flask_socketio import emit, join_room, leave_room
 from app.extensions import socketio
+from app.utils.socket_session import vincular_socket, desvincular_socket, pendientes_de_sesion
+from app.utils.metricas import SOCKETIO_CLIENTES
 
 socketio_bp = Blueprint("socketio", __name__)
 
-# Diccionario para mapear session_id (de Dialogflow CX) a socket_id
-session_to_socket = {}
+def _registrar(session_id):
+    anterior = vincular_socket(session_id, request.sid)
+    # El cliente se registra al conectar y otra vez con 'registrar_socket': una sola entrega
+    if anterior == session_id:
+        return
+    if anterior is not None:
+        # Cambió de sesión: sin esto seguiría recibiendo los eventos de la anterior
+        leave_room(anterior)
+    # Los eventos de voz se emiten al room de la sesión: llegan desde cualquier worker
+    join_room(session_id)
+    # Lo que se emitió mientras la página cargaba; el cliente descarta lo que ya vio
+    for evento, datos in pendientes_de_sesion(session_id):
+        emit(evento, datos, to=request.sid)
+    print(f"✅ Socket registrado para session_id: {session_id} con socket_id: {request.sid}")
 
 @socketio.on('connect')
-def on_connect():
+def on_connect(auth=None):
     print(f"📡 Cliente conectado vía Socket.IO con socket_id: {request.sid}")
+    SOCKETIO_CLIENTES.inc()
+    session_id = (auth or {}).get("session_id")
+    if session_id:
+        _registrar(session_id)
 
 @socketio.on('disconnect')
 def on_disconnect():
     print(f"🔌 Cliente desconectado: socket_id={request.sid}")
-    
-    # Eliminar session_id vinculado a este socket_id
-    session_id_a_eliminar = None
-    for sid, sock_id in session_to_socket.items():
-        if sock_id == request.sid:
-            session_id_a_eliminar = sid
-            break
-    if session_id_a_eliminar:
-        leave_room(session_id_a_eliminar)
-        del session_to_socket[session_id_a_eliminar]
-        print(f"🗑️ Session eliminada: {session_id_a_eliminar}")
+    SOCKETIO_CLIENTES.dec()
+
+    # Socket.IO ya lo sacó de sus rooms; solo falta el índice
+    session_id = desvincular_socket(request.sid)
+    if session_id:
+        print(f"🗑️ Socket desvinculado de la sesión: {session_id}")
 
 @socketio.on('registrar_socket')
 def registrar_socket(data):
-    session_id = data.get("session_id")
+    session_id = (data or {}).get("session_id")
     if session_id:
-        session_to_socket[session_id] = request.sid
-        join_room(session_id)
-        print(f"✅ Socket registrado para session_id: {session_id} con socket_id: {request.sid}")
+        _registrar(session_id)
     else:
         print("⚠️ No se proporcionó session_id al registrar socket.")
-
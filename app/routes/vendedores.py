@@ -3,6 +3,7 @@ from app.models.vendedor import Vendedor
 from app import db
 from flask_login import login_required, current_user
 from app.utils.roles import rol_requerido
+from app.utils.vendedores import invalidar_vendedores
 
 vendedores_bp = Blueprint('vendedores', __name__, url_prefix='/vendedores')
 
@@ -26,6 +27,7 @@ def crear_vendedor():
 
         db.session.add(nuevo)
         db.session.commit()
+        invalidar_vendedores()
         flash("Vendedor registrado correctamente.", "success")
         return redirect(url_for('vendedores.crear_vendedor'))
 
@@ -65,6 +67,7 @@ def editar_vendedor(id):
             vendedor.set_password(nueva_clave)
 
         db.session.commit()
+        invalidar_vendedores()
         flash("Vendedor actualizado correctamente.", "success")
         return redirect(url_for('vendedores.listar_vendedores'))
 
@@ -82,5 +85,6 @@ def eliminar_vendedor(id):
     vendedor = Vendedor.query.get_or_404(id)
     db.session.delete(vendedor)
     db.session.commit()
+    invalidar_vendedores()
     flash("Vendedor eliminado.", "success")
     return redirect(url_for('vendedores.listar_vendedores'))
@@ -1,10 +1,11 @@
 # app/routes/ventas.py
 from datetime import date, datetime
 import json
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
-from flask import make_response, current_app
-from app.utils.pdf_utils import generate_pdf_document
+from flask import current_app
+from app.utils.pdf_utils import generate_pdf_document, huella_documento
+from app.utils.pdf_cache import respuesta_pdf
 
 from app import db
 from app.models.pedidos      import BDPedido
@@ -12,10 +13,14 @@ from app.models.extras       import BDExtra
 from app.models.devoluciones import BDDevolucion
 from app.models.ventas       import BDVenta
 from app.models.venta_item   import BDVentaItem
-from app.models.producto     import Producto
 from app.models.vendedor     import Vendedor
 from app.utils.roles         import rol_requerido
 from app.utils.documentos    import generar_consecutivo
+from app.utils.vendedores    import nombres_vendedores
+from app.utils.ventas        import (
+    SolicitudVenta, calcular_venta, calcular_ventas, previsualizar_lote, crear_ventas_lote,
+    LoteDesactualizado
+)
 from app.utils.notificaciones import notificar_accion
 from app.models.despachos    import BDDespacho, BDDespachoItem
 
@@ -63,80 +68,11 @@ def generar_venta():
     c_ext     = request.values.get('codigo_extra',         '').strip()
     c_dev_d   = request.values.get('codigo_dev_dia',       '').strip()
 
-    def fetch(modelo, code, by_date=True):
-        if not code:
-            return None
-        q = modelo.query.filter_by(consecutivo=code, codigo_vendedor=selected_v)
-        if by_date:
-            q = q.filter_by(fecha=fecha_obj)
-        return q.first()
-
-    d_ant = fetch(BDDevolucion, c_dev_ant, False)
-    d_dia = fetch(BDDevolucion, c_dev_d,   False)
-
-    ped = BDDespacho.query.filter_by(codigo_origen=c_ped, vendedor_cod=selected_v).first()
-    ext = BDDespacho.query.filter_by(codigo_origen=c_ext, vendedor_cod=selected_v).first()
-
-    prods = Producto.query.with_entities(
-        Producto.codigo, Producto.precio,
-        Producto.nombre, Producto.categoria
-    ).all()
-
-    price = {p.codigo: p.precio for p in prods}
-    names = {p.codigo: p.nombre for p in prods}
-    cats  = {p.codigo: p.categoria for p in prods}
-    vend  = Vendedor.query.filter_by(codigo_vendedor=selected_v).first()
-
-    breakdown = []
-    temp = {}
-
-    for doc, key in [
-        (d_ant, 'dev_ant'),
-        (ped,   'pedido'),
-        (ext,   'extra'),
-        (d_dia, 'dev_dia')
-    ]:
-        if doc:
-            for item in doc.items:
-                code = item.producto_cod
-                qty = item.cantidad  
-                temp.setdefault(code, {
-                    'dev_ant': 0, 'pedido': 0,
-                    'extra':   0, 'dev_dia': 0
-                })
-                temp[code][key] += qty
-
-    for code, vals in temp.items():
-        qty = vals['dev_ant'] + vals['pedido'] + vals['extra'] - vals['dev_dia']
-        val = price.get(code, 0) * qty
-
-        categoria = cats.get(code, '')
-        if categoria == 'panaderia':
-            pct = (vend.comision_panaderia or 0) / 100
-        elif categoria == 'bizcocheria':
-            pct = (vend.comision_bizcocheria or 0) / 100
-        else:
-            pct = 0.0
-
-        com = val * pct
-        pan = val - com
-
-        breakdown.append({
-            'codigo': code,
-            'nombre': names.get(code, code),
-            'dev_ant': vals['dev_ant'],
-            'pedido': vals['pedido'],
-            'extra': vals['extra'],
-            'dev_dia': vals['dev_dia'],
-            'total': qty,
-            'valor': val,
-            'comision': com,
-            'pagar_pan': pan
-        })
-
-    tot_val = sum(i['valor'] for i in breakdown)
-    tot_com = sum(i['comision'] for i in breakdown)
-    tot_pan = sum(i['pagar_pan'] for i in breakdown)
+    resultado = calcular_venta(selected_v, c_dev_ant, c_ped, c_ext, c_dev_d)
+    breakdown = resultado['lineas']
+    tot_val = resultado['total_valor']
+    tot_com = resultado['total_comision']
+    tot_pan = resultado['total_pagar']
 
     if request.method == 'POST' and 'confirm' in request.form:
         if BDVenta.query.filter_by(
@@ -145,6 +81,16 @@ def generar_venta():
             flash('Ya existe venta para este día y vendedor.', 'warning')
             return redirect(url_for('ventas.generar_venta'))
 
+        def fetch(modelo, code):
+            if not code:
+                return None
+            return modelo.query.filter_by(consecutivo=code, codigo_vendedor=selected_v).first()
+
+        d_ant = fetch(BDDevolucion, c_dev_ant)
+        d_dia = fetch(BDDevolucion, c_dev_d)
+        ped = BDDespacho.query.filter_by(codigo_origen=c_ped, vendedor_cod=selected_v).first() if c_ped else None
+        ext = BDDespacho.query.filter_by(codigo_origen=c_ext, vendedor_cod=selected_v).first() if c_ext else None
+
         venta = BDVenta(
             consecutivo         = generar_consecutivo(BDVenta, 'VT'),
             codigo_vendedor     = selected_v,
@@ -153,22 +99,21 @@ def generar_venta():
             codigo_extra        = c_ext     or None,
             codigo_dev_dia      = c_dev_d   or None,
             fecha               = fecha_obj,
-            devolucion_anterior = sum(i['dev_ant'] for i in breakdown),
-            pedido              = sum(i['pedido']  for i in breakdown),
-            extras              = sum(i['extra']   for i in breakdown),
-            devolucion_dia      = sum(i['dev_dia'] for i in breakdown),
+            devolucion_anterior = resultado['dev_ant'],
+            pedido              = resultado['pedido'],
+            extras              = resultado['extra'],
+            devolucion_dia      = resultado['dev_dia'],
             total_venta         = tot_val,
             comision            = tot_com,
             pagar_pan           = tot_pan
         )
 
         for line in breakdown:
-            pu = price.get(line['codigo'], 0)
             venta.items.append(
                 BDVentaItem(
                     producto_cod = line['codigo'],
                     cantidad     = line['total'],
-                    precio_unit  = pu,
+                    precio_unit  = line['precio'],
                     subtotal     = line['valor'],
                     comision     = line['comision'],
                     pagar_pan    = line['pagar_pan']
@@ -183,7 +128,7 @@ def generar_venta():
         db.session.commit()
 
         notificar_accion("crear_venta", {
-            "vendedor": vend.nombre,
+            "vendedor": nombres_vendedores().get(selected_v, selected_v),
             "fecha": venta.fecha.isoformat(),
             "total": venta.total_venta
         })
@@ -209,6 +154,82 @@ def generar_venta():
         total_pagar       = tot_pan
     )
 
+CAMPOS_SOLICITUD = ('codigo_dev_anterior', 'codigo_pedido', 'codigo_extra', 'codigo_dev_dia')
+
+def _solicitud(datos):
+    return SolicitudVenta(
+        (datos.get('vendedor') or '').strip(),
+        *[(datos.get(c) or '').strip() or None for c in CAMPOS_SOLICITUD]
+    )
+
+@ventas_bp.route('/api/previsualizar', methods=['GET', 'POST'])
+@login_required
+@rol_requerido('semiadmin', 'administrador')
+def api_previsualizar():
+    """
+    Desglose de venta sin guardar nada.
+    GET con los mismos parámetros del formulario (un vendedor), o
+    POST JSON {"ventas": [{"vendedor", "codigo_dev_anterior", "codigo_pedido",
+    "codigo_extra", "codigo_dev_dia"}, ...]} para toda una ruta en una llamada.
+    """
+    if request.method == 'GET':
+        solicitud = _solicitud(request.args)
+        if not solicitud.codigo_vendedor:
+            return jsonify({'error': 'Falta el vendedor.'}), 400
+        return jsonify(calcular_ventas([solicitud])[0])
+
+    datos = (request.get_json(silent=True) or {}).get('ventas')
+    if not isinstance(datos, list) or not all(isinstance(d, dict) for d in datos):
+        return jsonify({'error': 'Se espera {"ventas": [...]}.'}), 400
+    solicitudes = [_solicitud(d) for d in datos]
+    if not all(s.codigo_vendedor for s in solicitudes):
+        return jsonify({'error': 'Cada venta necesita vendedor.'}), 400
+
+    resultados = calcular_ventas(solicitudes)
+    return jsonify({'ventas': [
+        dict(r, vendedor=s.codigo_vendedor) for s, r in zip(solicitudes, resultados)
+    ]})
+
+@ventas_bp.route('/lote', methods=['GET', 'POST'])
+@login_required
+@rol_requerido('semiadmin', 'administrador')
+def generar_lote():
+    """Ventas de todos los vendedores de un día: empareja, revisa y crea de una vez."""
+    fecha_val = request.values.get('fecha', date.today().isoformat())
+    try:
+        fecha_obj = datetime.strptime(fecha_val, '%Y-%m-%d').date()
+    except ValueError:
+        fecha_obj = date.today()
+        fecha_val = fecha_obj.isoformat()
+
+    if request.method == 'POST':
+        seleccion = set(request.form.getlist('vendedor'))
+        try:
+            ventas, _ = crear_ventas_lote(fecha_obj, seleccion)
+        except LoteDesactualizado:
+            flash('Otro usuario usó documentos de este lote mientras lo revisabas. Revisa la vista previa.', 'warning')
+            return redirect(url_for('ventas.generar_lote', fecha=fecha_val))
+        if ventas:
+            notificar_accion("crear_ventas_lote", {
+                "cantidad": len(ventas),
+                "fecha": fecha_val,
+                "total": sum(v['total_venta'] for v in ventas)
+            })
+            flash(f'{len(ventas)} ventas registradas.', 'success')
+        else:
+            flash('No había ventas listas para registrar.', 'warning')
+        return redirect(url_for('ventas.generar_lote', fecha=fecha_val))
+
+    propuestas = previsualizar_lote(fecha_obj)
+    listas = [p for p in propuestas if p['estado'] == 'lista']
+    return render_template(
+        'ventas/lote.html',
+        fecha_val  = fecha_val,
+        propuestas = propuestas,
+        total      = sum(p['resultado']['total_valor'] for p in listas),
+        n_listas   = len(listas)
+    )
+
 @ventas_bp.route('/listar', methods=['GET'])
 @login_required
 def listar_ventas():
@@ -291,10 +312,8 @@ def export_pdf_venta(venta_id):
     venta = BDVenta.query.get_or_404(venta_id)
     vendedor = Vendedor.query.filter_by(codigo_vendedor=venta.codigo_vendedor).first()
     logo = current_app.root_path + '/static/logo_incolpan.png'
-    pdf_bytes = generate_pdf_document(venta, vendedor, logo, tipo='venta')
-    resp = make_response(pdf_bytes)
-    resp.headers['Content-Type'] = 'application/pdf'
-    resp.headers['Content-Disposition'] = (
-        f'attachment; filename=Venta_{venta.consecutivo}.pdf'
+    return respuesta_pdf(
+        huella_documento(venta, vendedor, 'venta'),
+        lambda: generate_pdf_document(venta, vendedor, logo, tipo='venta'),
+        f'Venta_{venta.consecutivo}.pdf'
     )
-    return resp
@@ -0,0 +1,40 @@
+// Catálogo de productos compartido por los formularios de pedidos, extras,
+// devoluciones y despachos. Se pide una vez por página con cache 'no-cache':
+// el navegador reutiliza su copia y el servidor responde 304 si no cambió.
+//
+// Uso: <script src=".../catalogo.js" data-url="{{ url_for('productos.catalogo_json') }}"></script>
+// Los <select class="producto-select"> traen del servidor solo la opción
+// seleccionada; aquí se completan con el resto del catálogo.
+
+(function () {
+  const url = document.currentScript.dataset.url;
+
+  function llenarSelect(select, productos) {
+    const actual = select.value;
+    const existente = select.selectedOptions[0];
+    const opciones = [new Option('Seleccione...', '')];
+
+    productos.forEach(p => {
+      const opt = new Option(p.nombre, p.codigo);
+      opt.dataset.precio = p.precio;
+      opciones.push(opt);
+    });
+    // Producto inactivo en un documento viejo: se conserva la opción del servidor
+    if (actual && !productos.some(p => p.codigo === actual) && existente) {
+      opciones.push(existente);
+    }
+
+    select.replaceChildren(...opciones);
+    select.value = actual;
+  }
+
+  window.llenarSelectProducto = llenarSelect;
+
+  window.catalogoProductos = fetch(url, { cache: 'no-cache', credentials: 'same-origin' })
+    .then(r => r.json())
+    .then(data => {
+      const productos = data.productos;
+      document.querySelectorAll('select.producto-select').forEach(sel => llenarSelect(sel, productos));
+      return productos;
+    });
+})();
@@ -0,0 +1,153 @@
+# app/utils/canastas.py
+
+from datetime import datetime
+
+from sqlalchemy import bindparam, func, insert, select, update
+
+from app import db
+from app.models.canastas import Canasta, MovimientoCanasta
+from app.models.vendedor import Vendedor
+
+TIPOS_MOVIMIENTO = ('Sale', 'Entra')
+
+
+def registrar_movimientos(codigo_vendedor, tipo, codigos):
+    """
+    Valida y registra varios códigos de una vez para un vendedor y tipo.
+    Usa consultas por conjunto (no una por código) y una sola transacción.
+    Valida contra el estado desnormalizado de Canasta (quién la tiene), sin
+    recorrer el historial de movimientos.
+    Devuelve [{'codigo', 'ok', 'mensaje'}] en el mismo orden recibido.
+    """
+    codigos = [c.strip() for c in codigos if c and c.strip()]
+    unicos = set(codigos)
+
+    canastas = {c.codigo_barras: c for c in Canasta.query.filter(Canasta.codigo_barras.in_(unicos))}
+
+    resultados, validos, vistos = [], [], set()
+    for codigo in codigos:
+        canasta = canastas.get(codigo)
+        error = None
+
+        if codigo in vistos:
+            error = 'Código repetido en el mismo lote.'
+        elif not canasta:
+            error = 'Canasta no encontrada.'
+        elif tipo == 'Sale' and canasta.actualidad == 'Prestada':
+            error = 'Esta canasta ya ha sido prestada.'
+        elif tipo == 'Entra' and (canasta.actualidad == 'Disponible' or canasta.vendedor_actual is None):
+            error = 'Esta canasta no ha sido prestada.'
+        elif tipo == 'Entra' and canasta.vendedor_actual != codigo_vendedor:
+            error = 'Esta canasta ha sido prestada a otro vendedor. No puedes devolverla.'
+
+        vistos.add(codigo)
+        if error:
+            resultados.append({'codigo': codigo, 'ok': False, 'mensaje': error})
+        else:
+            validos.append(codigo)
+            resultados.append({'codigo': codigo, 'ok': True, 'mensaje': 'Movimiento registrado correctamente.'})
+
+    if validos:
+        ahora = datetime.now()
+        # El estado se cambia con un UPDATE condicionado al que se validó: si otro
+        # escáner movió la canasta entretanto, su fila no cambia. Lo normal es que
+        # cambien todas; si no, se repite canasta por canasta para saber cuáles
+        if _cambiar_estado(validos, codigo_vendedor, tipo, ahora) != len(validos):
+            db.session.rollback()
+            cambiadas = [c for c in validos if _cambiar_estado([c], codigo_vendedor, tipo, ahora)]
+            perdidas = set(validos) - set(cambiadas)
+            for r in resultados:
+                if r['ok'] and r['codigo'] in perdidas:
+                    r['ok'], r['mensaje'] = False, 'La canasta cambió de estado en otro registro. Escanéala de nuevo.'
+            validos = cambiadas
+
+    if validos:
+        # Un solo INSERT (executemany) para todo el lote
+        db.session.execute(insert(MovimientoCanasta), [
+            {
+                'codigo_vendedor': codigo_vendedor,
+                'tipo_movimiento': tipo,
+                'codigo_barras': codigo,
+                'fecha_movimiento': ahora
+            }
+            for codigo in validos
+        ])
+        # Último movimiento de la canasta, en la misma transacción que el movimiento
+        ultimo_id = (select(func.max(MovimientoCanasta.id))
+                     .where(MovimientoCanasta.codigo_barras == Canasta.codigo_barras)
+                     .scalar_subquery())
+        db.session.execute(
+            update(Canasta)
+            .where(Canasta.codigo_barras.in_(validos))
+            .values(ultimo_movimiento_id=ultimo_id)
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+
+    return resultados
+
+
+def _cambiar_estado(codigos, codigo_vendedor, tipo, ahora):
+    """Pasa las canastas al estado del movimiento si siguen en el esperado; devuelve las filas cambiadas."""
+    if tipo == 'Sale':
+        esperado = [Canasta.actualidad != 'Prestada']
+        estado = dict(actualidad='Prestada', vendedor_actual=codigo_vendedor, fecha_prestamo=ahora)
+    else:
+        esperado = [Canasta.actualidad != 'Disponible', Canasta.vendedor_actual == codigo_vendedor]
+        estado = dict(actualidad='Disponible', vendedor_actual=None, fecha_prestamo=None)
+    return db.session.execute(
+        update(Canasta)
+        .where(Canasta.codigo_barras.in_(codigos), *esperado)
+        .values(**estado)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def canastas_perdidas(limite_fecha, codigo_vendedor=None):
+    """
+    Canastas prestadas desde antes de `limite_fecha`, con su vendedor.
+    Lee el estado desnormalizado: es un rango sobre (actualidad, fecha_prestamo).
+    """
+    query = (db.session.query(
+                Canasta.codigo_barras,
+                Canasta.fecha_prestamo,
+                Vendedor.nombre.label('nombre_vendedor')
+            )
+            .join(Vendedor, Vendedor.codigo_vendedor == Canasta.vendedor_actual)
+            .filter(Canasta.actualidad == 'Prestada')
+            .filter(Canasta.fecha_prestamo <= limite_fecha))
+    if codigo_vendedor:
+        query = query.filter(Canasta.vendedor_actual == codigo_vendedor)
+    return query.order_by(Canasta.fecha_prestamo).all()
+
+
+def limpiar_estado_canastas():
+    """Deja todas las canastas sin prestatario (tras borrar movimientos)."""
+    db.session.execute(
+        update(Canasta).values(actualidad='Disponible', vendedor_actual=None,
+                               fecha_prestamo=None, ultimo_movimiento_id=None)
+    )
+
+
+def reconstruir_estado_canastas():
+    """Recalcula vendedor_actual, fecha_prestamo y último movimiento desde el historial."""
+    ultimo_id = (select(func.max(MovimientoCanasta.id))
+                 .where(MovimientoCanasta.codigo_barras == Canasta.codigo_barras)
+                 .scalar_subquery())
+    db.session.execute(update(Canasta).values(ultimo_movimiento_id=ultimo_id))
+
+    ultimo = (select(MovimientoCanasta.codigo_barras, MovimientoCanasta.codigo_vendedor,
+                     MovimientoCanasta.fecha_movimiento)
+              .join(Canasta, Canasta.ultimo_movimiento_id == MovimientoCanasta.id)
+              .where(MovimientoCanasta.tipo_movimiento == 'Sale'))
+    db.session.execute(update(Canasta).values(vendedor_actual=None, fecha_prestamo=None))
+    prestadas = db.session.execute(ultimo).all()
+    if prestadas:
+        db.session.execute(
+            update(Canasta.__table__)
+            .where(Canasta.__table__.c.codigo_barras == bindparam('b_codigo'))
+            .values(vendedor_actual=bindparam('b_vendedor'), fecha_prestamo=bindparam('b_fecha')),
+            [{'b_codigo': c, 'b_vendedor': v, 'b_fecha': f} for c, v, f in prestadas]
+        )
+    db.session.commit()
+    return len(prestadas)
@@ -0,0 +1,130 @@
+# app/utils/despachos.py
+
+from decimal import Decimal
+
+from sqlalchemy import delete, insert, select
+
+from app import db
+from app.models.despachos import BDDespacho, BDDespachoItem
+from app.models.extra_item import BDExtraItem
+from app.models.extras import BDExtra
+from app.models.pedido_item import BDPedidoItem
+from app.models.pedidos import BDPedido
+from app.utils.productos import catalogo
+from app.utils.resumen_diario import recalcular_porcion
+
+class DespachoExistente(Exception):
+    """El documento ya tiene despacho y no se pidió reemplazarlo."""
+
+    def __init__(self, despacho_id):
+        super().__init__(f"Ya existe el despacho {despacho_id}")
+        self.despacho_id = despacho_id
+
+
+ORIGENES = {
+    'pedido': (BDPedido, BDPedidoItem, BDPedidoItem.pedido_id, 'pedido_id'),
+    'extra':  (BDExtra,  BDExtraItem,  BDExtraItem.extra_id,   'extra_id'),
+}
+
+
+def _lineas_base(conn, despacho_id, origen_id, tipo_origen):
+    """
+    Filas de partida, como las muestra el formulario: las del despacho si ya
+    existe (editar) o las del pedido/extra con lo pedido como despachado (crear).
+    """
+    if despacho_id is not None:
+        i = BDDespachoItem.__table__
+        filas = conn.execute(
+            select(i.c.producto_cod, i.c.cantidad_pedida, i.c.cantidad, i.c.lote, i.c.precio_unitario)
+            .where(i.c.despacho_id == despacho_id).order_by(i.c.id)
+        ).all()
+        return [dict(f._mapping) for f in filas]
+
+    _, item_model, fk, _ = ORIGENES[tipo_origen]
+    por_codigo = catalogo().por_codigo
+    filas = conn.execute(
+        select(item_model.producto_cod, item_model.cantidad).where(fk == origen_id).order_by(item_model.id)
+    ).all()
+    return [
+        {'producto_cod': cod, 'cantidad_pedida': cant, 'cantidad': cant, 'lote': '',
+         'precio_unitario': por_codigo[cod].precio if cod in por_codigo else 0}
+        for cod, cant in filas
+    ]
+
+
+def guardar_despacho_dictado(codigo_origen, tipo_origen, dictados, reemplazar=False):
+    """
+    Guarda el despacho de `codigo_origen` con los productos dictados por voz
+    ([{codigo, cantidad, lote}]) aplicados sobre sus líneas, igual que si se
+    enviara el formulario: lo dictado reemplaza cantidad y lote de la línea del
+    producto y lo que no estaba en el documento se agrega con pedida 0.
+
+    Una sola transacción de INSERT múltiples. Si el despacho ya existía se le
+    reemplazan los ítems solo con `reemplazar` (editar es de administrador);
+    si no, lanza DespachoExistente. Devuelve un dict con el resultado, o None
+    si el documento de origen no existe.
+    """
+    cab_model, _, _, columna_origen = ORIGENES[tipo_origen]
+    conn = db.session.connection()
+
+    origen = conn.execute(
+        select(cab_model.id, cab_model.codigo_vendedor, cab_model.fecha, cab_model.comentarios)
+        .where(cab_model.consecutivo == codigo_origen)
+    ).first()
+    if origen is None:
+        return None
+
+    d = BDDespacho.__table__
+    existente = conn.execute(
+        select(d.c.id, d.c.fecha, d.c.vendedor_cod).where(d.c.codigo_origen == codigo_origen).limit(1)
+    ).first()
+    despacho_id = existente.id if existente else None
+    if existente and not reemplazar:
+        raise DespachoExistente(despacho_id)
+
+    lineas = _lineas_base(conn, despacho_id, origen.id, tipo_origen)
+    por_linea = {}
+    for linea in lineas:
+        por_linea.setdefault(linea['producto_cod'], linea)
+    por_codigo = catalogo().por_codigo
+    for p in dictados:
+        linea = por_linea.get(p['codigo'])
+        if linea is None:
+            producto = por_codigo.get(p['codigo'])
+            linea = por_linea[p['codigo']] = {
+                'producto_cod': p['codigo'], 'cantidad_pedida': 0,
+                'precio_unitario': producto.precio if producto else 0,
+            }
+            lineas.append(linea)
+        linea['cantidad'] = int(p['cantidad'] or 0)
+        linea['lote'] = str(p.get('lote') or '')
+
+    if existente:
+        fecha, vendedor_cod = existente.fecha, existente.vendedor_cod
+        conn.execute(delete(BDDespachoItem.__table__).where(BDDespachoItem.despacho_id == despacho_id))
+    else:
+        fecha, vendedor_cod = origen.fecha, origen.codigo_vendedor
+        despacho_id = conn.execute(insert(d).values(
+            fecha=fecha, vendedor_cod=vendedor_cod, codigo_origen=codigo_origen,
+            tipo_origen=tipo_origen, comentarios=origen.comentarios, despachado=True
+        )).inserted_primary_key[0]
+
+    total = Decimal('0')
+    items = []
+    for linea in lineas:
+        precio = Decimal(str(linea['precio_unitario'] or 0))
+        subtotal = linea['cantidad'] * precio
+        total += subtotal
+        items.append({
+            'despacho_id': despacho_id, 'producto_cod': linea['producto_cod'],
+            'cantidad_pedida': linea['cantidad_pedida'], 'cantidad': linea['cantidad'],
+            'lote': linea['lote'], 'precio_unitario': precio, 'subtotal': subtotal,
+            columna_origen: origen.id,
+        })
+    if items:
+        conn.execute(insert(BDDespachoItem.__table__), items)
+
+    recalcular_porcion(conn, 'despacho', fecha, vendedor_cod)
+    db.session.commit()
+    return {'id': despacho_id, 'codigo_origen': codigo_origen, 'nuevo': existente is None,
+            'items': len(items), 'total': float(total)}
@@ -1,11 +1,104 @@
 # app/utils/documentos.py
-from sqlalchemy import func
+import threading
+
+from flask import current_app, has_app_context
+from sqlalchemy import func, select, update, insert, cast, Integer
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.consecutivo import BDConsecutivo
+
+# Bloques reservados por este proceso: prefijo -> [siguiente, tope]
+_BLOQUES = {}
+_BLOQUES_LOCK = threading.Lock()
+
+
+def _numero_inicial(prefix, model):
+    """
+    Primer uso del prefijo: arranca después del mayor número ya emitido,
+    ya sea por id (como se numeraba antes) o por el sufijo del código.
+    """
+    if model is None:
+        return 0
+    columna = getattr(model, 'consecutivo', None) or getattr(model, 'codigo')
+    sufijo = cast(func.substr(columna, len(prefix) + 2), Integer)
+    with db.engine.connect() as conn:
+        max_id, max_codigo = conn.execute(
+            select(func.max(model.id),
+                   select(func.max(sufijo)).where(columna.like(f"{prefix}-%")).scalar_subquery())
+        ).one()
+    return max(max_id or 0, max_codigo or 0)
+
+
+def _reservar(prefix, cantidad, model=None):
+    """
+    Suma `cantidad` al contador del prefijo en una transacción propia y
+    devuelve el último número reservado. El UPDATE bloquea la fila, así que
+    dos procesos nunca obtienen el mismo rango.
+    """
+    t = BDConsecutivo.__table__
+    for _ in range(3):
+        with db.engine.begin() as conn:
+            res = conn.execute(
+                update(t).where(t.c.prefijo == prefix).values(ultimo=t.c.ultimo + cantidad)
+            )
+            if res.rowcount:
+                return conn.execute(select(t.c.ultimo).where(t.c.prefijo == prefix)).scalar_one()
+
+        inicial = _numero_inicial(prefix, model)
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(insert(t).values(prefijo=prefix, ultimo=inicial))
+        except IntegrityError:
+            pass  # otro proceso lo creó primero; se reintenta el UPDATE
+    raise RuntimeError(f"No se pudo reservar consecutivo para {prefix}")
+
+
+def siguiente_numero(prefix, model=None, bloque=None):
+    """
+    Siguiente número del prefijo. Con bloque > 1 el proceso reserva varios
+    de una vez y los entrega desde memoria (puede dejar huecos al reiniciar).
+    """
+    if bloque is None:
+        bloque = current_app.config.get('CONSECUTIVO_BLOQUE', 1) if has_app_context() else 1
+    if bloque <= 1:
+        return _reservar(prefix, 1, model)
+
+    with _BLOQUES_LOCK:
+        actual = _BLOQUES.get(prefix)
+        if not actual or actual[0] > actual[1]:
+            tope = _reservar(prefix, bloque, model)
+            actual = _BLOQUES[prefix] = [tope - bloque + 1, tope]
+        n = actual[0]
+        actual[0] += 1
+        return n
+
 
 def generar_consecutivo(model, prefix):
     """
-    Devuelve un consecutivo tipo PREFIX-0001, basado en el último id de model.
+    Devuelve un consecutivo tipo PREFIX-0001 desde el contador del prefijo.
     Uso: generar_consecutivo(BDPedido, 'PD'), generar_consecutivo(BDExtra, 'EX'), etc.
     """
-    ultimo = model.query.order_by(model.id.desc()).first()
-    n = (ultimo.id + 1) if ultimo else 1
-    return f"{prefix}-{n:05d}"
+    return f"{prefix}-{siguiente_numero(prefix, model):05d}"
+
+
+def generar_consecutivos(model, prefix, cantidad):
+    """Varios consecutivos seguidos con una sola reserva (para lotes)."""
+    if cantidad <= 0:
+        return []
+    tope = _reservar(prefix, cantidad, model)
+    return [f"{prefix}-{n:05d}" for n in range(tope - cantidad + 1, tope + 1)]
+
+
+def totales_por_documento(item_model, fk, ids):
+    """
+    {id del documento: suma de subtotales} para los documentos de una página,
+    en una sola consulta agrupada (en vez de cargar los ítems de cada uno).
+    """
+    if not ids:
+        return {}
+    filas = (db.session.query(fk, func.sum(item_model.subtotal))
+             .filter(fk.in_(ids))
+             .group_by(fk)
+             .all())
+    return {doc_id: total for doc_id, total in filas}
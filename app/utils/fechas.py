@@ -2,13 +2,49 @@
 
 from datetime import date, timedelta
 import calendar
+import threading
+import time
 from app.models.festivo import Festivo
 from app import db
 import holidays
 
+# Calendario laboral en memoria: año -> (momento de carga, festivos, prefijos)
+# prefijos[i] = días hábiles desde el 1 de enero hasta el día i-1 del año.
+_CALENDARIO = {}
+_CALENDARIO_LOCK = threading.Lock()
+# Otros procesos (workers) no ven la invalidación local; caducan solos.
+CALENDARIO_TTL = 600
+
+
+def invalidar_calendario():
+    """Descarta el calendario en memoria (llamar tras cambiar festivos)."""
+    with _CALENDARIO_LOCK:
+        _CALENDARIO.clear()
+
+
+def _calendario_anio(year: int):
+    entrada = _CALENDARIO.get(year)
+    if entrada and time.monotonic() - entrada[0] < CALENDARIO_TTL:
+        return entrada
+
+    inicio = date(year, 1, 1)
+    fin    = date(year, 12, 31)
+    festivos = {
+        f for (f,) in db.session.query(Festivo.fecha)
+                              .filter(Festivo.fecha >= inicio, Festivo.fecha <= fin)
+    }
+    prefijos = [0]
+    for d in rango_fechas(inicio, fin):
+        prefijos.append(prefijos[-1] + (d.weekday() < 6 and d not in festivos))
+
+    entrada = (time.monotonic(), festivos, prefijos)
+    with _CALENDARIO_LOCK:
+        _CALENDARIO[year] = entrada
+    return entrada
+
 def es_festivo(d: date) -> bool:
     """Comprueba si d está en la tabla Festivo."""
-    return db.session.query(Festivo).filter_by(fecha=d).first() is not None
+    return d in _calendario_anio(d.year)[1]
 
 def rango_fechas(start: date, end: date):
     d = start
@@ -20,11 +56,16 @@ def contar_habiles(start: date, end: date) -> int:
     """
     Cuenta lunes–sábado excluyendo festivos.
     Ahora weekday()<6 incluye sábados (0 = lunes, …, 5 = sábado).
+    Usa sumas de prefijos por año: una consulta por año, no por día.
     """
     cnt = 0
-    for d in rango_fechas(start, end):
-        if d.weekday() < 6 and not es_festivo(d):
-            cnt += 1
+    for year in range(start.year, end.year + 1):
+        desde = max(start, date(year, 1, 1))
+        hasta = min(end, date(year, 12, 31))
+        if desde > hasta:
+            continue
+        prefijos = _calendario_anio(year)[2]
+        cnt += prefijos[hasta.timetuple().tm_yday] - prefijos[desde.timetuple().tm_yday - 1]
     return cnt
 
 def dias_habiles_mes(year: int, month: int) -> int:
@@ -44,3 +85,4 @@ def sync_festivos_oficiales(years):
         if not Festivo.query.filter_by(fecha=d).first():
             db.session.add(Festivo(fecha=d, nota=name))
     db.session.commit()
+    invalidar_calendario()
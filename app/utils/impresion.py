@@ -0,0 +1,131 @@
+# app/utils/impresion.py
+
+import io
+import multiprocessing
+import os
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+from sqlalchemy.orm import selectinload
+
+from app.models.despachos import BDDespacho
+from app.utils.metricas import medir_documento
+from app.utils.pdf_cache import guardar_pdf, huella, leer_pdf
+from app.utils.pdf_utils import generate_pdf_despacho, generate_pdf_despachos, huella_despacho
+from app.utils.productos import catalogo
+from app.utils.vendedores import nombres_vendedores
+
+DEFAULTS = {
+    'IMPRESION_PROCESOS':        None,  # procesos de render; None = núcleos disponibles
+    # Cada proceso hijo tarda ~1.5 s en importar la app y un despacho ~6 ms en
+    # pintarse: por debajo de unos cientos de documentos sale mejor en serie.
+    'IMPRESION_MINIMO_PARALELO': 300,
+}
+
+FORMATOS = ('pdf', 'zip')
+
+# --- Impresión en bloque de despachos --------------------------------------
+#
+# Todo lo que se imprime se carga antes en pocas consultas y se pasa a tuplas
+# simples: así se puede enviar a procesos hijos (ReportLab retiene el GIL, los
+# hilos no ayudan) y esos procesos no necesitan ni app context ni BD.
+
+DespachoImpresion = namedtuple(
+    'DespachoImpresion', 'id fecha vendedor_cod codigo_origen tipo_origen comentarios items'
+)
+ItemImpresion = namedtuple('ItemImpresion', 'producto_cod cantidad_pedida cantidad lote subtotal')
+VendedorImpresion = namedtuple('VendedorImpresion', 'codigo_vendedor nombre')
+
+
+def _cfg(clave):
+    return current_app.config.get(clave, DEFAULTS[clave])
+
+
+def cargar_despachos(fecha, vendedores=None):
+    """Despachos de `fecha` (opcionalmente de ciertos vendedores) con sus ítems, en dos consultas."""
+    query = (BDDespacho.query
+             .options(selectinload(BDDespacho.items))
+             .filter(BDDespacho.fecha == fecha))
+    if vendedores:
+        query = query.filter(BDDespacho.vendedor_cod.in_(vendedores))
+    query = query.order_by(BDDespacho.vendedor_cod, BDDespacho.tipo_origen, BDDespacho.codigo_origen)
+
+    return [
+        DespachoImpresion(
+            d.id, d.fecha, d.vendedor_cod, d.codigo_origen, d.tipo_origen, d.comentarios,
+            tuple(ItemImpresion(it.producto_cod, it.cantidad_pedida, it.cantidad, it.lote, it.subtotal)
+                  for it in d.items)
+        )
+        for d in query
+    ]
+
+
+def _renderizar(trabajo):
+    """Se ejecuta en un proceso hijo: solo recibe tuplas y devuelve bytes."""
+    despacho, vendedor, nombres = trabajo
+    return generate_pdf_despacho(despacho, vendedor, tipo=despacho.tipo_origen, nombres=nombres)
+
+
+def _renderizar_todos(trabajos):
+    procesos = _cfg('IMPRESION_PROCESOS') or os.cpu_count() or 1
+    if procesos <= 1 or len(trabajos) < _cfg('IMPRESION_MINIMO_PARALELO'):
+        return [_renderizar(t) for t in trabajos]
+
+    procesos = min(procesos, len(trabajos))
+    # 'spawn': el proceso web tiene hilos (socketio, telegram) y hacer fork con ellos no es seguro
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+        return list(pool.map(_renderizar, trabajos, chunksize=-(-len(trabajos) // procesos)))
+
+
+def tirada_despachos(fecha, vendedores=None, formato='pdf'):
+    """
+    Imprime todos los despachos de un día.
+    Devuelve (contenido, cantidad de despachos, cuántos salieron de la caché).
+
+      - 'pdf': un solo PDF, un despacho por página (cacheado por el conjunto).
+      - 'zip': un PDF por despacho, generados en paralelo y cacheados uno a uno
+        con la misma clave que la descarga individual.
+    """
+    despachos = cargar_despachos(fecha, vendedores)
+    if not despachos:
+        return None, 0, 0
+
+    por_codigo = catalogo().por_codigo
+    codigos = {it.producto_cod for d in despachos for it in d.items}
+    nombres = {c: por_codigo[c].nombre for c in codigos if c in por_codigo}
+    mapa = nombres_vendedores()
+    vendedores_imp = {d.vendedor_cod: VendedorImpresion(d.vendedor_cod, mapa[d.vendedor_cod])
+                      for d in despachos if d.vendedor_cod in mapa}
+    claves = [huella_despacho(d, vendedores_imp.get(d.vendedor_cod), d.tipo_origen) for d in despachos]
+
+    if formato == 'pdf':
+        clave = huella('tirada', fecha.isoformat(), claves)
+        pdf = leer_pdf(clave)
+        if pdf is not None:
+            return pdf, len(despachos), len(despachos)
+        with medir_documento('pdf', 'tirada'):
+            pdf = generate_pdf_despachos(despachos, vendedores_imp, nombres)
+        guardar_pdf(clave, pdf)
+        return pdf, len(despachos), 0
+
+    pdfs = [leer_pdf(c) for c in claves]
+    faltan = [i for i, pdf in enumerate(pdfs) if pdf is None]
+    trabajos = []
+    for i in faltan:
+        d = despachos[i]
+        trabajos.append((d, vendedores_imp.get(d.vendedor_cod),
+                         {it.producto_cod: nombres.get(it.producto_cod) for it in d.items}))
+    with medir_documento('pdf', 'tirada_zip'):
+        renderizados = _renderizar_todos(trabajos)
+    for i, pdf in zip(faltan, renderizados):
+        pdfs[i] = pdf
+        guardar_pdf(claves[i], pdf)
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for d, pdf in zip(despachos, pdfs):
+            zf.writestr(f"{d.vendedor_cod}_{d.codigo_origen}_despacho.pdf", pdf)
+    return buffer.getvalue(), len(despachos), len(despachos) - len(faltan)
@@ -0,0 +1,249 @@
+# app/utils/metricas.py
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+# --- Métricas en formato de texto de Prometheus ----------------------------
+#
+# Registro mínimo en memoria (sin prometheus_client): contadores, medidores e
+# histogramas con etiquetas. Actualizar una serie es un bisect y un lock, así
+# que puede quedar siempre encendido. Los medidores que dependen de otro
+# componente (pool de la BD, cola de notificaciones) se leen al pedir
+# /metrics, no en cada petición.
+#
+# Los valores son de cada proceso: con varios workers Prometheus debe
+# raspar cada uno (o agregarse con la etiqueta de instancia).
+
+log = logging.getLogger(__name__)
+
+PREFIJO = 'incolpan_'
+BUCKETS_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_DOCUMENTOS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METODOS = frozenset(('GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS'))
+
+_REGISTRO = []
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(nombres, valores, extra=''):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = PREFIJO + nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._series = {}
+        self._lock = threading.Lock()
+        _REGISTRO.append(self)
+
+    def _muestras(self):
+        with self._lock:
+            return list(self._series.items())
+
+    def exponer(self):
+        yield f'# HELP {self.nombre} {self.ayuda}'
+        yield f'# TYPE {self.nombre} {self.tipo}'
+        for valores, valor in sorted(self._muestras()):
+            yield f'{self.nombre}{_etiquetas(self.etiquetas, valores)} {_numero(valor)}'
+
+
+class Contador(_Metrica):
+    tipo = 'counter'
+
+    def inc(self, *valores, cantidad=1):
+        with self._lock:
+            self._series[valores] = self._series.get(valores, 0) + cantidad
+
+
+class Medidor(_Metrica):
+    """Gauge. Con `leer` el valor se calcula al exponer: leer() -> número o {(etiquetas): número}."""
+    tipo = 'gauge'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), leer=None):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.leer = leer
+
+    def inc(self, *valores, cantidad=1):
+        with self._lock:
+            self._series[valores] = self._series.get(valores, 0) + cantidad
+
+    def dec(self, *valores, cantidad=1):
+        self.inc(*valores, cantidad=-cantidad)
+
+    def fijar(self, valor, *valores):
+        with self._lock:
+            self._series[valores] = valor
+
+    def _muestras(self):
+        if self.leer is None:
+            return super()._muestras()
+        try:
+            leido = self.leer()
+        except Exception:
+            return []  # una fuente caída no tumba el resto de /metrics
+        if leido is None:
+            return []
+        return list(leido.items()) if isinstance(leido, dict) else [((), leido)]
+
+
+class Histograma(_Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_HTTP):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor, *valores):
+        i = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                # [cuenta por bucket (sin acumular)..., +Inf, suma]
+                serie = self._series[valores] = [0] * (len(self.buckets) + 1) + [0.0]
+            serie[i] += 1
+            serie[-1] += valor
+
+    def _muestras(self):
+        with self._lock:
+            return [(valores, list(serie)) for valores, serie in self._series.items()]
+
+    def exponer(self):
+        yield f'# HELP {self.nombre} {self.ayuda}'
+        yield f'# TYPE {self.nombre} {self.tipo}'
+        for valores, serie in sorted(self._muestras()):
+            acumulado = 0
+            for limite, cuenta in zip(self.buckets + (float('inf'),), serie):
+                acumulado += cuenta
+                le = f'le="{_numero(limite)}"'
+                yield f'{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, le)} {acumulado}'
+            yield f'{self.nombre}_sum{_etiquetas(self.etiquetas, valores)} {_numero(serie[-1])}'
+            yield f'{self.nombre}_count{_etiquetas(self.etiquetas, valores)} {acumulado}'
+
+
+def exponer_metricas():
+    """Texto de /metrics (formato de exposición 0.0.4)."""
+    lineas = []
+    for metrica in _REGISTRO:
+        lineas.extend(metrica.exponer())
+    return '\n'.join(lineas) + '\n'
+
+
+# --- Métricas de la aplicación ---------------------------------------------
+
+HTTP_DURACION = Histograma(
+    'http_request_duration_seconds', 'Duración de las peticiones HTTP por endpoint.',
+    ('endpoint', 'method'))
+HTTP_PETICIONES = Contador(
+    'http_requests_total', 'Peticiones HTTP por endpoint y código de estado.',
+    ('endpoint', 'method', 'status'))
+WEBHOOK_DURACION = Histograma(
+    'webhook_duration_seconds', 'Duración del webhook de Dialogflow por tag.', ('tag',))
+SOCKETIO_CLIENTES = Medidor(
+    'socketio_clients', 'Clientes Socket.IO conectados a este worker.')
+DOCUMENTO_DURACION = Histograma(
+    'document_generation_seconds', 'Tiempo de generación de PDF y Excel.',
+    ('formato', 'documento'), BUCKETS_DOCUMENTOS)
+PDF_CACHE = Contador(
+    'pdf_cache_requests_total', 'Búsquedas en la caché de PDF.', ('resultado',))
+
+
+def _pool():
+    from app import db
+    pool = db.engine.pool
+    valores = {}
+    for nombre, metodo in (('size', 'size'), ('checked_out', 'checkedout'),
+                           ('overflow', 'overflow'), ('checked_in', 'checkedin')):
+        leer = getattr(pool, metodo, None)
+        if callable(leer):
+            valores[(nombre,)] = leer()
+    if ('overflow',) in valores:
+        # QueuePool lo lleva en negativo mientras no se abrió todo el pool
+        valores[('overflow',)] = max(0, valores[('overflow',)])
+    return valores
+
+
+def _sesiones_voz():
+    from app.utils.socket_session import _POR_SESION
+    return len(_POR_SESION)
+
+
+def _cola_notificaciones():
+    from app.utils.telegram import pendientes_en_cola
+    return pendientes_en_cola()
+
+
+Medidor('db_pool_connections', 'Conexiones del pool de SQLAlchemy por estado.', ('state',), leer=_pool)
+Medidor('socketio_voice_sessions', 'Sesiones de voz con al menos un socket en este worker.', leer=_sesiones_voz)
+Medidor('notification_queue_depth', 'Notificaciones de Telegram pendientes o en envío.',
+        leer=_cola_notificaciones)
+
+
+@contextmanager
+def medir_documento(formato, documento=None):
+    """Cronometra la generación de un PDF/Excel; por defecto etiqueta con el endpoint."""
+    if documento is None:
+        documento = (request.endpoint or 'sin_ruta') if has_request_context() else 'cli'
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        DOCUMENTO_DURACION.observar(time.perf_counter() - inicio, formato, documento)
+
+
+# --- Instrumentación de peticiones -----------------------------------------
+
+def _iniciar():
+    g._metricas_inicio = time.perf_counter()
+
+
+def _terminar(response):
+    inicio = g.pop('_metricas_inicio', None)
+    if inicio is None:
+        return response
+    duracion = time.perf_counter() - inicio
+    # Etiquetas acotadas: nada que venga del cliente entra tal cual
+    endpoint = request.endpoint or 'sin_ruta'
+    metodo = request.method if request.method in METODOS else 'otro'
+    HTTP_DURACION.observar(duracion, endpoint, metodo)
+    HTTP_PETICIONES.inc(endpoint, metodo, str(response.status_code))
+    tag = g.get('webhook_tag')
+    if tag is not None:
+        WEBHOOK_DURACION.observar(duracion, tag)
+    return response
+
+
+def registrar_metricas(app):
+    """Mide las peticiones y publica /metrics si METRICAS=1 y hay METRICAS_TOKEN."""
+    if not app.config.get('METRICAS'):
+        return False
+    if not app.config.get('METRICAS_TOKEN'):
+        # Nombres de endpoints, estado del pool y de la cola no son públicos
+        log.warning("METRICAS=1 sin METRICAS_TOKEN: /metrics queda desactivado")
+        return False
+    app.before_request(_iniciar)
+    app.after_request(_terminar)
+
+    from app.routes.metricas import metricas_bp
+    app.register_blueprint(metricas_bp)
+    return True
@@ -35,6 +35,9 @@ def notificar_accion(tipo, datos):
         elif tipo == "crear_venta":
             mensaje = f"💰 *Venta* registrada por *{usuario}* para *{datos['vendedor']}* el `{datos['fecha']}`.\nValor: ${datos['total']:,.0f}"
 
+        elif tipo == "crear_ventas_lote":
+            mensaje = f"💰 *{datos['cantidad']} ventas* generadas en lote por *{usuario}* el `{datos['fecha']}`.\nValor: ${datos['total']:,.0f}"
+
         elif tipo == "eliminar_venta":
             mensaje = f"🗑 *Venta* `{datos['consecutivo']}` del *{datos['vendedor']}* el `{datos['fecha']}` fue *eliminada* por *{usuario}*."
 
@@ -0,0 +1,152 @@
+# app/utils/pdf_cache.py
+
+import hashlib
+import json
+import os
+import threading
+
+from flask import current_app, make_response, request
+
+from app.utils.metricas import PDF_CACHE, medir_documento
+
+# Cambiar al modificar el diseño de los PDF: invalida toda la caché
+FORMATO_PDF = 3
+
+DEFAULTS = {
+    'PDF_CACHE':        True,
+    'PDF_CACHE_DIR':    None,   # por defecto <instance>/pdf_cache
+    'PDF_CACHE_MAX_MB': 64,     # tamaño máximo en disco antes de desalojar (LRU)
+}
+
+# --- Caché de PDFs renderizados --------------------------------------------
+#
+# Direccionada por contenido: la clave es un hash del tipo, el id y todos los
+# datos que pinta el documento (ver huella_* en pdf_utils). Al editar un
+# documento cambia la clave, así que no hace falta invalidar a mano; el PDF
+# viejo deja de pedirse y sale por LRU. Se guarda en disco para compartirla
+# entre workers; el mtime de cada archivo marca su último uso.
+#
+# La misma clave se usa como ETag, de modo que el navegador que ya tiene la
+# versión vigente recibe un 304 sin que se lea ni se genere nada.
+
+_tamano = {'bytes': None}
+_lock = threading.Lock()
+
+
+def _cfg(clave):
+    return current_app.config.get(clave, DEFAULTS[clave])
+
+
+def _directorio():
+    directorio = _cfg('PDF_CACHE_DIR') or os.path.join(current_app.instance_path, 'pdf_cache')
+    os.makedirs(directorio, exist_ok=True)
+    return directorio
+
+
+def huella(tipo, doc_id, datos):
+    """Clave de caché / ETag de un documento a partir de los datos que pinta."""
+    texto = json.dumps([FORMATO_PDF, tipo, doc_id, datos], default=str, separators=(',', ':'))
+    return f"{tipo}-{doc_id}-" + hashlib.sha1(texto.encode('utf-8')).hexdigest()[:20]
+
+
+def _archivos(directorio):
+    with os.scandir(directorio) as it:
+        return [e for e in it if e.is_file() and e.name.endswith('.pdf')]
+
+
+def _desalojar(directorio, nuevo):
+    """Borra los PDF menos usados hasta quedar bajo PDF_CACHE_MAX_MB."""
+    limite = _cfg('PDF_CACHE_MAX_MB') * 1024 * 1024
+    with _lock:
+        if _tamano['bytes'] is None:
+            _tamano['bytes'] = sum(e.stat().st_size for e in _archivos(directorio))
+        else:
+            _tamano['bytes'] += nuevo
+        if _tamano['bytes'] <= limite:
+            return
+
+        # Otros workers también escriben: se recuenta desde el disco
+        entradas = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for e in _archivos(directorio)))
+        total = sum(tam for _, tam, _ in entradas)
+        for _, tam, ruta in entradas:
+            if total <= limite * 0.9:
+                break
+            try:
+                os.remove(ruta)
+                total -= tam
+            except FileNotFoundError:
+                pass
+        _tamano['bytes'] = total
+
+
+def leer_pdf(clave):
+    """Bytes en caché de `clave`, o None."""
+    if not _cfg('PDF_CACHE'):
+        return None
+    ruta = os.path.join(_directorio(), clave + '.pdf')
+    try:
+        with open(ruta, 'rb') as f:
+            pdf = f.read()
+        os.utime(ruta)  # marca de uso para el LRU
+        return pdf
+    except FileNotFoundError:
+        return None
+
+
+def guardar_pdf(clave, pdf):
+    if not _cfg('PDF_CACHE'):
+        return
+    directorio = _directorio()
+    ruta = os.path.join(directorio, clave + '.pdf')
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, 'wb') as f:
+        f.write(pdf)
+    os.replace(temporal, ruta)  # atómico: nadie lee un PDF a medio escribir
+    _desalojar(directorio, len(pdf))
+
+
+def pdf_cacheado(clave, generar):
+    """Bytes del PDF de `clave`; llama a generar() solo si no está en caché."""
+    pdf = leer_pdf(clave)
+    if pdf is None:
+        PDF_CACHE.inc('fallo')
+        with medir_documento('pdf', clave.split('-', 1)[0]):
+            pdf = generar()
+        guardar_pdf(clave, pdf)
+    else:
+        PDF_CACHE.inc('acierto')
+    return pdf
+
+
+def respuesta_pdf(clave, generar, nombre_archivo):
+    """
+    Respuesta de descarga del PDF con ETag = clave.
+    Si el cliente ya tiene esa versión responde 304 sin generar ni leer el PDF.
+    """
+    if request.if_none_match.contains(clave):
+        PDF_CACHE.inc('304')
+        resp = make_response('', 304)
+    else:
+        resp = make_response(pdf_cacheado(clave, generar))
+        resp.headers['Content-Type'] = 'application/pdf'
+        resp.headers['Content-Disposition'] = f'attachment; filename={nombre_archivo}'
+    resp.set_etag(clave)
+    # El documento puede editarse: el cliente guarda la copia pero revalida siempre
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True
+    return resp
+
+
+def limpiar_cache_pdf():
+    """Borra todos los PDF en caché; devuelve cuántos se eliminaron."""
+    directorio = _directorio()
+    borrados = 0
+    with _lock:
+        for e in _archivos(directorio):
+            try:
+                os.remove(e.path)
+                borrados += 1
+            except FileNotFoundError:
+                pass
+        _tamano['bytes'] = 0
+    return borrados
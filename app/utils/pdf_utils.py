@@ -2,10 +2,12 @@
 
 from io import BytesIO
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, Spacer, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, Spacer, TableStyle, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
-from app.models.producto import Producto
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from app.utils.pdf_cache import huella
+from app.utils.productos import catalogo, producto_catalogo
 
 # Media carta en retrato (5.5"×8.5")
 MEDIA_CARTA = (letter[1] / 2, letter[0])
@@ -24,38 +26,152 @@ label_doc = {
     'devolucion': 'Devolución', 'venta': 'Venta'
 }
 
+
+# --- Plantillas precompiladas ----------------------------------------------
+#
+# Estilos, anchos de columna y TableStyle se arman una sola vez por proceso.
+# Las celdas van como texto plano (un Paragraph por celda es lo más caro de
+# ReportLab) con fuente y alineación dadas por el TableStyle. Solo un nombre
+# de producto que no cabe en su columna se envuelve en Paragraph; si caben
+# todos, la tabla lleva alto de fila fijo y ReportLab no mide celda por celda.
+
+_styles = getSampleStyleSheet()
+
+# — Pedido / extra / devolución / venta (márgenes de 15) —
+ANCHO_DOC = MEDIA_CARTA[0] - 30
+PADDING = 4           # izquierda/derecha de cada celda
+LETRA_CELDA = ('Helvetica', 6.5, 8)        # fuente, tamaño, interlineado
+LETRA_ENCABEZADO = ('Helvetica-Bold', 8, 9)
+ALTO_CELDA = LETRA_CELDA[2] + 6            # interlineado + padding superior e inferior (3 + 3)
+ALTO_ENCABEZADO = LETRA_ENCABEZADO[2] + 6
+
+title_style = ParagraphStyle('Title', parent=_styles['Heading1'], alignment=1, fontSize=14, spaceAfter=6)
+meta_style = ParagraphStyle('Meta', parent=_styles['Normal'], fontSize=12, leading=11)
+cell_style = ParagraphStyle('Cell', parent=_styles['Normal'], fontName=LETRA_CELDA[0],
+                            fontSize=LETRA_CELDA[1], leading=LETRA_CELDA[2])
+
+
+def _estilo_tabla(*extra):
+    """Rejilla común: encabezado gris y en negrita, fila 'Totales' en negrita."""
+    return TableStyle([
+        ('GRID',         (0, 0),  (-1, -1), 0.5, colors.black),
+        ('BACKGROUND',   (0, 0),  (-1, 0),  colors.lightgrey),
+        ('VALIGN',       (0, 0),  (-1, -1), 'MIDDLE'),
+        ('LEFTPADDING',  (0, 0),  (-1, -1), PADDING),
+        ('RIGHTPADDING', (0, 0),  (-1, -1), PADDING),
+        ('FONT',         (0, 0),  (-1, -1), *LETRA_CELDA),
+        ('FONT',         (0, 0),  (-1, 0),  *LETRA_ENCABEZADO),
+        ('ALIGN',        (0, 0),  (-1, 0),  'CENTER'),
+        ('FONT',         (0, -1), (0, -1),  *LETRA_ENCABEZADO),
+        ('ALIGN',        (0, -1), (0, -1),  'CENTER'),
+        *extra
+    ])
+
+
+COLUMNAS_VENTA = [ANCHO_DOC * f for f in (0.10, 0.35, 0.10, 0.15, 0.15, 0.15)]
+ENCABEZADO_VENTA = ['Cód.', 'Producto', 'Cant.', 'Subtotal', 'Comisión', 'Pagar Pan.']
+ESTILO_VENTA = _estilo_tabla(('ALIGN', (2, 1), (-1, -1), 'RIGHT'))
+
+COLUMNAS_DOCUMENTO = [ANCHO_DOC * f for f in (0.55, 0.15, 0.15, 0.15)]
+ENCABEZADO_DOCUMENTO = ['Producto', 'Cant.', 'Lote', 'Subtotal']
+ESTILO_DOCUMENTO = _estilo_tabla(('ALIGN', (1, 1), (-1, -1), 'RIGHT'))
+
+COLUMNAS_INFO_VENTA = [ANCHO_DOC * f for f in (0.15, 0.35, 0.15, 0.35)]
+ESTILO_INFO_VENTA = TableStyle([
+    ('GRID',         (0, 0), (-1, -1), 0.5, colors.black),
+    ('BACKGROUND',   (0, 0), (-1, 0),  colors.lightgrey),
+    ('VALIGN',       (0, 0), (-1, -1), 'MIDDLE'),
+    ('LEFTPADDING',  (0, 0), (-1, -1), PADDING),
+    ('RIGHTPADDING', (0, 0), (-1, -1), PADDING),
+    ('FONT',         (0, 0), (-1, -1), *LETRA_CELDA),
+    ('FONT',         (0, 0), (0, -1),  *LETRA_ENCABEZADO),
+    ('FONT',         (2, 0), (2, -1),  *LETRA_ENCABEZADO),
+    ('ALIGN',        (0, 0), (0, -1),  'CENTER'),
+    ('ALIGN',        (2, 0), (2, -1),  'CENTER'),
+])
+
+# — Despacho (márgenes de 25, anchos fijos) —
+LETRA_DESPACHO = ('Helvetica', 8, 10)
+COLUMNAS_DESPACHO = [40, 145, 35, 35, 35, 65]
+ENCABEZADO_DESPACHO = ["Código", "Producto", "Pedido", "Desp.", "Lote", "Subtotal"]
+ALTO_CELDA_DESPACHO = LETRA_DESPACHO[2] + 6
+ALTO_ENCABEZADO_DESPACHO = LETRA_DESPACHO[2] + 8   # padding inferior de 5
+despacho_cell_style = ParagraphStyle('CeldaDespacho', parent=_styles['Normal'], fontName=LETRA_DESPACHO[0],
+                                     fontSize=LETRA_DESPACHO[1], leading=LETRA_DESPACHO[2])
+ESTILO_INFO_DESPACHO = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+])
+ESTILO_DESPACHO = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#eeeeee")),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+    ('ALIGN', (2, 1), (-1, -1), 'CENTER'),
+    ('ALIGN', (1, 1), (1, -1), 'LEFT'),
+    ('FONT', (0, 0), (-1, -1), *LETRA_DESPACHO),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 5),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+])
+TITULOS_DESPACHO = {
+    "pedido": "ORDEN DE PEDIDO",
+    "extra": "ORDEN DE EXTRA"
+}
+
+# — Liquidación —
+ESTILO_LIQ_CABECERA = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+])
+ESTILO_LIQ_RESUMEN = TableStyle([
+    ('GRID', (0, 0), (-1, -1), 0.4, colors.grey),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
+])
+ESTILO_LIQ_PAGOS = TableStyle([
+    ('GRID', (0, 0), (-1, -1), 0.4, colors.grey),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+])
+
+
+def _celda_texto(texto, ancho, letra, estilo):
+    """Texto plano si cabe en una línea; si no, Paragraph (y la tabla pasa a alto automático)."""
+    if stringWidth(texto, letra[0], letra[1]) <= ancho - 2 * PADDING:
+        return texto, True
+    return Paragraph(texto, estilo), False
+
+
+def _tabla(data, columnas, estilo, alto_fijo, alto_encabezado, alto_celda):
+    alturas = [alto_encabezado] + [alto_celda] * (len(data) - 1) if alto_fijo else None
+    table = Table(data, colWidths=columnas, rowHeights=alturas, hAlign='LEFT')
+    table.setStyle(estilo)
+    return table
+
+
+def _nuevo_documento(buffer, vertical, horizontal=None):
+    """Media carta con márgenes arriba/abajo `vertical` e izquierda/derecha `horizontal` (igual si falta)."""
+    horizontal = vertical if horizontal is None else horizontal
+    return SimpleDocTemplate(buffer, pagesize=MEDIA_CARTA,
+                             leftMargin=horizontal, rightMargin=horizontal,
+                             topMargin=vertical, bottomMargin=vertical)
+
+
 def generate_pdf_document(modelo, vendedor, logo_path, tipo):
     """
     Genera un PDF media carta en retrato con el formato:
       - 'pedido', 'extra', 'devolucion': columnas Producto, Cant., V. Unit., Subtotal
       - 'venta': cuadro de información + columnas Cód., Producto, Cant., Subtotal, Comisión, Pagar Pan.
-    - Tamaño de letra de tabla: 8 pts, con ajuste automático de alto de filas.
+    - Tamaño de letra de tabla: 6.5 pts; alto de fila fijo salvo nombres que no caben.
     - Metadata en una sola línea debajo del título.
     """
     buffer = BytesIO()
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=MEDIA_CARTA,
-        leftMargin=15, rightMargin=15,
-        topMargin=15, bottomMargin=15
-    )
-
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'Title', parent=styles['Heading1'], alignment=1,
-        fontSize=14, spaceAfter=6
-    )
-    meta_style = ParagraphStyle(
-        'Meta', parent=styles['Normal'], fontSize=12, leading=11
-    )
-    cell_style = ParagraphStyle(
-        'Cell', parent=styles['Normal'], fontSize=6.5, leading=8
-    )
-    header_cell = ParagraphStyle(
-        'HeaderCell', parent=styles['Normal'], fontSize=8, leading=9,
-        alignment=1, fontName='Helvetica-Bold'
-    )
-
+    doc = _nuevo_documento(buffer, 15)
     elements = []
 
     # — Título —
@@ -70,148 +186,60 @@ def generate_pdf_document(modelo, vendedor, logo_path, tipo):
     elements.append(Spacer(1, 6))
 
     # Precarga nombres de productos
-    cods = [it.producto_cod for it in modelo.items]
-    productos = {
-        p.codigo: p.nombre
-        for p in Producto.query.filter(Producto.codigo.in_(cods)).all()
-    }
+    por_codigo = catalogo().por_codigo
 
     # — Cuadro de información para venta (igual al formulario) —
     if tipo == 'venta':
         info_data = [
-            [
-                Paragraph('Dev. Ant.', header_cell),
-                Paragraph(modelo.codigo_dev_anterior or '-', cell_style),
-                Paragraph('Pedido',    header_cell),
-                Paragraph(modelo.codigo_pedido     or '-', cell_style)
-            ],
-            [
-                Paragraph('Extra',     header_cell),
-                Paragraph(modelo.codigo_extra      or '-', cell_style),
-                Paragraph('Dev. Día',  header_cell),
-                Paragraph(modelo.codigo_dev_dia    or '-', cell_style)
-            ]
-        ]
-        info_col_ws = [
-            doc.width * 0.15, doc.width * 0.35,
-            doc.width * 0.15, doc.width * 0.35
+            ['Dev. Ant.', modelo.codigo_dev_anterior or '-', 'Pedido',   modelo.codigo_pedido  or '-'],
+            ['Extra',     modelo.codigo_extra        or '-', 'Dev. Día', modelo.codigo_dev_dia or '-'],
         ]
-        info_tbl = Table(info_data, colWidths=info_col_ws, hAlign='LEFT')
-        info_tbl.setStyle(TableStyle([
-            ('GRID',        (0,0), (-1,-1),      0.5, colors.black),
-            ('BACKGROUND',  (0,0), (-1,0),       colors.lightgrey),
-            ('VALIGN',      (0,0), (-1,-1),      'MIDDLE'),
-            ('ALIGN',       (1,0), (-1,-1),      'LEFT'),
-            ('LEFTPADDING', (0,0), (-1,-1),      4),
-            ('RIGHTPADDING',(0,0), (-1,-1),      4),
-        ]))
-        elements.append(info_tbl)
+        elements.append(_tabla(info_data, COLUMNAS_INFO_VENTA, ESTILO_INFO_VENTA, True,
+                               ALTO_ENCABEZADO, ALTO_ENCABEZADO))
         elements.append(Spacer(1, 6))
 
     # — Tabla de contenido según tipo —
+    alto_fijo = True
     if tipo == 'venta':
-        # Tabla de ventas con fila de totales integrada :contentReference[oaicite:1]{index=1}:contentReference[oaicite:2]{index=2}
-        data = [[
-            Paragraph('Cód.',      header_cell),
-            Paragraph('Producto',  header_cell),
-            Paragraph('Cant.',     header_cell),
-            Paragraph('Subtotal',  header_cell),
-            Paragraph('Comisión',  header_cell),
-            Paragraph('Pagar Pan.',header_cell)
-        ]]
+        data = [ENCABEZADO_VENTA]
         tot_cant = tot_sub = tot_com = tot_pan = 0
-        col_ws = [
-            doc.width*0.10, doc.width*0.35, doc.width*0.10,
-            doc.width*0.15, doc.width*0.15, doc.width*0.15
-        ]
         for it in modelo.items:
             if it.cantidad == 0:
                 continue
-            nombre = productos.get(it.producto_cod, it.producto_cod)
+            producto = por_codigo.get(it.producto_cod)
+            nombre, cabe = _celda_texto(producto.nombre if producto else it.producto_cod,
+                                        COLUMNAS_VENTA[1], LETRA_CELDA, cell_style)
+            alto_fijo &= cabe
             cant = it.cantidad
             sub  = it.precio_unit * cant
             com  = it.comision
             pan  = it.pagar_pan
-            data.append([
-                Paragraph(it.producto_cod,          cell_style),
-                Paragraph(nombre,                   cell_style),
-                Paragraph(str(cant),                cell_style),
-                Paragraph(f"${sub:,.0f}",           cell_style),
-                Paragraph(f"${com:,.0f}",           cell_style),
-                Paragraph(f"${pan:,.0f}",           cell_style)
-            ])
+            data.append([it.producto_cod, nombre, str(cant), f"${sub:,.0f}", f"${com:,.0f}", f"${pan:,.0f}"])
             tot_cant += cant
             tot_sub  += sub
             tot_com  += com
             tot_pan  += pan
 
         # Fila de totales
-        data.append([
-            Paragraph('Totales',           header_cell),
-            Paragraph('',                  cell_style),
-            Paragraph(str(tot_cant),       cell_style),
-            Paragraph(f"${tot_sub:,.0f}",  cell_style),
-            Paragraph(f"${tot_com:,.0f}",  cell_style),
-            Paragraph(f"${tot_pan:,.0f}",  cell_style)
-        ])
-
-        table = Table(data, colWidths=col_ws, hAlign='LEFT')
-        table.setStyle(TableStyle([
-            ('GRID',       (0,0), (-1,-1), 0.5, colors.black),
-            ('BACKGROUND',(0,0), (-1,0),   colors.lightgrey),
-            ('VALIGN',     (0,0), (-1,-1), 'MIDDLE'),
-            ('ALIGN',      (2,1), (-1,-1), 'RIGHT'),
-            ('LEFTPADDING',(0,0), (-1,-1), 4),
-            ('RIGHTPADDING',(0,0),(-1,-1), 4),
-        ]))
-        elements.append(table)
+        data.append(['Totales', '', str(tot_cant), f"${tot_sub:,.0f}", f"${tot_com:,.0f}", f"${tot_pan:,.0f}"])
+        elements.append(_tabla(data, COLUMNAS_VENTA, ESTILO_VENTA, alto_fijo, ALTO_ENCABEZADO, ALTO_CELDA))
 
     else:
-        # Tabla de pedidos/extras/devoluciones con subtotales :contentReference[oaicite:3]{index=3}:contentReference[oaicite:4]{index=4}
-        data = [[
-            Paragraph('Producto',  header_cell),
-            Paragraph('Cant.',      header_cell),
-            Paragraph('Lote',header_cell),
-            Paragraph('Subtotal',   header_cell)
-        ]]
+        data = [ENCABEZADO_DOCUMENTO]
         tot_val = 0
-        col_ws = [
-            doc.width*0.55, doc.width*0.15,
-            doc.width*0.15, doc.width*0.15
-        ]
         for it in modelo.items:
             if it.cantidad <= 0:
                 continue
-            nombre = productos.get(it.producto_cod, it.producto_cod)
-            cant = it.cantidad
-            lote = ""
-            vu   = it.precio_unit
-            sub  = vu * cant
-            data.append([
-                Paragraph(f"{it.producto_cod} {nombre}", cell_style),
-                Paragraph(str(cant),                     cell_style),
-                Paragraph(f"{lote}",                     cell_style),
-                Paragraph(f"${sub:,.0f}",                cell_style)
-            ])
+            producto = por_codigo.get(it.producto_cod)
+            nombre, cabe = _celda_texto(f"{it.producto_cod} {producto.nombre if producto else it.producto_cod}",
+                                        COLUMNAS_DOCUMENTO[0], LETRA_CELDA, cell_style)
+            alto_fijo &= cabe
+            sub = it.precio_unit * it.cantidad
+            data.append([nombre, str(it.cantidad), "", f"${sub:,.0f}"])
             tot_val += sub
 
-        data.append([
-            Paragraph('Totales',      header_cell),
-            Paragraph('',             cell_style),
-            Paragraph('',             cell_style),
-            Paragraph(f"${tot_val:,.0f}", cell_style)
-        ])
-
-        table = Table(data, colWidths=col_ws, hAlign='LEFT')
-        table.setStyle(TableStyle([
-            ('GRID',       (0,0), (-1,-1), 0.5, colors.black),
-            ('BACKGROUND',(0,0), (-1,0),    colors.lightgrey),
-            ('VALIGN',     (0,0), (-1,-1),  'MIDDLE'),
-            ('ALIGN',      (1,1), (-1,-1),  'RIGHT'),
-            ('LEFTPADDING',(0,0), (-1,-1),   4),
-            ('RIGHTPADDING',(0,0),(-1,-1),   4),
-        ]))
-        elements.append(table)
+        data.append(['Totales', '', '', f"${tot_val:,.0f}"])
+        elements.append(_tabla(data, COLUMNAS_DOCUMENTO, ESTILO_DOCUMENTO, alto_fijo, ALTO_ENCABEZADO, ALTO_CELDA))
 
     # — Generar y devolver PDF —
     doc.build(elements)
@@ -220,20 +248,9 @@ def generate_pdf_document(modelo, vendedor, logo_path, tipo):
     return pdf
 
 def generate_liquidacion_pdf(liquidacion, vendedor, venta, cambio):
-    from reportlab.lib.pagesizes import inch
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib import colors
-    from reportlab.lib.styles import getSampleStyleSheet
-    from io import BytesIO
-
-    MEDIA_CARTA = (5.5 * inch, 8.5 * inch)  # Media carta vertical
-
     buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=MEDIA_CARTA,
-                            leftMargin=15, rightMargin=15, topMargin=15, bottomMargin=15)
-
+    doc = _nuevo_documento(buffer, 15)
     elements = []
-    styles = getSampleStyleSheet()
 
     # Cabecera
     data_header = [
@@ -242,11 +259,7 @@ def generate_liquidacion_pdf(liquidacion, vendedor, venta, cambio):
         ["Venta:", f"VT-{venta.id:04d}", "", ""]
     ]
     table_header = Table(data_header, colWidths=[50, 130, 40, 100])
-    table_header.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-    ]))
+    table_header.setStyle(ESTILO_LIQ_CABECERA)
     elements.append(table_header)
     elements.append(Spacer(1, 8))
 
@@ -264,15 +277,7 @@ def generate_liquidacion_pdf(liquidacion, vendedor, venta, cambio):
         ["TOTAL A PAGAR", f"${total_a_pagar:,.0f}"],
     ]
     table_finance = Table(data_finance, colWidths=[120, 150])
-    table_finance.setStyle(TableStyle([
-        ('GRID', (0, 0), (-1, -1), 0.4, colors.grey),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
-    ]))
+    table_finance.setStyle(ESTILO_LIQ_RESUMEN)
     elements.append(table_finance)
     elements.append(Spacer(1, 10))
 
@@ -283,47 +288,30 @@ def generate_liquidacion_pdf(liquidacion, vendedor, venta, cambio):
         ["Pago Otros", f"${liquidacion.pago_otros:,.0f}"],
     ]
     table_pagos = Table(data_pagos, colWidths=[120, 150])
-    table_pagos.setStyle(TableStyle([
-        ('GRID', (0, 0), (-1, -1), 0.4, colors.grey),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
-    ]))
+    table_pagos.setStyle(ESTILO_LIQ_PAGOS)
     elements.append(table_pagos)
     elements.append(Spacer(1, 8))
 
     # Comentarios (si hay)
     if liquidacion.comentarios:
-        elements.append(Paragraph(f"<b>Comentarios:</b> {liquidacion.comentarios}", styles['Normal']))
+        elements.append(Paragraph(f"<b>Comentarios:</b> {liquidacion.comentarios}", _styles['Normal']))
         elements.append(Spacer(1, 8))
 
     # Firmas
     elements.append(Spacer(1, 20))
-    elements.append(Paragraph("Firma Vendedor: ___________________________", styles['Normal']))
+    elements.append(Paragraph("Firma Vendedor: ___________________________", _styles['Normal']))
     elements.append(Spacer(1, 8))
-    elements.append(Paragraph("Firma Recaudo: ____________________________", styles['Normal']))
+    elements.append(Paragraph("Firma Recaudo: ____________________________", _styles['Normal']))
 
     doc.build(elements)
     buffer.seek(0)
     return buffer
 
-def generate_pdf_despacho(despacho, vendedor, tipo="pedido"):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=MEDIA_CARTA, rightMargin=25, leftMargin=25, topMargin=20, bottomMargin=20)
+def _elementos_despacho(despacho, vendedor, tipo, nombres):
     elements = []
-    styles = getSampleStyleSheet()
 
     # Título
-    title_style = styles['Title']
-    title_style.alignment = 1  # Centrado
-
-    label_doc = {
-        "pedido": "ORDEN DE PEDIDO",
-        "extra": "ORDEN DE EXTRA"
-    }
-
-    title = Paragraph(label_doc.get(tipo, "ORDEN DE DESPACHO"), title_style)
-    elements.append(title)
+    elements.append(Paragraph(TITULOS_DESPACHO.get(tipo, "ORDEN DE DESPACHO"), _styles['Title']))
     elements.append(Spacer(1, 10))
 
     # Datos generales
@@ -333,55 +321,109 @@ def generate_pdf_despacho(despacho, vendedor, tipo="pedido"):
         [f"Vendedor: {vendedor_nombre}", f"Comentarios: {despacho.comentarios or '-'}"]
     ]
     info_table = Table(info_data, colWidths=[200, 200])
-    info_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-    ]))
+    info_table.setStyle(ESTILO_INFO_DESPACHO)
     elements.append(info_table)
     elements.append(Spacer(1, 10))
 
     # Tabla de productos
-    data = [["Código", "Producto", "Pedido", "Desp.", "Lote", "Subtotal"]]
+    data = [ENCABEZADO_DESPACHO]
     total = 0
+    alto_fijo = True
 
     for item in despacho.items:
-        producto_obj = Producto.query.filter_by(codigo=item.producto_cod).first()
-        nombre_prod = producto_obj.nombre if producto_obj else item.producto_cod
+        nombre_prod, cabe = _celda_texto(nombres.get(item.producto_cod) or item.producto_cod,
+                                         COLUMNAS_DESPACHO[1], LETRA_DESPACHO, despacho_cell_style)
+        alto_fijo &= cabe
         subtotal = float(item.subtotal or 0)
         total += subtotal
         data.append([
             item.producto_cod,
             nombre_prod,
             str(item.cantidad_pedida),
-            str(item.cantidad_despachada),
+            str(item.cantidad),
             item.lote or "-",
             f"${subtotal:,.0f}"
         ])
 
-    table = Table(data, colWidths=[40, 145, 35, 35, 35, 65])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#eeeeee")),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('ALIGN', (2, 1), (-1, -1), 'CENTER'),
-        ('ALIGN', (1, 1), (1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 5),
-        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
-    ]))
-    elements.append(table)
+    elements.append(_tabla(data, COLUMNAS_DESPACHO, ESTILO_DESPACHO, alto_fijo,
+                           ALTO_ENCABEZADO_DESPACHO, ALTO_CELDA_DESPACHO))
     elements.append(Spacer(1, 10))
 
     # Total
-    total_paragraph = Paragraph(
-        f"<b>Total del despacho: ${total:,.0f}</b>",
-        styles["Heading4"]
-    )
-    elements.append(total_paragraph)
+    elements.append(Paragraph(f"<b>Total del despacho: ${total:,.0f}</b>", _styles["Heading4"]))
+    return elements
+
+
+def generate_pdf_despacho(despacho, vendedor, tipo="pedido", nombres=None):
+    """
+    PDF de un despacho. `nombres` ({codigo: nombre de producto}) evita leer el
+    catálogo; lo usan los procesos de impresión en bloque, que no tienen BD.
+    """
+    if nombres is None:
+        nombres = {it.producto_cod: _nombre_producto(it.producto_cod) for it in despacho.items}
+
+    buffer = BytesIO()
+    doc = _nuevo_documento(buffer, 20, 25)
+    doc.build(_elementos_despacho(despacho, vendedor, tipo, nombres))
+    pdf = buffer.getvalue()
+    buffer.close()
+    return pdf
+
 
-    # Construir PDF
+def generate_pdf_despachos(despachos, vendedores, nombres):
+    """Varios despachos en un solo PDF, cada uno desde una página nueva."""
+    buffer = BytesIO()
+    doc = _nuevo_documento(buffer, 20, 25)
+    elements = []
+    for despacho in despachos:
+        if elements:
+            elements.append(PageBreak())
+        elements += _elementos_despacho(despacho, vendedores.get(despacho.vendedor_cod),
+                                        despacho.tipo_origen, nombres)
     doc.build(elements)
     pdf = buffer.getvalue()
     buffer.close()
     return pdf
+
+
+# --- Huellas para la caché de PDFs (ver app/utils/pdf_cache.py) ------------
+# Cada una debe cubrir todo lo que pinta su generador.
+
+def _nombre_producto(codigo):
+    producto = producto_catalogo(codigo)
+    return producto.nombre if producto else None
+
+
+def huella_documento(modelo, vendedor, tipo):
+    datos = [
+        vendedor.nombre, modelo.fecha, modelo.consecutivo,
+        [(it.producto_cod, _nombre_producto(it.producto_cod), it.cantidad, it.precio_unit,
+          getattr(it, 'comision', None), getattr(it, 'pagar_pan', None))
+         for it in modelo.items]
+    ]
+    if tipo == 'venta':
+        datos.append([modelo.codigo_dev_anterior, modelo.codigo_pedido,
+                      modelo.codigo_extra, modelo.codigo_dev_dia])
+    return huella(tipo, modelo.id, datos)
+
+
+def huella_despacho(despacho, vendedor, tipo="pedido"):
+    datos = [
+        tipo, despacho.codigo_origen, despacho.fecha, despacho.comentarios,
+        vendedor.nombre if vendedor else despacho.vendedor_cod,
+        [(it.producto_cod, _nombre_producto(it.producto_cod), it.cantidad_pedida,
+          it.cantidad, it.lote, it.subtotal)
+         for it in despacho.items]
+    ]
+    return huella('despacho', despacho.id, datos)
+
+
+def huella_liquidacion(liquidacion, vendedor, venta, cambio):
+    datos = [
+        liquidacion.codigo, liquidacion.fecha, liquidacion.pago_banco, liquidacion.pago_efectivo,
+        liquidacion.pago_otros, liquidacion.comentarios,
+        vendedor.codigo_vendedor, vendedor.nombre,
+        venta.id, venta.total_venta, venta.comision,
+        cambio.valor_cambio if cambio else 0
+    ]
+    return huella('liquidacion', liquidacion.id, datos)
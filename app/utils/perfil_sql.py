@@ -0,0 +1,199 @@
+# app/utils/perfil_sql.py
+
+import heapq
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+
+from flask import current_app, g, has_request_context, render_template, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULTS = {
+    'PERFIL_SQL':              False,  # activa la medición (apagado no se registra ningún evento)
+    'PERFIL_SQL_PANEL':        False,  # agrega el panel al final de las páginas HTML
+    'PERFIL_SQL_PRESUPUESTO':  30,     # consultas por petición antes de avisar
+    'PERFIL_SQL_PRESUPUESTOS': {},     # excepciones por endpoint: {'reportes.reporte_x': 80}
+    'PERFIL_SQL_LENTAS':       5,      # sentencias más lentas que se guardan por petición
+    'PERFIL_SQL_VENTANA':      1000,   # peticiones que entran en el resumen
+}
+
+log = logging.getLogger(__name__)
+
+# --- Perfil de SQL por petición --------------------------------------------
+#
+# Opcional (PERFIL_SQL=1). Los eventos del Engine cuentan y cronometran cada
+# sentencia y la acumulan en `g` de la petición en curso; after_request la
+# resume en cabeceras (X-DB-*, Server-Timing), en el panel de la página y en
+# una ventana de las últimas peticiones que agrupa /debug/sql por blueprint y
+# endpoint. Las sentencias con la misma huella (SQL sin valores) repetidas en
+# una petición son casi siempre un N+1.
+
+_RE_LISTA = re.compile(r'\(\s*(?:\?|%s|:\w+|%\(\w+\)s)(?:\s*,\s*(?:\?|%s|:\w+|%\(\w+\)s))+\s*\)')
+_RE_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_RE_ESPACIOS = re.compile(r'\s+')
+
+_VENTANA = {'peticiones': None}
+_VENTANA_LOCK = threading.Lock()
+
+
+def _cfg(clave):
+    return current_app.config.get(clave, DEFAULTS[clave])
+
+
+def huella_sql(sentencia):
+    """SQL sin valores ni largo de listas IN: iguala las sentencias de un N+1."""
+    huella = _RE_ESPACIOS.sub(' ', sentencia).strip()
+    huella = _RE_LITERAL.sub('?', huella)
+    return _RE_LISTA.sub('(?)', huella)
+
+
+def _perfil_actual():
+    return g.get('_perfil_sql') if has_request_context() else None
+
+
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    if _perfil_actual() is not None:
+        conn.info.setdefault('perfil_sql_inicio', []).append(time.perf_counter())
+
+
+def _despues(conn, cursor, statement, parameters, context, executemany):
+    perfil = _perfil_actual()
+    inicios = conn.info.get('perfil_sql_inicio')
+    if perfil is None or not inicios:
+        return
+    duracion = time.perf_counter() - inicios.pop()
+    perfil['consultas'] += 1
+    perfil['tiempo'] += duracion
+    perfil['huellas'][huella_sql(statement)] += 1
+    lentas = perfil['lentas']
+    entrada = (duracion, perfil['consultas'], statement[:500])
+    if len(lentas) < perfil['max_lentas']:
+        heapq.heappush(lentas, entrada)
+    elif duracion > lentas[0][0]:
+        heapq.heapreplace(lentas, entrada)
+
+
+def _error(contexto):
+    # La sentencia falló: after_cursor_execute no llega, se descarta su inicio
+    inicios = contexto.connection.info.get('perfil_sql_inicio') if contexto.connection is not None else None
+    if inicios:
+        inicios.pop()
+
+
+def _iniciar():
+    if request.endpoint == 'static':
+        return
+    g._perfil_sql = {
+        'consultas': 0, 'tiempo': 0.0, 'huellas': Counter(), 'lentas': [],
+        'max_lentas': _cfg('PERFIL_SQL_LENTAS'), 'inicio': time.perf_counter(),
+    }
+
+
+def presupuesto(endpoint):
+    return _cfg('PERFIL_SQL_PRESUPUESTOS').get(endpoint, _cfg('PERFIL_SQL_PRESUPUESTO'))
+
+
+def _resumen(perfil):
+    repetidas = sorted(((n, h) for h, n in perfil['huellas'].items() if n > 1), reverse=True)
+    limite = presupuesto(request.endpoint)
+    return {
+        'endpoint': request.endpoint,
+        'blueprint': request.blueprint,
+        'metodo': request.method,
+        'consultas': perfil['consultas'],
+        'db_ms': round(perfil['tiempo'] * 1000, 2),
+        'total_ms': round((time.perf_counter() - perfil['inicio']) * 1000, 2),
+        'repetidas': sum(n - 1 for n, _ in repetidas),
+        'huellas_repetidas': [{'veces': n, 'sql': h[:300]} for n, h in repetidas[:5]],
+        'lentas': [{'ms': round(d * 1000, 2), 'orden': i, 'sql': s}
+                   for d, i, s in sorted(perfil['lentas'], reverse=True)],
+        'presupuesto': limite,
+        'excedido': perfil['consultas'] > limite,
+    }
+
+
+def _terminar(response):
+    perfil = g.pop('_perfil_sql', None)
+    if perfil is None:
+        return response
+    r = _resumen(perfil)
+
+    response.headers['X-DB-Consultas'] = str(r['consultas'])
+    response.headers['X-DB-Tiempo-ms'] = f"{r['db_ms']:.2f}"
+    response.headers['X-DB-Repetidas'] = str(r['repetidas'])
+    response.headers.add('Server-Timing', f'db;dur={r["db_ms"]:.2f};desc="{r["consultas"]} consultas"')
+    if r['excedido']:
+        response.headers['X-DB-Presupuesto'] = f"excedido {r['consultas']}/{r['presupuesto']}"
+        log.warning("Presupuesto de consultas excedido en %s: %s de %s (%s repetidas)",
+                    r['endpoint'], r['consultas'], r['presupuesto'], r['repetidas'])
+
+    with _VENTANA_LOCK:
+        if _VENTANA['peticiones'] is None:
+            _VENTANA['peticiones'] = deque(maxlen=_cfg('PERFIL_SQL_VENTANA'))
+        _VENTANA['peticiones'].append(r)
+
+    if (_cfg('PERFIL_SQL_PANEL') and response.mimetype == 'text/html'
+            and not response.direct_passthrough and response.status_code == 200):
+        html = response.get_data(as_text=True)
+        corte = html.rfind('</body>')
+        if corte != -1:
+            panel = render_template('perfil_sql/panel.html', perfil=r)
+            response.set_data(html[:corte] + panel + html[corte:])
+    return response
+
+
+def resumen_ventana():
+    """Últimas peticiones agrupadas por blueprint y endpoint, de la más cargada a la menos."""
+    with _VENTANA_LOCK:
+        peticiones = list(_VENTANA['peticiones'] or ())
+
+    grupos = {}
+    for r in peticiones:
+        grupos.setdefault((r['blueprint'] or '-', r['endpoint'] or '-'), []).append(r)
+
+    filas = []
+    for (blueprint, endpoint), rs in grupos.items():
+        consultas = sorted(r['consultas'] for r in rs)
+        db_ms = sorted(r['db_ms'] for r in rs)
+        peor = max(rs, key=lambda r: (r['consultas'], r['db_ms']))
+        filas.append({
+            'blueprint': blueprint,
+            'endpoint': endpoint,
+            'peticiones': len(rs),
+            'consultas_prom': round(sum(consultas) / len(rs), 1),
+            'consultas_max': consultas[-1],
+            'db_ms_prom': round(sum(db_ms) / len(rs), 2),
+            'db_ms_p95': db_ms[min(len(db_ms) - 1, int(len(db_ms) * 0.95))],
+            'repetidas_max': max(r['repetidas'] for r in rs),
+            'excedidas': sum(r['excedido'] for r in rs),
+            'presupuesto': rs[-1]['presupuesto'],
+            'peor': {'consultas': peor['consultas'], 'db_ms': peor['db_ms'],
+                     'huellas_repetidas': peor['huellas_repetidas'], 'lentas': peor['lentas']},
+        })
+    filas.sort(key=lambda f: (-f['consultas_max'], -f['db_ms_p95']))
+    return {'peticiones': len(peticiones), 'endpoints': filas}
+
+
+def limpiar_ventana():
+    with _VENTANA_LOCK:
+        if _VENTANA['peticiones'] is not None:
+            _VENTANA['peticiones'].clear()
+
+
+def registrar_perfil_sql(app):
+    """Engancha el perfil a la app si PERFIL_SQL está activo; si no, no hace nada."""
+    if not app.config.get('PERFIL_SQL', DEFAULTS['PERFIL_SQL']):
+        return False
+    if not event.contains(Engine, 'before_cursor_execute', _antes):
+        event.listen(Engine, 'before_cursor_execute', _antes)
+        event.listen(Engine, 'after_cursor_execute', _despues)
+        event.listen(Engine, 'handle_error', _error)
+    app.before_request(_iniciar)
+    app.after_request(_terminar)
+
+    from app.routes.perfil_sql import perfil_sql_bp
+    app.register_blueprint(perfil_sql_bp)
+    return True
@@ -1,26 +1,105 @@
-from sqlalchemy import case
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
 from app.models import Producto
+from app.models.version_datos import BDVersionDatos
+
+# Se aceptan ambas grafías de la categoría
+CATEGORIAS_PANADERIA = ('panaderia', 'panadería')
+
+
+# --- Catálogo en memoria ---------------------------------------------------
+#
+# Una foto inmutable de la tabla de productos compartida por todo el proceso.
+# Al guardar productos se incrementa el sello 'catalogo' en bd_versiones; los
+# demás workers lo comparan cada CATALOGO_REVISION segundos y recargan solo
+# cuando cambió. La lista ordenada de activos se serializa una sola vez por
+# versión (payload + etag) para la ruta /productos/catalogo.json.
+
+ProductoCatalogo = namedtuple('ProductoCatalogo', 'codigo nombre precio categoria activo orden alias')
+Catalogo = namedtuple('Catalogo', 'version por_codigo ordenados payload etag')
+
+CLAVE_VERSION = 'catalogo'
+CATALOGO_REVISION = 5
+
+_CATALOGO = {'catalogo': None, 'revisado': 0.0}
+_CATALOGO_LOCK = threading.Lock()
+
+
+def _version_catalogo(conn):
+    t = BDVersionDatos.__table__
+    return conn.execute(select(t.c.version).where(t.c.clave == CLAVE_VERSION)).scalar() or 0
+
+
+def _cargar_catalogo(version):
+    filas = db.session.query(
+        Producto.codigo, Producto.nombre, Producto.precio, Producto.categoria,
+        Producto.activo, Producto.orden, Producto.alias
+    ).all()
+    por_codigo = {
+        f.codigo: ProductoCatalogo(*f[:-1], tuple(a.strip() for a in (f.alias or '').split(',') if a.strip()))
+        for f in filas
+    }
+    ordenados = tuple(sorted((p for p in por_codigo.values() if p.activo),
+                             key=lambda p: (p.orden, p.nombre)))
+
+    payload = json.dumps({
+        'productos': [
+            {'codigo': p.codigo, 'nombre': p.nombre, 'precio': p.precio, 'categoria': p.categoria}
+            for p in ordenados
+        ]
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    etag = hashlib.sha1(payload).hexdigest()[:20]
+    return Catalogo(version, por_codigo, ordenados, payload, etag)
+
+
+def catalogo():
+    """Foto vigente del catálogo; como mucho una consulta cada CATALOGO_REVISION segundos."""
+    actual = _CATALOGO['catalogo']
+    if actual is not None and time.monotonic() - _CATALOGO['revisado'] < CATALOGO_REVISION:
+        return actual
+
+    with _CATALOGO_LOCK:
+        actual = _CATALOGO['catalogo']
+        if actual is not None and time.monotonic() - _CATALOGO['revisado'] < CATALOGO_REVISION:
+            return actual
+        version = _version_catalogo(db.session.connection())
+        if actual is None or actual.version != version:
+            actual = _CATALOGO['catalogo'] = _cargar_catalogo(version)
+        _CATALOGO['revisado'] = time.monotonic()
+        return actual
+
+
+def producto_catalogo(codigo):
+    """ProductoCatalogo del código (activo o no), o None si no existe."""
+    return catalogo().por_codigo.get(codigo)
+
+
+def invalidar_catalogo():
+    """
+    Incrementa el sello de versión y descarta la foto local.
+    Llamar después del commit al crear/editar/eliminar/importar productos.
+    """
+    t = BDVersionDatos.__table__
+    subir = update(t).where(t.c.clave == CLAVE_VERSION).values(version=t.c.version + 1)
+    try:
+        with db.engine.begin() as conn:
+            if not conn.execute(subir).rowcount:
+                conn.execute(insert(t).values(clave=CLAVE_VERSION, version=1))
+    except IntegrityError:
+        with db.engine.begin() as conn:  # otro proceso creó la fila primero
+            conn.execute(subir)
+    with _CATALOGO_LOCK:
+        _CATALOGO['catalogo'] = None
+
 
 def get_productos_ordenados():
-    orden_productos = [
-        '10001', '10003', '10297', '10004', '10041', '10040', '10137', '10251',
-        '10238', '10068', '10019', '10058', '10020', '10021', '10059', '10022',
-        '10023', '10060', '10092', '10219', '10024', '10291', '10254', '10094',
-        '10218', '10061', '10031', '10034', '10296', '10033', '10035', '10192',
-        '10193', '10007', '10009', '10133', '10322', '10008', '10010', '10016',
-        '10321', '10072', '10069', '10070', '10080', '10079', '10063', '10203',
-        '10183', '10082', '10055', '10326', '10002', '10052', '10043', '10073',
-        '10086', '10091', '10175', '10202'
-    ]
-
-    orden_case = case(
-        *[(Producto.codigo == codigo, idx) for idx, codigo in enumerate(orden_productos)],
-        else_=9999
-    )
-
-    productos = (Producto.query
-                 .filter_by(activo=True)
-                 .order_by(orden_case, Producto.nombre)
-                 .all())
-
-    return productos
+    """Productos activos en el orden de los formularios."""
+    return list(catalogo().ordenados)
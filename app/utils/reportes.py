@@ -0,0 +1,348 @@
+# app/utils/reportes.py
+
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import xlsxwriter
+from flask import Response
+
+from app import db
+from app.models.pedidos          import BDPedido
+from app.models.pedido_item      import BDPedidoItem
+from app.models.extras           import BDExtra
+from app.models.extra_item       import BDExtraItem
+from app.models.devoluciones     import BDDevolucion
+from app.models.devolucion_item  import BDDevolucionItem
+from app.models.ventas           import BDVenta
+from app.models.venta_item       import BDVentaItem
+from app.models.liquidacion      import BD_LIQUIDACION
+from app.models.vendedor         import Vendedor
+from app.models.producto         import Producto
+from app.utils.metricas          import medir_documento
+from app.utils.productos         import CATEGORIAS_PANADERIA
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Filas que se leen del cursor por bloque
+CHUNK_SIZE = 5000
+
+# Filas usadas para estimar el ancho de las columnas y ancho máximo permitido
+FILAS_MUESTRA = 200
+ANCHO_MAXIMO  = 60
+
+# tipo -> (cabecera, ítem, llave foránea del ítem hacia la cabecera)
+DOCUMENTOS = {
+    'pedido':     (BDPedido,     BDPedidoItem,     BDPedidoItem.pedido_id),
+    'extra':      (BDExtra,      BDExtraItem,      BDExtraItem.extra_id),
+    'devolucion': (BDDevolucion, BDDevolucionItem, BDDevolucionItem.devolucion_id),
+}
+
+COLUMNAS_DOCUMENTO = [
+    'Fecha', 'Año', 'cod vendedor', 'nombre vendedor', 'ruta',
+    'codigo producto', 'nombre producto', 'cantidad', 'valor total',
+    'valor neto (menos comisión)', 'lote', 'mes', 'día', 'nombre del día'
+]
+
+COLUMNAS_VENTA = [
+    'Fecha', 'Año', 'Mes', 'Día', 'Día de semana', 'Código producto',
+    'Nombre producto', 'Cantidad', 'Subtotal', 'Valor comisión',
+    'Pagar a la Panadería', 'Código vendedor', 'Nombre vendedor'
+]
+
+COLUMNAS_LIQUIDACION = [
+    'Fecha', 'Código Liquidación', 'Cod Vendedor', 'Nombre Vendedor',
+    'Venta Total', 'Comisión', 'A Panadería', 'Descuento Cambios',
+    'Total a Pagar', 'Pago Banco', 'Pago Efectivo', 'Pago Otros',
+    'Total Pagado', 'Comentarios'
+]
+
+COLUMNAS_LIQUIDACION_DIARIO = [
+    'Fecha', 'Cod Vendedor', 'Nombre Vendedor', 'Ventas del Día',
+    'Comisión del Día', 'A Panadería (sin cambios)', 'Descuento Cambios',
+    'Total a Pagar'
+]
+
+
+def consulta_documento_por_producto(tipo, start, end):
+    """
+    Una sola consulta cabecera + ítems + vendedor + producto para el rango.
+    La comisión se resuelve después, de forma vectorizada.
+    """
+    cab, item, fk = DOCUMENTOS[tipo]
+    return (
+        db.session.query(
+            cab.fecha.label('fecha'),
+            cab.codigo_vendedor.label('cod_vendedor'),
+            Vendedor.nombre.label('nombre_vendedor'),
+            Vendedor.comision_panaderia.label('com_pan'),
+            Vendedor.comision_bizcocheria.label('com_biz'),
+            item.producto_cod.label('producto_cod'),
+            Producto.nombre.label('nombre_producto'),
+            Producto.categoria.label('categoria'),
+            item.cantidad.label('cantidad'),
+            item.subtotal.label('subtotal')
+        )
+        .join(item, fk == cab.id)
+        .outerjoin(Vendedor, Vendedor.codigo_vendedor == cab.codigo_vendedor)
+        .outerjoin(Producto, Producto.codigo == item.producto_cod)
+        .filter(cab.fecha >= start, cab.fecha <= end)
+        .order_by(cab.fecha, cab.id, item.id)
+    )
+
+
+def consulta_ventas_por_producto(start, end):
+    """Ítems de venta del rango con nombre de producto y vendedor en una sola consulta."""
+    return (
+        db.session.query(
+            BDVenta.fecha.label('fecha'),
+            BDVenta.codigo_vendedor.label('cod_vendedor'),
+            Vendedor.nombre.label('nombre_vendedor'),
+            BDVentaItem.producto_cod.label('producto_cod'),
+            Producto.nombre.label('nombre_producto'),
+            BDVentaItem.cantidad.label('cantidad'),
+            BDVentaItem.subtotal.label('subtotal'),
+            BDVentaItem.comision.label('comision'),
+            BDVentaItem.pagar_pan.label('pagar_pan')
+        )
+        .join(BDVentaItem, BDVentaItem.venta_id == BDVenta.id)
+        .outerjoin(Vendedor, Vendedor.codigo_vendedor == BDVenta.codigo_vendedor)
+        .outerjoin(Producto, Producto.codigo == BDVentaItem.producto_cod)
+        .filter(BDVenta.fecha >= start, BDVenta.fecha <= end)
+        .order_by(BDVenta.fecha, BDVenta.id, BDVentaItem.id)
+    )
+
+
+def consulta_liquidaciones(fecha_inicio, fecha_fin, vendedor_codigo=None):
+    """Liquidaciones del rango con el nombre del vendedor en la misma consulta."""
+    query = (
+        db.session.query(
+            BD_LIQUIDACION.fecha.label('fecha'),
+            BD_LIQUIDACION.codigo.label('codigo'),
+            BD_LIQUIDACION.codigo_vendedor.label('cod_vendedor'),
+            Vendedor.nombre.label('nombre_vendedor'),
+            BD_LIQUIDACION.valor_venta.label('valor_venta'),
+            BD_LIQUIDACION.valor_comision.label('valor_comision'),
+            BD_LIQUIDACION.descuento_cambios.label('descuento_cambios'),
+            BD_LIQUIDACION.valor_a_pagar.label('valor_a_pagar'),
+            BD_LIQUIDACION.pago_banco.label('pago_banco'),
+            BD_LIQUIDACION.pago_efectivo.label('pago_efectivo'),
+            BD_LIQUIDACION.pago_otros.label('pago_otros'),
+            BD_LIQUIDACION.comentarios.label('comentarios')
+        )
+        .outerjoin(Vendedor, Vendedor.codigo_vendedor == BD_LIQUIDACION.codigo_vendedor)
+        .filter(BD_LIQUIDACION.fecha >= fecha_inicio, BD_LIQUIDACION.fecha <= fecha_fin)
+    )
+    if vendedor_codigo:
+        query = query.filter(BD_LIQUIDACION.codigo_vendedor == vendedor_codigo)
+    return query
+
+
+def leer_en_bloques(query, chunksize=CHUNK_SIZE):
+    """Ejecuta la consulta una vez y entrega DataFrames de `chunksize` filas."""
+    stmt = query.statement.execution_options(stream_results=True)
+    return pd.read_sql(stmt, db.session.connection(), chunksize=chunksize)
+
+
+def formatear_documento(raw):
+    """Convierte un bloque crudo al formato del reporte de pedidos/extras/devoluciones."""
+    categoria = raw['categoria'].fillna('').str.lower()
+    pct = np.where(
+        categoria.isin(CATEGORIAS_PANADERIA),
+        raw['com_pan'].astype(float),
+        raw['com_biz'].astype(float)
+    )
+    pct = np.nan_to_num(pct) / 100.0
+    valor_total = raw['subtotal'].astype(float)
+
+    fecha = pd.to_datetime(raw['fecha'])
+    df = pd.DataFrame(index=raw.index)
+    df['Fecha']                       = fecha
+    df['Año']                         = fecha.dt.year
+    df['cod vendedor']                = raw['cod_vendedor']
+    df['nombre vendedor']             = raw['nombre_vendedor'].fillna('')
+    df['ruta']                        = ''
+    df['codigo producto']             = raw['producto_cod']
+    df['nombre producto']             = raw['nombre_producto'].fillna('')
+    df['cantidad']                    = raw['cantidad']
+    df['valor total']                 = valor_total
+    df['valor neto (menos comisión)'] = valor_total * (1.0 - pct)
+    df['lote']                        = ''
+    df['mes']                         = fecha.dt.month
+    df['día']                         = fecha.dt.day
+    df['nombre del día']              = fecha.dt.day_name()
+    return df[COLUMNAS_DOCUMENTO]
+
+
+def formatear_venta(raw):
+    """Convierte un bloque crudo al formato del reporte de ventas por producto."""
+    fecha = pd.to_datetime(raw['fecha'])
+    df = pd.DataFrame(index=raw.index)
+    df['Fecha']                = fecha
+    df['Año']                  = fecha.dt.year
+    df['Mes']                  = fecha.dt.month
+    df['Día']                  = fecha.dt.day
+    df['Día de semana']        = fecha.dt.day_name()
+    df['Código producto']      = raw['producto_cod']
+    df['Nombre producto']      = raw['nombre_producto'].fillna('Desconocido')
+    df['Cantidad']             = raw['cantidad']
+    df['Subtotal']             = raw['subtotal'].astype(float)
+    df['Valor comisión']       = raw['comision'].fillna(0).astype(float)
+    df['Pagar a la Panadería'] = raw['pagar_pan'].fillna(0).astype(float)
+    df['Código vendedor']      = raw['cod_vendedor']
+    df['Nombre vendedor']      = raw['nombre_vendedor'].fillna('Desconocido')
+    return df[COLUMNAS_VENTA]
+
+
+def _base_liquidacion(raw):
+    df = pd.DataFrame(index=raw.index)
+    df['Fecha']           = pd.to_datetime(raw['fecha']).dt.strftime('%Y-%m-%d')
+    df['Cod Vendedor']    = raw['cod_vendedor']
+    df['Nombre Vendedor'] = raw['nombre_vendedor'].fillna('-')
+    for col in ('valor_venta', 'valor_comision', 'descuento_cambios', 'valor_a_pagar',
+                'pago_banco', 'pago_efectivo', 'pago_otros'):
+        raw[col] = raw[col].fillna(0).astype(float)
+    return df
+
+
+def formatear_liquidacion(raw):
+    """Bloque del reporte detallado de liquidaciones."""
+    df = _base_liquidacion(raw)
+    df['Código Liquidación'] = raw['codigo']
+    df['Venta Total']        = raw['valor_venta']
+    df['Comisión']           = raw['valor_comision']
+    df['A Panadería']        = raw['valor_venta'] - raw['valor_comision']
+    df['Descuento Cambios']  = raw['descuento_cambios']
+    df['Total a Pagar']      = raw['valor_a_pagar']
+    df['Pago Banco']         = raw['pago_banco']
+    df['Pago Efectivo']      = raw['pago_efectivo']
+    df['Pago Otros']         = raw['pago_otros']
+    df['Total Pagado']       = raw['pago_banco'] + raw['pago_efectivo'] + raw['pago_otros']
+    df['Comentarios']        = raw['comentarios'].fillna('')
+    return df[COLUMNAS_LIQUIDACION]
+
+
+def formatear_liquidacion_diario(raw):
+    """Bloque del consolidado diario de liquidaciones."""
+    df = _base_liquidacion(raw)
+    df['Ventas del Día']            = raw['valor_venta']
+    df['Comisión del Día']          = raw['valor_comision']
+    df['A Panadería (sin cambios)'] = raw['valor_venta'] - raw['valor_comision']
+    df['Descuento Cambios']         = raw['descuento_cambios']
+    df['Total a Pagar']             = raw['valor_a_pagar']
+    return df[COLUMNAS_LIQUIDACION_DIARIO]
+
+
+def bloques_liquidaciones(fecha_inicio, fecha_fin, vendedor_codigo=None):
+    """Bloques del reporte detallado, del más reciente al más antiguo."""
+    query = (consulta_liquidaciones(fecha_inicio, fecha_fin, vendedor_codigo)
+             .order_by(BD_LIQUIDACION.fecha.desc()))
+    return (formatear_liquidacion(raw) for raw in leer_en_bloques(query))
+
+
+def bloques_liquidaciones_diario(fecha_inicio, fecha_fin):
+    """Bloques del consolidado diario, por fecha y vendedor."""
+    query = (consulta_liquidaciones(fecha_inicio, fecha_fin)
+             .order_by(BD_LIQUIDACION.fecha, BD_LIQUIDACION.codigo_vendedor))
+    return (formatear_liquidacion_diario(raw) for raw in leer_en_bloques(query))
+
+
+def bloques_documento_por_producto(tipo, start, end):
+    """Bloques del reporte 'por producto' para pedido, extra o devolucion."""
+    query = consulta_documento_por_producto(tipo, start, end)
+    return (formatear_documento(raw) for raw in leer_en_bloques(query))
+
+
+def bloques_ventas_por_producto(start, end):
+    """Bloques del reporte de ventas por producto."""
+    query = consulta_ventas_por_producto(start, end)
+    return (formatear_venta(raw) for raw in leer_en_bloques(query))
+
+
+def bloques_tabla(tabla):
+    """Una tabla pivote (índice + columnas) como un único bloque para escribir."""
+    df = tabla.reset_index()
+    df.columns = [str(c) for c in df.columns]
+    return [df]
+
+
+def _anchos_columnas(muestra, columnas):
+    """Estima el ancho de cada columna a partir de las primeras filas."""
+    anchos = []
+    for col in columnas:
+        largo = muestra[col].astype(str).map(len).max() if len(muestra) else 0
+        anchos.append(min(max(largo, len(str(col))) + 2, ANCHO_MAXIMO))
+    return anchos
+
+
+def _borrar(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _leer_por_partes(path, tam=64 * 1024):
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                parte = f.read(tam)
+                if not parte:
+                    break
+                yield parte
+    finally:
+        _borrar(path)
+
+
+def escribir_excel(bloques, columnas, sheet_name, path):
+    """
+    Escribe los bloques en `path` con xlsxwriter en modo constant_memory:
+    cada fila se vuelca a disco al escribirse, así que la memoria no crece
+    con el rango de fechas. Si `columnas` es None se toman del primer bloque.
+    Devuelve el número de filas escritas.
+    """
+    wb = xlsxwriter.Workbook(path, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd'
+    })
+    ws = wb.add_worksheet(sheet_name)
+    if columnas is not None:
+        ws.write_row(0, 0, columnas)
+
+    fila = 1
+    for bloque in bloques:
+        if fila == 1:
+            if columnas is None:
+                columnas = list(bloque.columns)
+                ws.write_row(0, 0, columnas)
+            for i, ancho in enumerate(_anchos_columnas(bloque.head(FILAS_MUESTRA), columnas)):
+                ws.set_column(i, i, ancho)
+        valores = bloque[columnas].astype(object).where(bloque[columnas].notna(), None)
+        for registro in valores.itertuples(index=False, name=None):
+            ws.write_row(fila, 0, registro)
+            fila += 1
+    wb.close()
+    return fila - 1
+
+
+def enviar_excel(bloques, columnas, sheet_name, filename, vacio_ok=False):
+    """
+    Genera el libro en un archivo temporal y lo envía por partes.
+    Devuelve None si no hubo filas, salvo que `vacio_ok` sea True.
+    """
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        with medir_documento('excel'):
+            filas = escribir_excel(bloques, columnas, sheet_name, path)
+    except Exception:
+        _borrar(path)
+        raise
+
+    if not filas and not vacio_ok:
+        _borrar(path)
+        return None
+
+    resp = Response(_leer_por_partes(path), mimetype=XLSX_MIMETYPE, direct_passthrough=True)
+    resp.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    resp.headers['Content-Length'] = str(os.path.getsize(path))
+    resp.call_on_close(lambda: _borrar(path))
+    return resp
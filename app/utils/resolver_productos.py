@@ -0,0 +1,251 @@
+# app/utils/resolver_productos.py
+
+import re
+import threading
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+from app.utils.productos import catalogo
+
+# --- Resolución de productos dictados por voz ------------------------------
+#
+# Lo que llega de Dialogflow es texto hablado: sin tildes o con tildes de más,
+# números en palabras ("rollo de quinientos"), "por seis" en lugar de "*6",
+# artículos que el nombre no lleva y errores de transcripción (b/v, s/z, ll/y).
+# El índice se arma en memoria una vez por versión del catálogo con los
+# nombres, los códigos y los alias de los productos activos:
+#
+#   - exacto:    texto normalizado -> código (caso común, un dict)
+#   - tokens:    clave fonética de cada palabra -> entradas que la contienen
+#   - trigramas: trigramas del texto normalizado -> entradas (errores de letra)
+#   - borrados:  cada clave fonética sin una de sus letras -> claves originales,
+#                para corregir una palabra a distancia 1 (letra cambiada, de
+#                más, de menos o dos letras invertidas) sin recorrer el vocabulario
+#
+# El puntaje combina la coincidencia de palabras y la de trigramas (Dice), así
+# que una consulta solo toca las entradas que comparten algo con lo dicho.
+
+Candidato = namedtuple('Candidato', 'producto puntaje')
+
+# Puntaje mínimo para tomar el primer candidato sin preguntar, y ventaja
+# mínima sobre el segundo (si no, se ofrecen ambos al usuario).
+UMBRAL = 0.6
+MARGEN = 0.1
+# Por debajo de este puntaje un candidato ni siquiera se sugiere
+MINIMO_SUGERENCIA = 0.4
+# Peso de las palabras frente a los trigramas
+PESO_TOKENS = 0.6
+# Largo mínimo de una palabra para corregirla (las cortas se confunden entre sí)
+LARGO_CORREGIBLE = 4
+
+PALABRAS_VACIAS = frozenset(
+    'a al con de del el en la las lo los para un una unas unos y'.split()
+)
+ABREVIATURAS = {
+    'hamb': 'hamburguesa', 'grd': 'grande', 'gr': 'gramos', 'lb': 'libra', '1/2': 'media',
+}
+NUMEROS = {
+    'cero': 0, 'uno': 1, 'dos': 2, 'tres': 3, 'cuatro': 4, 'cinco': 5, 'seis': 6,
+    'siete': 7, 'ocho': 8, 'nueve': 9, 'diez': 10, 'once': 11, 'doce': 12, 'trece': 13,
+    'catorce': 14, 'quince': 15, 'dieciseis': 16, 'diecisiete': 17, 'dieciocho': 18,
+    'diecinueve': 19, 'veinte': 20, 'veintiuno': 21, 'veintidos': 22, 'veintitres': 23,
+    'veinticuatro': 24, 'veinticinco': 25, 'treinta': 30, 'cuarenta': 40, 'cincuenta': 50,
+    'sesenta': 60, 'setenta': 70, 'ochenta': 80, 'noventa': 90, 'cien': 100, 'ciento': 100,
+    'doscientos': 200, 'trescientos': 300, 'cuatrocientos': 400, 'quinientos': 500,
+    'seiscientos': 600, 'setecientos': 700, 'ochocientos': 800, 'novecientos': 900,
+}
+MULTIPLICADORES = ('x', 'por')
+
+_RE_PALABRA = re.compile(r'\d+/\d+|\d+|[a-z]+')
+_REGLAS_FONETICAS = [(re.compile(p), r) for p, r in (
+    (r'ch', 'C'), (r'll', 'y'), (r'qu(?=[ei])', 'k'), (r'g(?=[ei])', 'j'), (r'gu(?=[ei])', 'g'),
+    (r'c(?=[ei])', 's'), (r'[cq]', 'k'), (r'z', 's'), (r'[vw]', 'b'), (r'h', ''), (r'x', 'ks'),
+    (r'y$', 'i'), (r'(.)\1+', r'\1'),
+)]
+
+
+def _sin_tildes(texto):
+    return ''.join(c for c in unicodedata.normalize('NFD', texto) if not unicodedata.combining(c))
+
+
+def _agrupar_numeros(palabras):
+    """'dos mil' -> '2000', 'treinta y dos' -> '32'; deja lo demás igual."""
+    salida, total, actual, en_numero = [], 0, 0, False
+    for i, p in enumerate(palabras):
+        # Por su clave fonética, para que 'doz mil' o 'ziete' también cuenten
+        valor = _NUMEROS_FONETICOS.get(clave_fonetica(p)) if p.isalpha() else None
+        if valor == 1000:
+            total += (actual or 1) * 1000
+            actual = 0
+            en_numero = True
+            continue
+        if valor is not None:
+            actual += valor
+            en_numero = True
+            continue
+        siguiente = palabras[i + 1] if i + 1 < len(palabras) else ''
+        if en_numero and p == 'y' and clave_fonetica(siguiente) in _NUMEROS_FONETICOS:
+            continue
+        if en_numero:
+            salida.append(str(total + actual))
+            total, actual, en_numero = 0, 0, False
+        salida.append(p)
+    if en_numero:
+        salida.append(str(total + actual))
+    return salida
+
+
+def normalizar(texto):
+    """Palabras significativas del texto: sin tildes ni mayúsculas, números en cifras, '*6' -> 'x6'."""
+    texto = _sin_tildes(str(texto).lower()).replace('*', ' x ')
+    palabras = [ABREVIATURAS.get(p, p) for p in _RE_PALABRA.findall(texto)]
+    palabras = _agrupar_numeros(palabras)
+
+    salida = []
+    for i, p in enumerate(palabras):
+        if p in MULTIPLICADORES and i + 1 < len(palabras) and palabras[i + 1].isdigit():
+            continue  # se une al número: 'por 6' -> 'x6'
+        if p.isdigit() and i and palabras[i - 1] in MULTIPLICADORES:
+            p = 'x' + p
+        if p not in PALABRAS_VACIAS:
+            salida.append(p)
+    return tuple(salida)
+
+
+@lru_cache(maxsize=4096)
+def clave_fonetica(palabra):
+    """Clave de pronunciación (español) de una palabra normalizada: 'vollo' == 'bollo' == 'boyo'."""
+    if any(c.isdigit() for c in palabra):
+        return palabra
+    for patron, reemplazo in _REGLAS_FONETICAS:
+        palabra = patron.sub(reemplazo, palabra)
+    return palabra
+
+
+_NUMEROS_FONETICOS = {clave_fonetica(p): v for p, v in {**NUMEROS, 'mil': 1000}.items()}
+
+
+def _borrados(palabra):
+    return {palabra[:i] + palabra[i + 1:] for i in range(len(palabra))}
+
+
+def _trigramas(clave):
+    texto = f' {clave} '
+    return frozenset(texto[i:i + 3] for i in range(len(texto) - 2))
+
+
+class IndiceProductos:
+    """Índice inmutable de los productos activos de una foto del catálogo."""
+
+    def __init__(self, productos):
+        self.productos = {}
+        self.exacto = {}
+        self._entradas = []      # (código, nº de claves fonéticas, nº de trigramas)
+        self._por_token = {}     # clave fonética -> [entrada]
+        self._por_trigrama = {}  # trigrama -> [entrada]
+        self._por_borrado = {}   # clave fonética sin una letra -> {clave fonética}
+
+        for p in productos:
+            if not p.activo:
+                continue
+            self.productos[p.codigo] = p
+            for texto in (p.nombre, p.codigo, *p.alias):
+                palabras = normalizar(texto)
+                if not palabras:
+                    continue
+                clave = ' '.join(palabras)
+                # Un nombre no pisa al de otro producto; un alias repetido se queda con el primero
+                self.exacto.setdefault(clave, p.codigo)
+
+                fonetica = {clave_fonetica(w) for w in palabras}
+                trigramas = _trigramas(clave)
+                entrada = len(self._entradas)
+                self._entradas.append((p.codigo, len(fonetica), len(trigramas)))
+                for k in fonetica:
+                    self._por_token.setdefault(k, []).append(entrada)
+                for t in trigramas:
+                    self._por_trigrama.setdefault(t, []).append(entrada)
+
+        for k in self._por_token:
+            if len(k) >= LARGO_CORREGIBLE and not k.isdigit():
+                for b in _borrados(k) | {k}:
+                    self._por_borrado.setdefault(b, set()).add(k)
+
+    def _corregir(self, clave):
+        """Claves del vocabulario a distancia 1 de `clave` (vacío si no hay)."""
+        if clave in self._por_token or len(clave) < LARGO_CORREGIBLE or clave.isdigit():
+            return ()
+        vecinas = set(self._por_borrado.get(clave, ()))
+        for b in _borrados(clave):
+            vecinas |= self._por_borrado.get(b, set())
+        return vecinas
+
+    def candidatos(self, texto, limite=3):
+        """Productos más parecidos a `texto`, de mayor a menor puntaje (1.0 = coincidencia exacta)."""
+        palabras = normalizar(texto)
+        if not palabras:
+            return []
+        clave = ' '.join(palabras)
+        codigo = self.exacto.get(clave)
+        if codigo is not None:
+            return [Candidato(self.productos[codigo], 1.0)]
+
+        fonetica = {clave_fonetica(w) for w in palabras}
+        trigramas = _trigramas(clave)
+        comunes_tok, comunes_tri = {}, {}
+        for k in fonetica:
+            entradas = set(self._por_token.get(k, ()))
+            for vecina in self._corregir(k):
+                entradas.update(self._por_token[vecina])
+            for e in entradas:
+                comunes_tok[e] = comunes_tok.get(e, 0) + 1
+        for t in trigramas:
+            for e in self._por_trigrama.get(t, ()):
+                comunes_tri[e] = comunes_tri.get(e, 0) + 1
+
+        mejores = {}
+        n_tok, n_tri = len(fonetica), len(trigramas)
+        for e, tri in comunes_tri.items():
+            codigo, e_tok, e_tri = self._entradas[e]
+            puntaje = (PESO_TOKENS * 2 * comunes_tok.get(e, 0) / (n_tok + e_tok)
+                       + (1 - PESO_TOKENS) * 2 * tri / (n_tri + e_tri))
+            if puntaje > mejores.get(codigo, 0):
+                mejores[codigo] = puntaje
+
+        orden = sorted(mejores.items(), key=lambda x: -x[1])[:limite]
+        return [Candidato(self.productos[c], round(s, 3)) for c, s in orden]
+
+    def resolver(self, texto):
+        """
+        (producto, candidatos): el producto si la coincidencia es clara, o None
+        y los candidatos para preguntarle al usuario cuál quiso decir.
+        """
+        candidatos = [c for c in self.candidatos(texto) if c.puntaje >= MINIMO_SUGERENCIA]
+        if not candidatos or candidatos[0].puntaje < UMBRAL:
+            return None, candidatos
+        if len(candidatos) > 1 and candidatos[0].puntaje - candidatos[1].puntaje < MARGEN:
+            return None, candidatos
+        return candidatos[0].producto, candidatos
+
+
+_INDICE = {'actual': (None, None)}   # (foto del catálogo, índice)
+_INDICE_LOCK = threading.Lock()
+
+
+def indice_productos():
+    """Índice de la foto vigente del catálogo; se reconstruye solo cuando esta cambia."""
+    foto = catalogo()
+    de_foto, indice = _INDICE['actual']
+    if de_foto is foto:
+        return indice
+    with _INDICE_LOCK:
+        de_foto, indice = _INDICE['actual']
+        if de_foto is not foto:
+            indice = IndiceProductos(foto.por_codigo.values())
+            _INDICE['actual'] = (foto, indice)
+        return indice
+
+
+def resolver_producto(texto):
+    return indice_productos().resolver(texto)
@@ -0,0 +1,232 @@
+# app/utils/resumen_diario.py
+"""
+Mantenimiento y lectura de la tabla de hechos diaria (BDResumenDiario).
+
+Cada vez que se hace flush de un documento (o de sus ítems) se anotan las
+claves (tipo, fecha, vendedor) afectadas y, en el mismo flush, se recalcula
+solo esa porción a partir de las tablas origen. Así la tabla queda siempre
+en la misma transacción que el documento, sin importar qué ruta lo escribió.
+"""
+
+from sqlalchemy import event, select, delete, insert, func, case, literal
+from sqlalchemy.orm import Session, attributes
+
+from app import db
+from app.models.pedidos          import BDPedido
+from app.models.pedido_item      import BDPedidoItem
+from app.models.extras           import BDExtra
+from app.models.extra_item       import BDExtraItem
+from app.models.devoluciones     import BDDevolucion
+from app.models.devolucion_item  import BDDevolucionItem
+from app.models.despachos        import BDDespacho, BDDespachoItem
+from app.models.ventas           import BDVenta
+from app.models.venta_item       import BDVentaItem
+from app.models.vendedor         import Vendedor
+from app.models.producto         import Producto
+from app.models.resumen_diario   import BDResumenDiario
+from app.utils.productos         import CATEGORIAS_PANADERIA
+
+# tipo -> (cabecera, ítem, fk ítem->cabecera, atributo del vendedor en la cabecera)
+TIPOS = {
+    'pedido':     (BDPedido,     BDPedidoItem,     BDPedidoItem.pedido_id,         'codigo_vendedor'),
+    'extra':      (BDExtra,      BDExtraItem,      BDExtraItem.extra_id,           'codigo_vendedor'),
+    'devolucion': (BDDevolucion, BDDevolucionItem, BDDevolucionItem.devolucion_id, 'codigo_vendedor'),
+    'despacho':   (BDDespacho,   BDDespachoItem,   BDDespachoItem.despacho_id,     'vendedor_cod'),
+    'venta':      (BDVenta,      BDVentaItem,      BDVentaItem.venta_id,           'codigo_vendedor'),
+}
+
+# clase de ítem -> (nombre de la relación hacia la cabecera, atributo fk)
+_ITEMS = {
+    BDPedidoItem:     ('pedido',     'pedido_id'),
+    BDExtraItem:      ('extra',      'extra_id'),
+    BDDevolucionItem: ('devolucion', 'devolucion_id'),
+    BDDespachoItem:   ('despacho',   'despacho_id'),
+    BDVentaItem:      ('venta',      'venta_id'),
+}
+
+_CABECERAS = {cab: tipo for tipo, (cab, _, _, _) in TIPOS.items()}
+
+_PENDIENTES = 'resumen_diario_pendiente'
+
+
+def _select_tipo(tipo, fecha=None, codigo_vendedor=None):
+    """SELECT agregado por día/vendedor/producto para un tipo de documento."""
+    cab, item, fk, attr_vend = TIPOS[tipo]
+    col_vend = getattr(cab, attr_vend)
+
+    if tipo == 'venta':
+        comision = func.sum(item.comision)
+    else:
+        pct = case(
+            (func.lower(Producto.categoria).in_(CATEGORIAS_PANADERIA), Vendedor.comision_panaderia),
+            else_=Vendedor.comision_bizcocheria
+        )
+        comision = func.sum(item.subtotal * func.coalesce(pct, 0) / 100)
+
+    sel = (
+        select(
+            cab.fecha,
+            col_vend,
+            item.producto_cod,
+            literal(tipo),
+            func.sum(item.cantidad),
+            func.coalesce(func.sum(item.subtotal), 0),
+            func.coalesce(comision, 0)
+        )
+        .select_from(cab)
+        .join(item, fk == cab.id)
+        .outerjoin(Vendedor, Vendedor.codigo_vendedor == col_vend)
+        .outerjoin(Producto, Producto.codigo == item.producto_cod)
+        .group_by(cab.fecha, col_vend, item.producto_cod)
+    )
+    if fecha is not None:
+        sel = sel.where(cab.fecha == fecha, col_vend == codigo_vendedor)
+    return sel
+
+
+def _insertar(conn, tipo, fecha=None, codigo_vendedor=None):
+    t = BDResumenDiario.__table__
+    conn.execute(
+        insert(t).from_select(
+            ['fecha', 'codigo_vendedor', 'producto_cod', 'tipo_doc', 'cantidad', 'valor', 'comision'],
+            _select_tipo(tipo, fecha, codigo_vendedor)
+        )
+    )
+
+
+def recalcular_porcion(conn, tipo, fecha, codigo_vendedor):
+    """Recalcula las filas de un tipo para un día y vendedor."""
+    t = BDResumenDiario.__table__
+    conn.execute(
+        delete(t).where(
+            t.c.tipo_doc == tipo,
+            t.c.fecha == fecha,
+            t.c.codigo_vendedor == codigo_vendedor
+        )
+    )
+    _insertar(conn, tipo, fecha, codigo_vendedor)
+
+
+def recalcular_porciones(conn, tipo, fecha, codigos_vendedor):
+    """Como recalcular_porcion, para varios vendedores del mismo día en dos sentencias."""
+    t = BDResumenDiario.__table__
+    cab, _, _, attr_vend = TIPOS[tipo]
+    codigos_vendedor = list(codigos_vendedor)
+    conn.execute(
+        delete(t).where(
+            t.c.tipo_doc == tipo,
+            t.c.fecha == fecha,
+            t.c.codigo_vendedor.in_(codigos_vendedor)
+        )
+    )
+    conn.execute(
+        insert(t).from_select(
+            ['fecha', 'codigo_vendedor', 'producto_cod', 'tipo_doc', 'cantidad', 'valor', 'comision'],
+            _select_tipo(tipo).where(cab.fecha == fecha, getattr(cab, attr_vend).in_(codigos_vendedor))
+        )
+    )
+
+
+def reconstruir_resumen():
+    """Vacía la tabla y la reconstruye completa desde los documentos."""
+    conn = db.session.connection()
+    conn.execute(delete(BDResumenDiario.__table__))
+    for tipo in TIPOS:
+        _insertar(conn, tipo)
+    db.session.commit()
+
+
+# --- Mantenimiento incremental -------------------------------------------
+
+def _valores(obj, attr):
+    """Valor actual y valores anteriores (si cambiaron) de un atributo."""
+    hist = attributes.get_history(obj, attr)
+    return [v for v in (list(hist.added) + list(hist.unchanged) + list(hist.deleted)) if v is not None]
+
+
+def _claves_cabecera(tipo, cab):
+    attr_vend = TIPOS[tipo][3]
+    return {
+        (tipo, f, v)
+        for f in _valores(cab, 'fecha')
+        for v in _valores(cab, attr_vend)
+    }
+
+
+def _antes_del_flush(session, flush_context, instances):
+    claves = session.info.setdefault(_PENDIENTES, set())
+    with session.no_autoflush:
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            tipo = _CABECERAS.get(type(obj))
+            if tipo:
+                claves |= _claves_cabecera(tipo, obj)
+                continue
+
+            rel = _ITEMS.get(type(obj))
+            if not rel:
+                continue
+            nombre_rel, attr_fk = rel
+            cabeceras = _valores(obj, nombre_rel)
+            if not cabeceras:
+                cab_id = getattr(obj, attr_fk)
+                cab_cls = next(c for c, t in _CABECERAS.items() if t == nombre_rel)
+                cab = session.get(cab_cls, cab_id) if cab_id else None
+                cabeceras = [cab] if cab else []
+            for cab in cabeceras:
+                claves |= _claves_cabecera(nombre_rel, cab)
+
+
+def _despues_del_flush(session, flush_context):
+    claves = session.info.pop(_PENDIENTES, None)
+    if not claves:
+        return
+    conn = session.connection()
+    for tipo, fecha, codigo_vendedor in claves:
+        recalcular_porcion(conn, tipo, fecha, codigo_vendedor)
+
+
+def registrar_eventos_resumen():
+    """Conecta el mantenimiento incremental a todas las sesiones."""
+    if not event.contains(Session, 'before_flush', _antes_del_flush):
+        event.listen(Session, 'before_flush', _antes_del_flush)
+        event.listen(Session, 'after_flush', _despues_del_flush)
+
+
+# --- Lectura ---------------------------------------------------------------
+
+def _filtro(query, tipos, desde, hasta=None, codigo_vendedor=None):
+    query = query.filter(BDResumenDiario.tipo_doc.in_(tipos), BDResumenDiario.fecha >= desde)
+    if hasta is not None:
+        query = query.filter(BDResumenDiario.fecha <= hasta)
+    if codigo_vendedor is not None:
+        query = query.filter(BDResumenDiario.codigo_vendedor == codigo_vendedor)
+    return query
+
+
+def total_valor(tipos, desde, hasta=None, codigo_vendedor=None):
+    """Suma de valor y comisión para los tipos y el rango dados."""
+    query = db.session.query(
+        func.coalesce(func.sum(BDResumenDiario.valor), 0),
+        func.coalesce(func.sum(BDResumenDiario.comision), 0)
+    )
+    valor, comision = _filtro(query, tipos, desde, hasta, codigo_vendedor).one()
+    return float(valor), float(comision)
+
+
+def valor_por_vendedor(tipos, desde, hasta=None):
+    """[(nombre vendedor, valor)] para los tipos y el rango dados."""
+    query = (db.session.query(Vendedor.nombre, func.sum(BDResumenDiario.valor))
+             .join(Vendedor, Vendedor.codigo_vendedor == BDResumenDiario.codigo_vendedor))
+    query = _filtro(query, tipos, desde, hasta).group_by(Vendedor.nombre)
+    return [(nombre, float(valor)) for nombre, valor in query.all()]
+
+
+def totales_por_codigo_vendedor(tipos, desde, hasta=None):
+    """{codigo_vendedor: (valor, comision)} para los tipos y el rango dados."""
+    query = db.session.query(
+        BDResumenDiario.codigo_vendedor,
+        func.sum(BDResumenDiario.valor),
+        func.sum(BDResumenDiario.comision)
+    )
+    query = _filtro(query, tipos, desde, hasta).group_by(BDResumenDiario.codigo_vendedor)
+    return {cod: (float(valor), float(comision)) for cod, valor, comision in query.all()}
@@ -0,0 +1,155 @@
+# app/utils/sesiones_voz.py
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.sesion_voz import BDSesionVoz
+
+DEFAULTS = {
+    'VOZ_SESIONES':    'memoria',  # 'memoria' (un worker) o 'bd' (compartido, sobrevive reinicios)
+    'VOZ_SESION_TTL':  1800,       # segundos sin uso antes de descartar la sesión
+    'VOZ_SESION_MAX':  500,        # sesiones como máximo; sale la usada hace más tiempo
+}
+
+# --- Sesiones de voz del webhook de Dialogflow -----------------------------
+#
+# Guardan el usuario que inició sesión y los productos dictados. Cada acceso
+# renueva el TTL, así que una sesión activa no caduca a mitad de un despacho
+# y una abandonada sale sola. Los datos deben ser serializables a JSON (el
+# backend 'bd' los guarda como texto).
+
+
+class AlmacenMemoria:
+    """LRU en memoria del proceso con TTL por entrada y tope de tamaño."""
+
+    def __init__(self, ttl, maximo):
+        self.ttl = ttl
+        self.maximo = maximo
+        self._datos = OrderedDict()   # session_id -> (expira, datos), de la más vieja a la más nueva
+        self._lock = threading.Lock()
+
+    def _purgar(self, ahora):
+        # Con TTL fijo el orden LRU coincide con el de vencimiento: basta mirar el principio
+        while self._datos:
+            clave, (expira, _) = next(iter(self._datos.items()))
+            if expira > ahora and len(self._datos) <= self.maximo:
+                break
+            del self._datos[clave]
+
+    def obtener(self, session_id):
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(session_id)
+            if entrada is None or entrada[0] <= ahora:
+                self._datos.pop(session_id, None)
+                return None
+            self._datos[session_id] = (ahora + self.ttl, entrada[1])
+            self._datos.move_to_end(session_id)
+            return json.loads(entrada[1])
+
+    def guardar(self, session_id, datos):
+        ahora = time.monotonic()
+        texto = json.dumps(datos)  # copia independiente, igual que en la BD
+        with self._lock:
+            self._datos[session_id] = (ahora + self.ttl, texto)
+            self._datos.move_to_end(session_id)
+            self._purgar(ahora)
+
+    def borrar(self, session_id):
+        with self._lock:
+            self._datos.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class AlmacenBD:
+    """Sesiones en la tabla bd_sesiones_voz: compartidas entre workers y persistentes."""
+
+    # Cada cuántas escrituras se barren las vencidas y se aplica el tope
+    BARRIDO_CADA = 50
+
+    def __init__(self, ttl, maximo):
+        self.ttl = timedelta(seconds=ttl)
+        self.maximo = maximo
+        self._escrituras = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, session_id):
+        t = BDSesionVoz.__table__
+        ahora = datetime.now()
+        with db.engine.begin() as conn:
+            datos = conn.execute(
+                select(t.c.datos).where(t.c.session_id == session_id, t.c.expira > ahora)
+            ).scalar()
+            if datos is not None:
+                conn.execute(update(t).where(t.c.session_id == session_id).values(expira=ahora + self.ttl))
+        return json.loads(datos) if datos is not None else None
+
+    def guardar(self, session_id, datos):
+        t = BDSesionVoz.__table__
+        valores = dict(datos=json.dumps(datos), expira=datetime.now() + self.ttl)
+        subir = update(t).where(t.c.session_id == session_id).values(**valores)
+        try:
+            with db.engine.begin() as conn:
+                if not conn.execute(subir).rowcount:
+                    conn.execute(insert(t).values(session_id=session_id, **valores))
+        except IntegrityError:
+            with db.engine.begin() as conn:  # otro worker la creó primero
+                conn.execute(subir)
+
+        with self._lock:
+            self._escrituras += 1
+            barrer = self._escrituras % self.BARRIDO_CADA == 0
+        if barrer:
+            self.purgar()
+
+    def borrar(self, session_id):
+        t = BDSesionVoz.__table__
+        with db.engine.begin() as conn:
+            conn.execute(delete(t).where(t.c.session_id == session_id))
+
+    def purgar(self):
+        """Borra las vencidas y, si aún sobran, las de uso más antiguo."""
+        t = BDSesionVoz.__table__
+        with db.engine.begin() as conn:
+            conn.execute(delete(t).where(t.c.expira <= datetime.now()))
+            sobran = conn.execute(select(func.count()).select_from(t)).scalar() - self.maximo
+            if sobran > 0:
+                viejas = conn.execute(select(t.c.session_id).order_by(t.c.expira).limit(sobran)).scalars().all()
+                conn.execute(delete(t).where(t.c.session_id.in_(viejas)))
+
+    def __len__(self):
+        with db.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(BDSesionVoz.__table__)).scalar()
+
+
+BACKENDS = {'memoria': AlmacenMemoria, 'bd': AlmacenBD}
+
+_ALMACEN_LOCK = threading.Lock()
+
+
+def _cfg(clave):
+    return current_app.config.get(clave, DEFAULTS[clave])
+
+
+def sesiones_voz():
+    """Almacén de sesiones de voz de la app actual (se crea al primer uso)."""
+    almacen = current_app.extensions.get('sesiones_voz')
+    if almacen is None:
+        with _ALMACEN_LOCK:
+            almacen = current_app.extensions.get('sesiones_voz')
+            if almacen is None:
+                backend = BACKENDS[_cfg('VOZ_SESIONES')]
+                almacen = current_app.extensions['sesiones_voz'] = backend(
+                    _cfg('VOZ_SESION_TTL'), _cfg('VOZ_SESION_MAX')
+                )
+    return almacen
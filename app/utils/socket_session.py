@@ -1,11 +1,167 @@
 # app/utils/socket_session.py
 
-# Diccionario en memoria: { session_id_dialogflow: socket_id_flask }
-socket_mapping = {}
+import queue
+import threading
+import time
+import uuid
+from collections import deque
 
-def registrar_socket(session_id, socket_id):
-    print(f"[🧠 Asociación] Guardando socket_id {socket_id} para sesión {session_id}")
-    socket_mapping[session_id] = socket_id
+import socketio
 
-def obtener_socket(session_id):
-    return socket_mapping.get(session_id)
+from app.extensions import socketio as servidor_socketio
+
+# --- Índice session_id (Dialogflow) <-> socket_id (Flask-SocketIO) ---------
+#
+# Bidireccional para que la limpieza al desconectar sea O(1). Una sesión de
+# voz puede tener varias pestañas abiertas, así que guarda un conjunto de
+# sockets por sesión. El índice es local a cada worker: la entrega entre
+# workers la hacen los rooms (room = session_id) a través de la cola de
+# mensajes configurada en SOCKETIO_MESSAGE_QUEUE.
+
+_POR_SESION = {}   # session_id -> {socket_id}
+_POR_SOCKET = {}   # socket_id  -> session_id
+_INDICE_LOCK = threading.Lock()
+
+
+def vincular_socket(session_id, socket_id):
+    """
+    Asocia el socket a la sesión (y lo suelta de la sesión anterior, si tenía).
+    Devuelve la sesión a la que estaba asociado antes, o None.
+    """
+    with _INDICE_LOCK:
+        anterior = _POR_SOCKET.get(socket_id)
+        if anterior == session_id:
+            return anterior
+        if anterior is not None:
+            _quitar(anterior, socket_id)
+        _POR_SOCKET[socket_id] = session_id
+        _POR_SESION.setdefault(session_id, set()).add(socket_id)
+        return anterior
+
+
+def desvincular_socket(socket_id):
+    """Quita el socket del índice; devuelve la sesión a la que estaba asociado, o None."""
+    with _INDICE_LOCK:
+        session_id = _POR_SOCKET.pop(socket_id, None)
+        if session_id is not None:
+            _quitar(session_id, socket_id)
+        return session_id
+
+
+def _quitar(session_id, socket_id):
+    sockets = _POR_SESION.get(session_id)
+    if sockets is not None:
+        sockets.discard(socket_id)
+        if not sockets:
+            del _POR_SESION[session_id]
+
+
+def sockets_de_sesion(session_id):
+    """Sockets de este worker asociados a la sesión."""
+    with _INDICE_LOCK:
+        return set(_POR_SESION.get(session_id, ()))
+
+
+def sesion_de_socket(socket_id):
+    return _POR_SOCKET.get(socket_id)
+
+
+# --- Emisión dirigida a la sesión de voz ----------------------------------
+#
+# Los eventos del webhook van solo al room de su sesión (nunca en broadcast).
+# Se guardan además en una cola de pendientes acotada que se reenvía a cada
+# socket que se registra después (p. ej. la pestaña que está cargando la
+# página que abrió 'abrir_pagina'). La cola no se vacía al entregarla: una
+# sesión puede registrar más de un socket y todos deben recibirla.
+#
+# Cada evento lleva un 'evento_id' y cada pestaña descarta los que ya vio, así
+# que un reenvío nunca se aplica dos veces en la misma pestaña. Con cola de
+# mensajes este worker no sabe si otro ya entregó el evento por el room, por
+# eso lo guarda siempre; sin ella, si la sesión ya tiene sockets aquí, el
+# evento quedó entregado.
+
+PENDIENTES_MAX = 50    # eventos por sesión
+PENDIENTES_TTL = 120   # segundos
+
+_PENDIENTES = {}       # session_id -> deque[(momento, evento, datos)]
+
+
+def _con_cola_de_mensajes():
+    return isinstance(servidor_socketio.server.manager, socketio.PubSubManager)
+
+
+def _purgar_pendientes(limite):
+    # Descarta las sesiones cuyo último evento ya venció, para que el dict no crezca
+    for sid in [s for s, cola in _PENDIENTES.items() if cola[-1][0] < limite]:
+        del _PENDIENTES[sid]
+
+
+def emitir_a_sesion(evento, datos, session_id):
+    """Emite `evento` únicamente a los sockets de la sesión (en cualquier worker)."""
+    datos = {**datos, 'evento_id': uuid.uuid4().hex}
+    servidor_socketio.emit(evento, datos, to=session_id)
+    ahora = time.monotonic()
+    with _INDICE_LOCK:
+        if _POR_SESION.get(session_id) and not _con_cola_de_mensajes():
+            return
+        _purgar_pendientes(ahora - PENDIENTES_TTL)
+        pendientes = _PENDIENTES.get(session_id)
+        if pendientes is None:
+            pendientes = _PENDIENTES[session_id] = deque(maxlen=PENDIENTES_MAX)
+        pendientes.append((ahora, evento, datos))
+
+
+def pendientes_de_sesion(session_id):
+    """Eventos pendientes aún vigentes de la sesión, del más viejo al más nuevo: [(evento, datos)]."""
+    limite = time.monotonic() - PENDIENTES_TTL
+    with _INDICE_LOCK:
+        _purgar_pendientes(limite)
+        pendientes = list(_PENDIENTES.get(session_id, ()))
+    return [(evento, datos) for momento, evento, datos in pendientes if momento >= limite]
+
+
+# --- Cola de mensajes de Socket.IO -----------------------------------------
+
+class ColaEnProceso(socketio.PubSubManager):
+    """
+    Cola de mensajes en memoria con la misma interfaz que RedisManager.
+    Varios servidores Socket.IO del mismo proceso se reparten los eventos
+    como lo harían varios workers a través de Redis (pruebas y desarrollo).
+    Pensada para async_mode 'threading'.
+    """
+    name = 'memoria'
+
+    _suscriptores = {}   # canal -> [queue.Queue]
+    _lock = threading.Lock()
+
+    _cola = None
+
+    def initialize(self):
+        if self._cola is not None:
+            return  # una sola suscripción (y un solo hilo lector) por instancia
+        self._cola = queue.Queue()
+        with self._lock:
+            self._suscriptores.setdefault(self.channel, []).append(self._cola)
+        super().initialize()
+
+    def _publish(self, data):
+        mensaje = self.json.dumps(data)  # mismo requisito de serialización que Redis
+        with self._lock:
+            colas = list(self._suscriptores.get(self.channel, ()))
+        for cola in colas:
+            cola.put(mensaje)
+
+    def _listen(self):
+        while True:
+            yield self._cola.get()
+
+
+def opciones_cola(config):
+    """Argumentos de socketio.init_app según SOCKETIO_MESSAGE_QUEUE."""
+    url = config.get('SOCKETIO_MESSAGE_QUEUE')
+    canal = config.get('SOCKETIO_CANAL', 'flask-socketio')
+    if not url:
+        return {}
+    if url == 'memoria':
+        return {'client_manager': ColaEnProceso(channel=canal)}
+    return {'message_queue': url, 'channel': canal}
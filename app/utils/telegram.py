@@ -1,19 +1,258 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import requests
+from flask import current_app
+from sqlalchemy import update
+
 from app import db
 from app.models.config_telegram import ConfiguracionTelegram
-import requests
+from app.models.notificacion import BDNotificacion
 
-def enviar_telegram(mensaje):
-    config = ConfiguracionTelegram.query.first()
-    if not config or not config.activo:
-        return  # Notificaciones desactivadas
+# Telegram rechaza textos de más de 4096 caracteres
+LIMITE_TEXTO = 4096
+SEPARADOR = "\n\n"
 
+DEFAULTS = {
+    'TELEGRAM_API_URL':       'https://api.telegram.org',
+    'TELEGRAM_WORKER':        True,    # hilo en segundo plano dentro del proceso web
+    'TELEGRAM_LOTE':          20,      # mensajes de la bandeja agrupados por envío
+    'TELEGRAM_INTERVALO':     1.0,     # segundos mínimos entre envíos (límite de Telegram)
+    'TELEGRAM_ESPERA':        5.0,     # segundos de espera del worker sin trabajo
+    'TELEGRAM_TIMEOUT':       (3, 10), # (conexión, lectura)
+    'TELEGRAM_MAX_INTENTOS':  8,
+    'TELEGRAM_BACKOFF_BASE':  2.0,     # segundos; se duplica en cada reintento
+    'TELEGRAM_BACKOFF_MAX':   600.0,
+}
+
+# Reclamos 'enviando' más viejos que esto se consideran de un worker caído
+RECLAMO_VENCIDO = timedelta(minutes=5)
+
+
+def _cfg(clave):
+    return current_app.config.get(clave, DEFAULTS[clave])
+
+
+def enviar_telegram(mensaje):
+    """
+    Encola el mensaje en la bandeja de salida y vuelve de inmediato.
+    El envío real lo hace el worker (ver despachar_pendientes). Con las
+    notificaciones desactivadas el mensaje se descarta, como antes de la cola.
+    """
     try:
-        url = f"https://api.telegram.org/bot{config.token}/sendMessage"
-        payload = {
-            "chat_id": config.chat_id,
-            "text": mensaje,
-            "parse_mode": "Markdown"
-        }
-        requests.post(url, data=payload)
+        activo = db.session.query(ConfiguracionTelegram.activo).limit(1).scalar()
+        if not activo:
+            return  # Notificaciones desactivadas
+        db.session.add(BDNotificacion(mensaje=mensaje))
+        db.session.commit()
     except Exception as e:
+        db.session.rollback()
+        print(f"[TELEGRAM] Error al encolar: {e}")
+        return
+
+    if _cfg('TELEGRAM_WORKER'):
+        iniciar_worker(current_app._get_current_object())
+    _hay_trabajo.set()
+
+
+# --- Envío -----------------------------------------------------------------
+
+class ErrorTelegram(Exception):
+    def __init__(self, mensaje, reintentar_en=None, status=None):
+        super().__init__(mensaje)
+        self.reintentar_en = reintentar_en
+        self.status = status
+
+    @property
+    def permanente(self):
+        """4xx distinto de 429: reintentar el mismo texto daría el mismo error."""
+        return self.status is not None and 400 <= self.status < 500 and self.status != 429
+
+
+_http = threading.local()
+_ultimo_envio = [0.0]
+_envio_lock = threading.Lock()
+
+
+def _sesion_http():
+    """requests.Session por hilo: reutiliza conexiones TLS entre envíos."""
+    if not hasattr(_http, 'sesion'):
+        _http.sesion = requests.Session()
+    return _http.sesion
+
+
+def _respetar_intervalo():
+    with _envio_lock:
+        espera = _ultimo_envio[0] + _cfg('TELEGRAM_INTERVALO') - time.monotonic()
+        if espera > 0:
+            time.sleep(espera)
+        _ultimo_envio[0] = time.monotonic()
+
+
+def _post(config, texto):
+    _respetar_intervalo()
+    url = f"{_cfg('TELEGRAM_API_URL').rstrip('/')}/bot{config.token}/sendMessage"
+    payload = {"chat_id": config.chat_id, "text": texto, "parse_mode": "Markdown"}
+    try:
+        resp = _sesion_http().post(url, data=payload, timeout=_cfg('TELEGRAM_TIMEOUT'))
+    except requests.RequestException as e:
+        raise ErrorTelegram(str(e))
+
+    if resp.status_code == 429:
+        try:
+            retry = resp.json().get('parameters', {}).get('retry_after')
+        except ValueError:
+            retry = None
+        raise ErrorTelegram("429 Too Many Requests", reintentar_en=retry, status=429)
+    if resp.status_code >= 400:
+        raise ErrorTelegram(f"HTTP {resp.status_code}: {resp.text[:200]}", status=resp.status_code)
+
+
+def _agrupar(notificaciones):
+    """Parte la lista en grupos cuyo texto unido cabe en un mensaje."""
+    grupos, actual, largo = [], [], 0
+    for n in notificaciones:
+        extra = len(n.mensaje) + (len(SEPARADOR) if actual else 0)
+        if actual and largo + extra > LIMITE_TEXTO:
+            grupos.append(actual)
+            actual, largo = [], 0
+            extra = len(n.mensaje)
+        actual.append(n)
+        largo += extra
+    if actual:
+        grupos.append(actual)
+    return grupos
+
+
+def _reclamar(limite):
+    """Marca como 'enviando' hasta `limite` pendientes vencidas; devuelve las obtenidas."""
+    ahora = datetime.now()
+    candidatas = (BDNotificacion.query
+                  .filter(
+                      ((BDNotificacion.estado == 'pendiente') & (BDNotificacion.proximo_intento <= ahora)) |
+                      ((BDNotificacion.estado == 'enviando') & (BDNotificacion.reclamada_en <= ahora - RECLAMO_VENCIDO))
+                  )
+                  .order_by(BDNotificacion.id)
+                  .limit(limite)
+                  .with_entities(BDNotificacion.id, BDNotificacion.estado)
+                  .all())
+
+    ids = []
+    for nid, estado in candidatas:
+        # Reclamo atómico: si otro proceso la tomó primero, rowcount es 0
+        res = db.session.execute(
+            update(BDNotificacion)
+            .where(BDNotificacion.id == nid, BDNotificacion.estado == estado)
+            .values(estado='enviando', reclamada_en=ahora)
+        )
+        if res.rowcount:
+            ids.append(nid)
+    db.session.commit()
+    if not ids:
+        return []
+    return BDNotificacion.query.filter(BDNotificacion.id.in_(ids)).order_by(BDNotificacion.id).all()
+
+
+def _fallo(grupo, error):
+    base, maximo = _cfg('TELEGRAM_BACKOFF_BASE'), _cfg('TELEGRAM_BACKOFF_MAX')
+    for n in grupo:
+        n.intentos += 1
+        n.ultimo_error = str(error)[:255]
+        if error.permanente or n.intentos >= _cfg('TELEGRAM_MAX_INTENTOS'):
+            n.estado = 'fallida'
+            continue
+        espera = error.reintentar_en or min(base * 2 ** (n.intentos - 1), maximo)
+        n.estado = 'pendiente'
+        n.proximo_intento = datetime.now() + timedelta(seconds=espera)
+
+
+def _enviado(grupo):
+    for n in grupo:
+        n.estado = 'enviada'
+        n.enviada_en = datetime.now()
+
+
+def _enviar_grupo(config, grupo):
+    """Envía el grupo unido en un mensaje; devuelve (enviadas, con_error)."""
+    try:
+        _post(config, SEPARADOR.join(n.mensaje for n in grupo))
+    except ErrorTelegram as e:
         print(f"[TELEGRAM] Error al enviar: {e}")
+        if e.status == 400 and len(grupo) > 1:
+            # Casi siempre Markdown mal formado en uno de los mensajes (un '_' o
+            # un '*' sin cerrar que se extiende al siguiente): se reenvían de a
+            # uno para que solo se pierda el malo
+            enviadas = errores = 0
+            for n in grupo:
+                e1, e2 = _enviar_grupo(config, [n])
+                enviadas, errores = enviadas + e1, errores + e2
+            return enviadas, errores
+        _fallo(grupo, e)
+        return 0, len(grupo)
+    _enviado(grupo)
+    return len(grupo), 0
+
+
+def _omitir_pendientes():
+    """Descarta lo encolado antes de desactivar: al reactivar no sale una ráfaga vieja."""
+    db.session.execute(
+        update(BDNotificacion)
+        .where(BDNotificacion.estado.in_(('pendiente', 'enviando')))
+        .values(estado='omitida')
+    )
+    db.session.commit()
+
+
+def despachar_pendientes():
+    """
+    Envía un lote de la bandeja de salida. Devuelve (enviadas, con_error).
+    Debe llamarse dentro de un app context.
+    """
+    config = ConfiguracionTelegram.query.first()
+    if not config or not config.activo:
+        _omitir_pendientes()
+        return 0, 0
+
+    notificaciones = _reclamar(_cfg('TELEGRAM_LOTE'))
+    enviadas = errores = 0
+    for grupo in _agrupar(notificaciones):
+        e1, e2 = _enviar_grupo(config, grupo)
+        enviadas, errores = enviadas + e1, errores + e2
+        db.session.commit()
+    return enviadas, errores
+
+
+def pendientes_en_cola():
+    return BDNotificacion.query.filter(BDNotificacion.estado.in_(('pendiente', 'enviando'))).count()
+
+
+# --- Worker en segundo plano ---------------------------------------------
+
+_hay_trabajo = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _bucle(app):
+    while True:
+        _hay_trabajo.clear()
+        enviadas = 0
+        try:
+            with app.app_context():
+                enviadas, _ = despachar_pendientes()
+                db.session.remove()
+        except Exception as e:
+            print(f"[TELEGRAM] Error en el worker: {e}")
+        if not enviadas:
+            _hay_trabajo.wait(app.config.get('TELEGRAM_ESPERA', DEFAULTS['TELEGRAM_ESPERA']))
+
+
+def iniciar_worker(app):
+    """Arranca (una sola vez por proceso) el hilo que drena la bandeja."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_bucle, args=(app,), name='telegram-outbox', daemon=True)
+            _worker.start()
+    return _worker
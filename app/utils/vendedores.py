@@ -0,0 +1,32 @@
+# app/utils/vendedores.py
+
+import threading
+import time
+
+from app import db
+from app.models.vendedor import Vendedor
+
+# Mapa código -> nombre en memoria; lo usan todas las vistas de listado
+_NOMBRES = {'cargado': 0.0, 'mapa': None}
+_NOMBRES_LOCK = threading.Lock()
+# Otros procesos (workers) no ven la invalidación local; caducan solos.
+NOMBRES_TTL = 300
+
+
+def invalidar_vendedores():
+    """Descarta el mapa en memoria (llamar tras crear/editar/eliminar vendedores)."""
+    with _NOMBRES_LOCK:
+        _NOMBRES['mapa'] = None
+
+
+def nombres_vendedores():
+    """{codigo_vendedor: nombre}, con una consulta cada NOMBRES_TTL segundos."""
+    mapa = _NOMBRES['mapa']
+    if mapa is not None and time.monotonic() - _NOMBRES['cargado'] < NOMBRES_TTL:
+        return mapa
+
+    mapa = dict(db.session.query(Vendedor.codigo_vendedor, Vendedor.nombre).all())
+    with _NOMBRES_LOCK:
+        _NOMBRES['mapa'] = mapa
+        _NOMBRES['cargado'] = time.monotonic()
+    return mapa
@@ -0,0 +1,360 @@
+# app/utils/ventas.py
+"""
+Motor de liquidación de ventas: cruza devolución anterior + despacho de
+pedido + despacho de extra - devolución del día por producto y calcula
+valor, comisión y neto para la panadería.
+
+Sirve para un vendedor o para toda una ruta: una consulta agrupada trae las
+cantidades de todos los documentos pedidos y la aritmética se hace por
+columnas con pandas, no producto por producto.
+"""
+
+from collections import defaultdict, namedtuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, insert, literal, or_, select, tuple_, union_all, update
+
+from app import db
+from app.models.devoluciones     import BDDevolucion
+from app.models.devolucion_item  import BDDevolucionItem
+from app.models.despachos        import BDDespacho, BDDespachoItem
+from app.models.ventas           import BDVenta
+from app.models.venta_item       import BDVentaItem
+from app.models.vendedor         import Vendedor
+from app.utils.documentos        import generar_consecutivos
+from app.utils.productos         import catalogo
+from app.utils.resumen_diario    import recalcular_porciones
+from app.utils.vendedores        import nombres_vendedores
+
+# Columna del desglose -> (origen del documento, campo de la solicitud)
+ROLES = {
+    'dev_ant': ('devolucion', 'codigo_dev_anterior'),
+    'pedido':  ('despacho',   'codigo_pedido'),
+    'extra':   ('despacho',   'codigo_extra'),
+    'dev_dia': ('devolucion', 'codigo_dev_dia'),
+}
+
+SolicitudVenta = namedtuple(
+    'SolicitudVenta',
+    'codigo_vendedor codigo_dev_anterior codigo_pedido codigo_extra codigo_dev_dia'
+)
+SolicitudVenta.__new__.__defaults__ = (None, None, None, None)
+
+
+class LoteDesactualizado(Exception):
+    """Otro usuario usó documentos del lote entre la vista previa y la creación."""
+
+
+def _cantidades(pares):
+    """
+    DataFrame (origen, documento, vendedor, producto_cod, cantidad) para los
+    pares (origen, documento, vendedor) pedidos, en una sola consulta.
+    """
+    devs = {(doc, v) for origen, doc, v in pares if origen == 'devolucion'}
+    desps = {(doc, v) for origen, doc, v in pares if origen == 'despacho'}
+
+    partes = []
+    if devs:
+        partes.append(
+            select(literal('devolucion').label('origen'),
+                   BDDevolucion.consecutivo.label('documento'),
+                   BDDevolucion.codigo_vendedor.label('vendedor'),
+                   BDDevolucionItem.producto_cod,
+                   func.sum(BDDevolucionItem.cantidad).label('cantidad'))
+            .join(BDDevolucionItem, BDDevolucionItem.devolucion_id == BDDevolucion.id)
+            .where(tuple_(BDDevolucion.consecutivo, BDDevolucion.codigo_vendedor).in_(devs))
+            .group_by(BDDevolucion.consecutivo, BDDevolucion.codigo_vendedor,
+                      BDDevolucionItem.producto_cod)
+        )
+    if desps:
+        partes.append(
+            select(literal('despacho').label('origen'),
+                   BDDespacho.codigo_origen.label('documento'),
+                   BDDespacho.vendedor_cod.label('vendedor'),
+                   BDDespachoItem.producto_cod,
+                   func.sum(BDDespachoItem.cantidad).label('cantidad'))
+            .join(BDDespachoItem, BDDespachoItem.despacho_id == BDDespacho.id)
+            .where(tuple_(BDDespacho.codigo_origen, BDDespacho.vendedor_cod).in_(desps))
+            .group_by(BDDespacho.codigo_origen, BDDespacho.vendedor_cod,
+                      BDDespachoItem.producto_cod)
+        )
+
+    columnas = ['origen', 'documento', 'vendedor', 'producto_cod', 'cantidad']
+    if not partes:
+        return pd.DataFrame(columns=columnas)
+    consulta = partes[0] if len(partes) == 1 else union_all(*partes)
+    return pd.DataFrame(db.session.execute(consulta).all(), columns=columnas)
+
+
+def _vacio():
+    return {'lineas': [], 'total_valor': 0.0, 'total_comision': 0.0, 'total_pagar': 0.0,
+            'dev_ant': 0, 'pedido': 0, 'extra': 0, 'dev_dia': 0}
+
+
+def calcular_ventas(solicitudes):
+    """
+    Desglose por producto de cada SolicitudVenta, en el mismo orden recibido:
+    [{'lineas': [...], 'total_valor', 'total_comision', 'total_pagar',
+      'dev_ant', 'pedido', 'extra', 'dev_dia'}]
+    Cada línea trae codigo, nombre, precio, dev_ant, pedido, extra, dev_dia,
+    total, valor, comision y pagar_pan.
+    """
+    solicitudes = [SolicitudVenta(*s) if not isinstance(s, SolicitudVenta) else s for s in solicitudes]
+
+    # Una fila por (solicitud, rol) con el documento elegido
+    asignaciones = [
+        (i, rol, origen, getattr(s, campo), s.codigo_vendedor)
+        for i, s in enumerate(solicitudes)
+        for rol, (origen, campo) in ROLES.items()
+        if getattr(s, campo)
+    ]
+    if not asignaciones:
+        return [_vacio() for _ in solicitudes]
+
+    roles = pd.DataFrame(asignaciones, columns=['solicitud', 'rol', 'origen', 'documento', 'vendedor'])
+    cantidades = _cantidades({(o, d, v) for _, _, o, d, v in asignaciones})
+
+    cruce = roles.merge(cantidades, on=['origen', 'documento', 'vendedor'])
+    if cruce.empty:
+        return [_vacio() for _ in solicitudes]
+
+    tabla = (cruce.pivot_table(index=['solicitud', 'producto_cod'], columns='rol',
+                               values='cantidad', aggfunc='sum', fill_value=0)
+                   .reindex(columns=list(ROLES), fill_value=0)
+                   .astype(int)
+                   .reset_index())
+
+    # Precio, nombre, categoría y orden desde el catálogo en memoria
+    por_codigo = catalogo().por_codigo
+    codigos = tabla['producto_cod']
+    tabla['nombre'] = [por_codigo[c].nombre if c in por_codigo else c for c in codigos]
+    tabla['precio'] = [float(por_codigo[c].precio) if c in por_codigo else 0.0 for c in codigos]
+    categoria = pd.Series([por_codigo[c].categoria if c in por_codigo else ''
+                           for c in codigos], index=tabla.index)
+    tabla['orden'] = [por_codigo[c].orden if c in por_codigo else 9999 for c in codigos]
+
+    # Porcentaje de comisión según vendedor y categoría. La categoría se compara
+    # tal cual, como siempre se liquidó: 'Panadería' o 'PANADERIA' no llevan comisión
+    vendedores = {s.codigo_vendedor for s in solicitudes}
+    comisiones = pd.DataFrame(
+        db.session.query(Vendedor.codigo_vendedor, Vendedor.comision_panaderia,
+                         Vendedor.comision_bizcocheria)
+        .filter(Vendedor.codigo_vendedor.in_(vendedores)).all(),
+        columns=['vendedor', 'pan', 'bizco']
+    ).set_index('vendedor')
+    vendedor = pd.Series([solicitudes[i].codigo_vendedor for i in tabla['solicitud']], index=tabla.index)
+    pct_pan = vendedor.map(comisiones['pan']).fillna(0).astype(float)
+    pct_bizco = vendedor.map(comisiones['bizco']).fillna(0).astype(float)
+    pct = np.select(
+        [categoria == 'panaderia', categoria == 'bizcocheria'],
+        [pct_pan, pct_bizco],
+        default=0.0
+    ) / 100
+
+    tabla['total'] = tabla['dev_ant'] + tabla['pedido'] + tabla['extra'] - tabla['dev_dia']
+    tabla['valor'] = tabla['precio'] * tabla['total']
+    tabla['comision'] = tabla['valor'] * pct
+    tabla['pagar_pan'] = tabla['valor'] - tabla['comision']
+
+    tabla = tabla.sort_values(['solicitud', 'orden', 'nombre']).rename(columns={'producto_cod': 'codigo'})
+    columnas = ['codigo', 'nombre', 'precio', 'dev_ant', 'pedido', 'extra', 'dev_dia',
+                'total', 'valor', 'comision', 'pagar_pan']
+    sumas = tabla.groupby('solicitud')[['valor', 'comision', 'pagar_pan', *ROLES]].sum()
+
+    # Un solo to_dict para todas las líneas; repartirlas es un recorrido en Python
+    resultados = [_vacio() for _ in solicitudes]
+    for i, linea in zip(tabla['solicitud'].tolist(), tabla[columnas].to_dict('records')):
+        resultados[i]['lineas'].append(linea)
+    for i, s in zip(sumas.index.tolist(), sumas.to_dict('records')):
+        resultados[i].update(
+            total_valor=float(s['valor']),
+            total_comision=float(s['comision']),
+            total_pagar=float(s['pagar_pan']),
+            **{rol: int(s[rol]) for rol in ROLES}
+        )
+    return resultados
+
+
+def calcular_venta(codigo_vendedor, codigo_dev_anterior=None, codigo_pedido=None,
+                   codigo_extra=None, codigo_dev_dia=None):
+    """Desglose de una sola venta (ver calcular_ventas)."""
+    return calcular_ventas([SolicitudVenta(codigo_vendedor, codigo_dev_anterior, codigo_pedido,
+                                           codigo_extra, codigo_dev_dia)])[0]
+
+
+# --- Generación en lote ----------------------------------------------------
+
+def emparejar_lote(fecha):
+    """
+    Propone los documentos de la venta de cada vendedor para `fecha`:
+      - despachos de pedido y de extra del día que ninguna venta usó,
+      - devolución del día y la devolución anterior más reciente (usos < 2).
+    Devuelve [{'vendedor', 'nombre', 'solicitud', 'devoluciones', 'estado',
+    'motivo'}] con estado 'lista', 'conflicto' u 'omitida'.
+    """
+    nombres = nombres_vendedores()
+
+    con_venta = {v for v, in db.session.query(BDVenta.codigo_vendedor).filter(BDVenta.fecha == fecha)}
+
+    despachos = (db.session.query(BDDespacho.vendedor_cod, BDDespacho.tipo_origen, BDDespacho.codigo_origen)
+                 .filter(BDDespacho.fecha == fecha).all())
+    codigos = [c for _, _, c in despachos]
+    usados = set()
+    if codigos:
+        for ped, ext in (db.session.query(BDVenta.codigo_pedido, BDVenta.codigo_extra)
+                         .filter(or_(BDVenta.codigo_pedido.in_(codigos), BDVenta.codigo_extra.in_(codigos)))):
+            usados.update((ped, ext))
+    pendientes = defaultdict(lambda: {'pedido': [], 'extra': []})
+    for vend, tipo, codigo in despachos:
+        if codigo not in usados and tipo in ('pedido', 'extra'):
+            pendientes[vend][tipo].append(codigo)
+
+    abiertas = defaultdict(list)
+    for dev_id, vend, consecutivo, f in (
+            db.session.query(BDDevolucion.id, BDDevolucion.codigo_vendedor,
+                             BDDevolucion.consecutivo, BDDevolucion.fecha)
+            .filter(BDDevolucion.usos < 2, BDDevolucion.fecha <= fecha)):
+        abiertas[vend].append((f, consecutivo, dev_id))
+
+    propuestas = []
+    for vend in sorted(set(pendientes) | con_venta, key=lambda v: nombres.get(v, v)):
+        p = {'vendedor': vend, 'nombre': nombres.get(vend, vend), 'solicitud': None,
+             'devoluciones': [], 'estado': 'omitida', 'motivo': ''}
+        propuestas.append(p)
+
+        if vend in con_venta:
+            p['motivo'] = 'Ya tiene venta ese día.'
+            continue
+        pedidos, extras = pendientes[vend]['pedido'], pendientes[vend]['extra']
+
+        del_dia = [d for d in abiertas[vend] if d[0] == fecha]
+        previas = [d for d in abiertas[vend] if d[0] < fecha]
+        ultima = max((d[0] for d in previas), default=None)
+        anteriores = [d for d in previas if d[0] == ultima]
+
+        problemas = []
+        if len(pedidos) > 1:
+            problemas.append(f"{len(pedidos)} despachos de pedido pendientes ({', '.join(pedidos)})")
+        if len(extras) > 1:
+            problemas.append(f"{len(extras)} despachos de extra pendientes ({', '.join(extras)})")
+        if len(del_dia) > 1:
+            problemas.append(f"{len(del_dia)} devoluciones del día abiertas")
+        if len(anteriores) > 1:
+            problemas.append(f"{len(anteriores)} devoluciones anteriores abiertas del {ultima.isoformat()}")
+        if problemas:
+            p['estado'], p['motivo'] = 'conflicto', '; '.join(problemas) + '.'
+            continue
+
+        dev_ant = anteriores[0] if anteriores else None
+        dev_dia = del_dia[0] if del_dia else None
+        p['solicitud'] = SolicitudVenta(
+            vend,
+            dev_ant[1] if dev_ant else None,
+            pedidos[0] if pedidos else None,
+            extras[0] if extras else None,
+            dev_dia[1] if dev_dia else None,
+        )
+        p['devoluciones'] = [d[2] for d in (dev_ant, dev_dia) if d]
+        p['estado'] = 'lista'
+    return propuestas
+
+
+def previsualizar_lote(fecha):
+    """emparejar_lote + el desglose de las listas, calculado de una vez."""
+    propuestas = emparejar_lote(fecha)
+    listas = [p for p in propuestas if p['estado'] == 'lista']
+    for p, r in zip(listas, calcular_ventas([p['solicitud'] for p in listas])):
+        p['resultado'] = r
+        if not r['lineas']:
+            p['estado'], p['motivo'] = 'omitida', 'Los documentos no tienen productos.'
+    return propuestas
+
+
+def crear_ventas_lote(fecha, vendedores=None):
+    """
+    Crea en una sola transacción las ventas 'lista' de `fecha` (o solo las de
+    `vendedores`). Devuelve (ventas creadas como dicts, propuestas para revisar).
+
+    Antes de escribir bloquea las filas de los vendedores y vuelve a comprobar
+    que no tengan venta ese día: de dos lotes simultáneos el segundo espera y
+    omite lo que el primero ya creó. Si alguna devolución llegó a dos usos
+    mientras tanto, no se crea nada y se lanza LoteDesactualizado.
+
+    Escribe con INSERT múltiples (cabeceras e ítems) en vez de objeto por
+    objeto, así que refresca la tabla de hechos del día de forma explícita.
+    """
+    propuestas = previsualizar_lote(fecha)
+    listas = [p for p in propuestas if p['estado'] == 'lista'
+              and (vendedores is None or p['vendedor'] in vendedores)]
+    if not listas:
+        return [], propuestas
+
+    conn = db.session.connection()
+    codigos = [p['vendedor'] for p in listas]
+    conn.execute(select(Vendedor.codigo_vendedor).where(Vendedor.codigo_vendedor.in_(codigos)).with_for_update())
+    # Lectura con bloqueo: ve lo confirmado por otro lote después de la vista previa
+    con_venta = set(conn.execute(
+        select(BDVenta.codigo_vendedor)
+        .where(BDVenta.fecha == fecha, BDVenta.codigo_vendedor.in_(codigos))
+        .with_for_update()
+    ).scalars())
+    for p in listas:
+        if p['vendedor'] in con_venta:
+            p['estado'], p['motivo'] = 'omitida', 'Ya tiene venta ese día.'
+    listas = [p for p in listas if p['vendedor'] not in con_venta]
+    if not listas:
+        db.session.rollback()
+        return [], propuestas
+
+    # Los consecutivos se reservan en una transacción propia, antes de escribir en esta
+    consecutivos = generar_consecutivos(BDVenta, 'VT', len(listas))
+
+    devoluciones = {d for p in listas for d in p['devoluciones']}
+    if devoluciones:
+        res = conn.execute(
+            update(BDDevolucion)
+            .where(BDDevolucion.id.in_(devoluciones), BDDevolucion.usos < 2)
+            .values(usos=BDDevolucion.usos + 1)
+        )
+        if res.rowcount != len(devoluciones):
+            db.session.rollback()
+            raise LoteDesactualizado("Alguna devolución del lote ya se usó en dos ventas.")
+
+    ventas = []
+    for p, consecutivo in zip(listas, consecutivos):
+        s, r = p['solicitud'], p['resultado']
+        ventas.append({
+            'consecutivo':         consecutivo,
+            'codigo_vendedor':     s.codigo_vendedor,
+            'codigo_dev_anterior': s.codigo_dev_anterior,
+            'codigo_pedido':       s.codigo_pedido,
+            'codigo_extra':        s.codigo_extra,
+            'codigo_dev_dia':      s.codigo_dev_dia,
+            'fecha':               fecha,
+            'devolucion_anterior': r['dev_ant'],
+            'pedido':              r['pedido'],
+            'extras':              r['extra'],
+            'devolucion_dia':      r['dev_dia'],
+            'total_venta':         r['total_valor'],
+            'comision':            r['total_comision'],
+            'pagar_pan':           r['total_pagar'],
+        })
+        p['estado'], p['consecutivo'] = 'creada', consecutivo
+        p['motivo'] = f'Venta {consecutivo} creada.'
+
+    conn.execute(insert(BDVenta), ventas)
+    ids = dict(conn.execute(
+        select(BDVenta.consecutivo, BDVenta.id)
+        .where(BDVenta.consecutivo.in_([v['consecutivo'] for v in ventas]))
+    ).all())
+    conn.execute(insert(BDVentaItem), [
+        {'venta_id': ids[p['consecutivo']], 'producto_cod': l['codigo'], 'cantidad': l['total'],
+         'precio_unit': l['precio'], 'subtotal': l['valor'], 'comision': l['comision'],
+         'pagar_pan': l['pagar_pan']}
+        for p in listas for l in p['resultado']['lineas']
+    ])
+
+    recalcular_porciones(conn, 'venta', fecha, [v['codigo_vendedor'] for v in ventas])
+    db.session.commit()
+    return ventas, propuestas
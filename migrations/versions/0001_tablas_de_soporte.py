@@ -0,0 +1,105 @@
+"""tablas de soporte: resumen diario, bandeja de notificaciones, consecutivos y estado de canastas
+
+Las bases existentes se crearon con db.create_all(), que no agrega columnas
+a tablas ya creadas; por eso cada paso comprueba antes si ya existe.
+
+Revision ID: 0001_tablas_de_soporte
+Revises:
+Create Date: 2026-10-18 08:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_tablas_de_soporte'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _tablas():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def _columnas(tabla):
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(tabla)}
+
+
+def upgrade():
+    tablas = _tablas()
+
+    if 'bd_resumen_diario' not in tablas:
+        op.create_table(
+            'bd_resumen_diario',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('fecha', sa.Date(), nullable=False),
+            sa.Column('codigo_vendedor', sa.String(25), nullable=False),
+            sa.Column('producto_cod', sa.String(20), nullable=False),
+            sa.Column('tipo_doc', sa.String(12), nullable=False),
+            sa.Column('cantidad', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('valor', sa.Numeric(14, 2), nullable=False, server_default='0'),
+            sa.Column('comision', sa.Numeric(14, 2), nullable=False, server_default='0'),
+            sa.UniqueConstraint('fecha', 'codigo_vendedor', 'producto_cod', 'tipo_doc',
+                                name='uq_resumen_diario'),
+        )
+        op.create_index('ix_resumen_diario_tipo_fecha', 'bd_resumen_diario', ['tipo_doc', 'fecha'])
+
+    if 'bd_notificaciones' not in tablas:
+        op.create_table(
+            'bd_notificaciones',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('mensaje', sa.Text(), nullable=False),
+            sa.Column('estado', sa.String(10), nullable=False, server_default='pendiente'),
+            sa.Column('intentos', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('proximo_intento', sa.DateTime(), nullable=False),
+            sa.Column('reclamada_en', sa.DateTime(), nullable=True),
+            sa.Column('enviada_en', sa.DateTime(), nullable=True),
+            sa.Column('ultimo_error', sa.String(255), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        )
+        op.create_index('ix_notificaciones_estado_proximo', 'bd_notificaciones',
+                        ['estado', 'proximo_intento'])
+
+    if 'bd_consecutivos' not in tablas:
+        op.create_table(
+            'bd_consecutivos',
+            sa.Column('prefijo', sa.String(10), primary_key=True),
+            sa.Column('ultimo', sa.Integer(), nullable=False, server_default='0'),
+        )
+
+    if 'canastas' in tablas:
+        columnas = _columnas('canastas')
+        with op.batch_alter_table('canastas') as batch:
+            if 'vendedor_actual' not in columnas:
+                batch.add_column(sa.Column('vendedor_actual', sa.String(25), nullable=True))
+                batch.create_foreign_key('fk_canastas_vendedor_actual', 'vendedores',
+                                         ['vendedor_actual'], ['codigo_vendedor'])
+            if 'fecha_prestamo' not in columnas:
+                batch.add_column(sa.Column('fecha_prestamo', sa.DateTime(), nullable=True))
+            if 'ultimo_movimiento_id' not in columnas:
+                batch.add_column(sa.Column('ultimo_movimiento_id', sa.Integer(), nullable=True))
+
+        indices = {i['name'] for i in sa.inspect(op.get_bind()).get_indexes('canastas')}
+        if 'ix_canastas_actualidad_fecha_prestamo' not in indices:
+            op.create_index('ix_canastas_actualidad_fecha_prestamo', 'canastas',
+                            ['actualidad', 'fecha_prestamo'])
+        if 'ix_canastas_vendedor_actual' not in indices:
+            op.create_index('ix_canastas_vendedor_actual', 'canastas', ['vendedor_actual'])
+
+
+def downgrade():
+    op.drop_index('ix_canastas_vendedor_actual', table_name='canastas')
+    op.drop_index('ix_canastas_actualidad_fecha_prestamo', table_name='canastas')
+    with op.batch_alter_table('canastas') as batch:
+        batch.drop_constraint('fk_canastas_vendedor_actual', type_='foreignkey')
+        batch.drop_column('ultimo_movimiento_id')
+        batch.drop_column('fecha_prestamo')
+        batch.drop_column('vendedor_actual')
+
+    op.drop_table('bd_consecutivos')
+    op.drop_index('ix_notificaciones_estado_proximo', table_name='bd_notificaciones')
+    op.drop_table('bd_notificaciones')
+    op.drop_index('ix_resumen_diario_tipo_fecha', table_name='bd_resumen_diario')
+    op.drop_table('bd_resumen_diario')
@@ -0,0 +1,52 @@
+"""índices compuestos para las consultas más frecuentes
+
+Revision ID: 0002_indices_consultas
+Revises: 0001_tablas_de_soporte
+Create Date: 2026-10-18 08:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_indices_consultas'
+down_revision = '0001_tablas_de_soporte'
+branch_labels = None
+depends_on = None
+
+# (nombre, tabla, columnas) — los mismos que declaran los modelos en __table_args__
+INDICES = [
+    ('ix_pedidos_vendedor_fecha',         'bd_pedidos',            ['codigo_vendedor', 'fecha']),
+    ('ix_extras_vendedor_fecha',          'BD_EXTRAS',             ['codigo_vendedor', 'fecha']),
+    ('ix_devoluciones_vendedor_usos',     'BD_DEVOLUCIONES',       ['codigo_vendedor', 'usos']),
+    ('ix_devoluciones_vendedor_fecha',    'BD_DEVOLUCIONES',       ['codigo_vendedor', 'fecha']),
+    ('ix_ventas_vendedor_fecha',          'BD_VENTAS',             ['codigo_vendedor', 'fecha']),
+    ('ix_despachos_vendedor_fecha_tipo',  'BD_DESPACHOS',          ['vendedor_cod', 'fecha', 'tipo_origen']),
+    ('ix_despachos_codigo_origen',        'BD_DESPACHOS',          ['codigo_origen']),
+    ('ix_movimientos_canasta_fecha',      'movimientos_canastas',  ['codigo_barras', 'fecha_movimiento']),
+    ('ix_liquidaciones_fecha_vendedor',   'bd_liquidaciones',      ['fecha', 'codigo_vendedor']),
+    ('ix_cambios_fecha_vendedor',         'bd_cambios',            ['fecha', 'codigo_vendedor']),
+    ('ix_pedido_items_producto',          'BD_PEDIDO_ITEMS',       ['producto_cod']),
+    ('ix_extra_items_producto',           'BD_EXTRA_ITEMS',        ['producto_cod']),
+    ('ix_devolucion_items_producto',      'BD_DEVOLUCION_ITEMS',   ['producto_cod']),
+    ('ix_venta_items_producto',           'BD_VENTA_ITEMS',        ['producto_cod']),
+    ('ix_despacho_items_producto',        'BD_DESPACHO_ITEMS',     ['producto_cod']),
+]
+
+
+def _existentes(tabla):
+    return {i['name'] for i in sa.inspect(op.get_bind()).get_indexes(tabla)}
+
+
+def upgrade():
+    tablas = set(sa.inspect(op.get_bind()).get_table_names())
+    for nombre, tabla, columnas in INDICES:
+        if tabla in tablas and nombre not in _existentes(tabla):
+            op.create_index(nombre, tabla, columnas)
+
+
+def downgrade():
+    for nombre, tabla, _ in reversed(INDICES):
+        if nombre in _existentes(tabla):
+            op.drop_index(nombre, table_name=tabla)
@@ -0,0 +1,30 @@
+"""sello de versión para datos cacheados en memoria (catálogo de productos)
+
+Revision ID: 0003_versiones_de_datos
+Revises: 0002_indices_consultas
+Create Date: 2026-10-18 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_versiones_de_datos'
+down_revision = '0002_indices_consultas'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'bd_versiones' not in set(sa.inspect(op.get_bind()).get_table_names()):
+        op.create_table(
+            'bd_versiones',
+            sa.Column('clave', sa.String(30), primary_key=True),
+            sa.Column('version', sa.Integer(), nullable=False),
+        )
+
+
+def downgrade():
+    if 'bd_versiones' in set(sa.inspect(op.get_bind()).get_table_names()):
+        op.drop_table('bd_versiones')
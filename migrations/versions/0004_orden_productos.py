@@ -0,0 +1,50 @@
+"""orden de presentación de productos (reemplaza la lista fija del código)
+
+Revision ID: 0004_orden_productos
+Revises: 0003_versiones_de_datos
+Create Date: 2026-10-18 09:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_orden_productos'
+down_revision = '0003_versiones_de_datos'
+branch_labels = None
+depends_on = None
+
+# Orden que antes estaba fijo en app/utils/productos.py
+ORDEN_INICIAL = [
+    '10001', '10003', '10297', '10004', '10041', '10040', '10137', '10251',
+    '10238', '10068', '10019', '10058', '10020', '10021', '10059', '10022',
+    '10023', '10060', '10092', '10219', '10024', '10291', '10254', '10094',
+    '10218', '10061', '10031', '10034', '10296', '10033', '10035', '10192',
+    '10193', '10007', '10009', '10133', '10322', '10008', '10010', '10016',
+    '10321', '10072', '10069', '10070', '10080', '10079', '10063', '10203',
+    '10183', '10082', '10055', '10326', '10002', '10052', '10043', '10073',
+    '10086', '10091', '10175', '10202'
+]
+
+
+def upgrade():
+    columnas = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('productos')}
+    if 'orden' in columnas:
+        return
+
+    with op.batch_alter_table('productos') as batch:
+        batch.add_column(sa.Column('orden', sa.Integer(), nullable=False, server_default='9999'))
+
+    productos = sa.table('productos', sa.column('codigo', sa.String), sa.column('orden', sa.Integer))
+    op.get_bind().execute(
+        productos.update()
+        .where(productos.c.codigo == sa.bindparam('b_codigo'))
+        .values(orden=sa.bindparam('b_orden')),
+        [{'b_codigo': c, 'b_orden': i} for i, c in enumerate(ORDEN_INICIAL)]
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('productos') as batch:
+        batch.drop_column('orden')
@@ -0,0 +1,33 @@
+"""almacén compartido de sesiones de voz (webhook de Dialogflow)
+
+Revision ID: 0005_sesiones_voz
+Revises: 0004_orden_productos
+Create Date: 2026-10-18 15:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_sesiones_voz'
+down_revision = '0004_orden_productos'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'bd_sesiones_voz' not in set(sa.inspect(op.get_bind()).get_table_names()):
+        op.create_table(
+            'bd_sesiones_voz',
+            sa.Column('session_id', sa.String(100), primary_key=True),
+            sa.Column('datos', sa.Text(), nullable=False),
+            sa.Column('expira', sa.DateTime(), nullable=False),
+        )
+        op.create_index('ix_sesiones_voz_expira', 'bd_sesiones_voz', ['expira'])
+
+
+def downgrade():
+    if 'bd_sesiones_voz' in set(sa.inspect(op.get_bind()).get_table_names()):
+        op.drop_index('ix_sesiones_voz_expira', table_name='bd_sesiones_voz')
+        op.drop_table('bd_sesiones_voz')
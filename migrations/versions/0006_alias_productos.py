@@ -0,0 +1,28 @@
+"""alias de productos para el dictado por voz
+
+Revision ID: 0006_alias_productos
+Revises: 0005_sesiones_voz
+Create Date: 2026-10-18 17:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_alias_productos'
+down_revision = '0005_sesiones_voz'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columnas = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('productos')}
+    if 'alias' not in columnas:
+        with op.batch_alter_table('productos') as batch:
+            batch.add_column(sa.Column('alias', sa.String(200), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('productos') as batch:
+        batch.drop_column('alias')